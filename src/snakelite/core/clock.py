@@ -0,0 +1,17 @@
+class TickClock:
+    """Simulation clock in milliseconds that only moves when advanced.
+
+    The game reads time exclusively through ``now()``, so a headless run can
+    advance it as fast as it likes while the interactive loop advances it by
+    the same amount it sleeps between frames.
+    """
+
+    def __init__(self, start=0):
+        self.time = start
+
+    def now(self):
+        return self.time
+
+    def advance(self, ms):
+        self.time += ms
+        return self.time
@@ -0,0 +1,133 @@
+from snakelite.settings import BLOCK_SIZE, ACTIVE_CHUNK_RADIUS
+from snakelite.core.grid import LAYER_STONE, region_neighbors
+
+
+class DistanceField:
+    """Steps from the snake's head to every cell of the wrapped board, with
+    stones as walls.
+
+    One field serves every food in a tick. ``track`` only notes where the
+    head is; the field is brought up to date on the first lookup after the
+    head or the stones changed, so ticks in which no food moves cost
+    nothing. With no stones on the board the distance is the wrapped
+    Manhattan distance and no search runs at all.
+
+    When the stones are unchanged, the old field shifted by the old head's
+    distance to the new head bounds every new distance from above, so a
+    breadth-first wave from the new head only has to visit the cells that
+    got closer.
+
+    On a world larger than the simulated chunks, the field only covers
+    the region of chunks around the head, walled along its sides, and is
+    rebuilt when the head moves into another chunk. Positions outside it
+    get the open-board distance.
+    """
+
+    def __init__(self, grid, radius=ACTIVE_CHUNK_RADIUS):
+        self.grid = grid
+        self.radius = radius
+        # Cells ``(x, y, cols, rows)`` of the world the field covers
+        self.region = None
+        self.neighbors = None
+        self.unreachable = 0
+        # Walls hold -1, which no wave step can lower; one more wall past
+        # the last cell closes the region's sides
+        self.dist = []
+        self.open_board = True
+        self.walls = None
+        self.source = None
+        self.head = None
+        self.head_pos = None
+        self.stone_version = None
+
+    def snapshot(self):
+        current = self.stone_version == self.grid.versions[LAYER_STONE]
+        return (self.dist[:], self.walls, self.open_board, self.source, self.head, self.head_pos,
+                self.region, current)
+
+    def restore(self, state):
+        """Reload a snapshot taken together with the grid's, after the grid
+        has been restored."""
+        dist, self.walls, self.open_board, self.source, self.head, self.head_pos, region, current = state
+        if region is not None:
+            self._cover(region)
+        self.dist = dist[:]
+        # Restoring bumps the grid's versions; a field that matched the
+        # stones then matches them again
+        self.stone_version = self.grid.versions[LAYER_STONE] if current else None
+
+    def track(self, head, region=None):
+        """Measure from ``head`` from now on, over ``region`` (cells ``(x,
+        y, cols, rows)``, by default the chunks around it)."""
+        self.head_pos = head
+        if region is None:
+            region = self.grid.region_around(head, self.radius)
+        if region != self.region:
+            self._cover(region)
+        self.head = self._cell(head)
+
+    def _cover(self, region):
+        self.region = region
+        _, _, cols, rows = region
+        self.neighbors = region_neighbors(cols, rows, cols == self.grid.cols, rows == self.grid.rows)
+        self.unreachable = cols * rows
+        # Nothing carries over from another region
+        self.stone_version = None
+
+    def _cell(self, pos):
+        # Index of a position in the region, or None outside it
+        x, y, cols, rows = self.region
+        x = (pos[0] // BLOCK_SIZE - x) % self.grid.cols
+        y = (pos[1] // BLOCK_SIZE - y) % self.grid.rows
+        return x * rows + y if x < cols and y < rows else None
+
+    def distance(self, pos):
+        if self.head != self.source or self.grid.versions[LAYER_STONE] != self.stone_version:
+            self.refresh()
+        if not self.open_board:
+            cell = self._cell(pos)
+            if cell is not None:
+                return self.dist[cell]
+        dx = abs(pos[0] - self.head_pos[0]) // BLOCK_SIZE
+        dy = abs(pos[1] - self.head_pos[1]) // BLOCK_SIZE
+        return min(dx, self.grid.cols - dx) + min(dy, self.grid.rows - dy)
+
+    def refresh(self):
+        version = self.grid.versions[LAYER_STONE]
+        # A head standing on a stone (a bomb can go off under it) gave that
+        # wall a distance, so shifting from it would open a hole
+        if version != self.stone_version or (not self.open_board and self.walls[self.source]):
+            walls = self.grid.region(LAYER_STONE, *self.region).ravel()
+            self.open_board = not walls.any()
+            if not self.open_board:
+                unreachable = self.unreachable
+                self.walls = walls.tolist() + [1]
+                self.dist = [-1 if wall else unreachable for wall in self.walls]
+                self._wave(self.head)
+        elif not self.open_board:
+            offset = self.dist[self.head]
+            if offset == self.unreachable:
+                # Walled off from the old head: nothing carries over
+                offset = 0
+                self.dist = [d if d < 0 else self.unreachable for d in self.dist]
+            elif offset > 0:
+                unreachable = self.unreachable
+                self.dist = [d + offset if 0 <= d < unreachable else d for d in self.dist]
+            self._wave(self.head)
+        self.source = self.head
+        self.stone_version = version
+
+    def _wave(self, source):
+        dist, neighbors = self.dist, self.neighbors
+        dist[source] = 0
+        frontier = [source]
+        step = 1
+        while frontier:
+            reached = []
+            for cell in frontier:
+                for neighbor in neighbors[cell]:
+                    if step < dist[neighbor]:
+                        dist[neighbor] = step
+                        reached.append(neighbor)
+            frontier = reached
+            step += 1
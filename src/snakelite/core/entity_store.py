@@ -0,0 +1,135 @@
+import numpy as np
+
+SLOT_BITS = 32
+SLOT_MASK = (1 << SLOT_BITS) - 1
+
+
+class EntityStore:
+    """Structure-of-arrays table for one kind of entity.
+
+    Every field is a typed NumPy column indexed by slot (``store.x``,
+    ``store.t``, ...) and ``alive`` marks the slots in use, so systems read
+    and update whole kinds of entity with array operations. Removed slots
+    go on a free list and are handed out again first; each removal bumps
+    the slot's generation, so an id (generation in the high bits, slot in
+    the low ones) names one entity only and stale ids are caught. Columns
+    double in size when the table fills.
+
+    The columns are fields of one structured array, ``data``, so a
+    snapshot of the whole table is one copy of its bytes.
+    """
+
+    def __init__(self, capacity=64, **columns):
+        self.columns = tuple(columns)
+        self.dtype = np.dtype([*columns.items(), ("alive", bool), ("generation", np.int64)])
+        self.capacity = capacity
+        self._bind(np.zeros(capacity, dtype=self.dtype))
+        self.free = list(range(capacity - 1, -1, -1))
+        self.count = 0
+
+    def _bind(self, data):
+        self.data = data
+        for name in self.dtype.names:
+            setattr(self, name, data[name])
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, entity_id):
+        slot = entity_id & SLOT_MASK
+        return slot < self.capacity and self.alive[slot] and self.generation[slot] == entity_id >> SLOT_BITS
+
+    def slot(self, entity_id):
+        if entity_id not in self:
+            raise KeyError(f"no live entity {entity_id}")
+        return entity_id & SLOT_MASK
+
+    @staticmethod
+    def slots(entity_ids):
+        """Slots of ids known to be live, without checking them."""
+        return np.asarray(entity_ids, dtype=np.int64) & SLOT_MASK
+
+    def ids(self, slots):
+        return (self.generation[slots] << SLOT_BITS) | slots
+
+    def live(self):
+        return np.flatnonzero(self.alive)
+
+    def add(self, **values):
+        if not self.free:
+            self._grow(self.capacity + 1)
+        slot = self.free.pop()
+        for name, value in values.items():
+            getattr(self, name)[slot] = value
+        self.alive[slot] = True
+        self.count += 1
+        return (int(self.generation[slot]) << SLOT_BITS) | slot
+
+    def add_many(self, **arrays):
+        """Add one entity per element of the (equal length) column arrays;
+        returns their ids."""
+        n = len(next(iter(arrays.values())))
+        if len(self.free) < n:
+            self._grow(self.count + n)
+        slots = np.array(self.free[len(self.free) - n:][::-1], dtype=np.int64)
+        del self.free[len(self.free) - n:]
+        for name, values in arrays.items():
+            getattr(self, name)[slots] = values
+        self.alive[slots] = True
+        self.count += n
+        return self.ids(slots)
+
+    def remove(self, entity_id):
+        self.remove_slots([self.slot(entity_id)])
+
+    def remove_slots(self, slots):
+        slots = np.asarray(slots, dtype=np.int64)
+        self.alive[slots] = False
+        self.generation[slots] += 1
+        self.free.extend(slots[::-1].tolist())
+        self.count -= len(slots)
+
+    def clear(self):
+        live = self.live()
+        if len(live):
+            self.remove_slots(live)
+
+    def write_slots(self, slots, records):
+        """Overwrite ``slots`` with whole ``records`` of this store's dtype,
+        as a copy of another store does; live counts and the free list
+        follow."""
+        slots = np.asarray(slots, dtype=np.int64)
+        if len(slots) and slots.max() >= self.capacity:
+            self._grow(int(slots.max()) + 1)
+        self.data[slots] = records
+        self.count = int(np.count_nonzero(self.alive))
+        self.free = np.flatnonzero(~self.alive)[::-1].tolist()
+
+    def rows(self, *names):
+        """Live entities as tuples of the named columns (all by default),
+        in slot order."""
+        live = self.live()
+        columns = [getattr(self, name)[live].tolist() for name in (names or self.columns)]
+        return list(zip(*columns))
+
+    def snapshot(self):
+        # Raw bytes: copying a structured array field by field is far slower
+        return self.data.tobytes(), self.free[:], self.count
+
+    def restore(self, state):
+        data, free, self.count = state
+        if len(data) == self.data.nbytes:
+            self.data.view(np.uint8)[:] = np.frombuffer(data, dtype=np.uint8)
+        else:
+            self._bind(np.frombuffer(bytearray(data), dtype=self.dtype))
+            self.capacity = len(self.data)
+        self.free = free[:]
+
+    def _grow(self, needed):
+        old = self.capacity
+        self.capacity = max(needed, old * 2)
+        data = np.zeros(self.capacity, dtype=self.dtype)
+        data[:old] = self.data
+        self._bind(data)
+        # New slots sit below the freed ones, which keep being reused first
+        self.free[:0] = range(self.capacity - 1, old - 1, -1)
@@ -0,0 +1,62 @@
+from array import array
+
+
+class FreeCells:
+    """Set of free cell indices with O(1) add, remove and uniform sampling.
+
+    ``cells`` is a permutation of every index on the board whose first
+    ``count`` entries are the free ones; ``slot`` maps each index back to its
+    place in ``cells``. Removing swaps a cell just past the free prefix and
+    adding swaps it back in, so nothing is ever allocated or searched.
+    Both are flat integer arrays, which copy in one block for snapshots.
+    """
+
+    def __init__(self, size):
+        self.cells = array("l", range(size))
+        self.slot = array("l", range(size))
+        self.count = size
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, cell):
+        return self.slot[cell] < self.count
+
+    def reset(self):
+        size = len(self.cells)
+        self.cells = array("l", range(size))
+        self.slot = array("l", range(size))
+        self.count = size
+
+    def snapshot(self):
+        return self.cells[:], self.slot[:], self.count
+
+    def restore(self, state):
+        cells, slot, self.count = state
+        self.cells = cells[:]
+        self.slot = slot[:]
+
+    @staticmethod
+    def from_snapshot(state):
+        free = FreeCells.__new__(FreeCells)
+        free.restore(state)
+        return free
+
+    def remove(self, cell):
+        self.count -= 1
+        self._swap(self.slot[cell], self.count)
+
+    def add(self, cell):
+        self._swap(self.slot[cell], self.count)
+        self.count += 1
+
+    def sample(self, rng):
+        if not self.count:
+            return None
+        return self.cells[rng.randrange(self.count)]
+
+    def _swap(self, i, j):
+        cells, slot = self.cells, self.slot
+        a, b = cells[i], cells[j]
+        cells[i], cells[j] = b, a
+        slot[a], slot[b] = j, i
@@ -0,0 +1,411 @@
+from array import array
+from functools import lru_cache
+
+import numpy as np
+from snakelite.settings import (
+    BLOCK_SIZE, WORLD_COLS, WORLD_ROWS, CHUNK_SIZE, ACTIVE_CHUNK_RADIUS, UP, DOWN, LEFT, RIGHT,
+)
+from snakelite.core.free_cells import FreeCells
+
+# Occupancy layers, one per cell type
+LAYER_STONE = 0
+LAYER_SNAKE = 1
+LAYER_FOOD = 2
+LAYER_BOMB = 3
+LAYER_SLOWDOWN = 4
+LAYER_POWERUP = 5
+LAYER_EXPLOSION = 6
+LAYER_COUNT = 7
+
+# Layers that stop something new from spawning on a cell
+SPAWN_BLOCKING = (LAYER_STONE, LAYER_SNAKE, LAYER_FOOD, LAYER_BOMB, LAYER_SLOWDOWN, LAYER_POWERUP)
+
+
+def _spans(start, length, size, chunk_size):
+    # The wrapped run of ``length`` cells from ``start`` cut at chunk and
+    # world edges: (chunk index, offset in the chunk, offset in the run,
+    # cells) per piece
+    done = 0
+    pos = start % size
+    while done < length:
+        index, offset = divmod(pos, chunk_size)
+        n = min(chunk_size - offset, size - pos, length - done)
+        yield index, offset, done, n
+        done += n
+        pos = (pos + n) % size
+
+
+@lru_cache(maxsize=8)
+def region_neighbors(cols, rows, wrap_x, wrap_y):
+    """Each cell's four neighbours in a ``cols`` x ``rows`` region, as
+    indexes ``x * rows + y`` in UP, DOWN, LEFT, RIGHT order. Steps off a
+    side that does not wrap lead to ``cols * rows``, one past the last
+    cell, which callers keep blocked."""
+    outside = cols * rows
+
+    def step(value, size, wraps):
+        if 0 <= value < size:
+            return value
+        return value % size if wraps else None
+
+    table = []
+    for x in range(cols):
+        for y in range(rows):
+            cells = []
+            for dx, dy in (UP, DOWN, LEFT, RIGHT):
+                nx, ny = step(x + dx, cols, wrap_x), step(y + dy, rows, wrap_y)
+                cells.append(outside if nx is None or ny is None else nx * rows + ny)
+            table.append(tuple(cells))
+    return table
+
+
+class _Chunk:
+    """Counts for one ``CHUNK_SIZE`` square of the world (smaller along the
+    far edges), laid out as the whole board used to be."""
+
+    __slots__ = ("rows", "layers", "blockers", "free", "entities")
+
+    def __init__(self, cols, rows):
+        self.rows = rows
+        self.layers = np.zeros((LAYER_COUNT, cols, rows), dtype=np.uint16)
+        self.blockers = array("l", [0]) * (cols * rows)
+        self.free = FreeCells(cols * rows)
+        # Entities on every layer; the chunk is dropped once this is zero
+        self.entities = 0
+
+    def snapshot(self):
+        return self.layers.tobytes(), self.blockers[:], self.free.snapshot(), self.entities
+
+    @staticmethod
+    def from_snapshot(shape, state):
+        layers, blockers, free, entities = state
+        chunk = _Chunk.__new__(_Chunk)
+        chunk.rows = shape[1]
+        chunk.layers = np.frombuffer(bytearray(layers), dtype=np.uint16).reshape((LAYER_COUNT,) + shape)
+        chunk.blockers = blockers[:]
+        chunk.free = FreeCells.from_snapshot(free)
+        chunk.entities = entities
+        return chunk
+
+
+class OccupancyGrid:
+    """Per-cell entity counts, one NumPy layer per cell type.
+
+    Positions are the pixel tuples the game already uses; every query is a
+    single array lookup, so it costs the same however many entities exist.
+    Counts rather than flags let entities share a cell (a bomb dropped on
+    the food that laid it, overlapping explosion crosses).
+
+    The world is stored in chunks of ``chunk_size`` cells a side that only
+    exist while something stands in them, so memory follows the entities
+    rather than the size of the board. Each chunk keeps its own free-cell
+    set, and spawning picks a uniform free cell of the chosen chunks in
+    time that depends on the number of chunks, not cells.
+    """
+
+    def __init__(self, cols=WORLD_COLS, rows=WORLD_ROWS, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.blocks_spawn = [layer in SPAWN_BLOCKING for layer in range(LAYER_COUNT)]
+        self.changed = None
+        # Bumped on every change to a layer, so derived data (such as the
+        # food distance field) can tell when it is stale
+        self.versions = [0] * LAYER_COUNT
+        self.resize(cols, rows)
+
+    def resize(self, cols, rows):
+        """Make the world ``cols`` x ``rows`` cells, and empty."""
+        self.cols = cols
+        self.rows = rows
+        # World size in pixels; positions wrap around it
+        self.width = cols * BLOCK_SIZE
+        self.height = rows * BLOCK_SIZE
+        self.chunk_cols = -(-cols // self.chunk_size)
+        self.chunk_rows = -(-rows // self.chunk_size)
+        self.unchunked = self.chunk_cols == self.chunk_rows == 1
+        if self.unchunked:
+            # The whole board is one chunk: skip the chunk arithmetic
+            self.count = self._count_unchunked
+        else:
+            self.__dict__.pop("count", None)
+        # The head stays in one chunk for many ticks in a row
+        self._last_region = (None, None)
+        self.clear()
+
+    def clear(self):
+        self.chunks = {}
+        self.versions = [version + 1 for version in self.versions]
+
+    def snapshot(self):
+        return (self.cols, self.rows), tuple((chunk_id, chunk.snapshot()) for chunk_id, chunk in self.chunks.items())
+
+    def restore(self, state):
+        size, chunks = state
+        if size != (self.cols, self.rows):
+            self.resize(*size)
+        self.chunks = {
+            chunk_id: _Chunk.from_snapshot(self._chunk_shape(chunk_id), chunk) for chunk_id, chunk in chunks
+        }
+        # The layers may hold anything now
+        self.versions = [version + 1 for version in self.versions]
+
+    def track_changes(self):
+        """Start recording the positions touched by ``add`` and ``remove``."""
+        self.changed = set()
+
+    def drain_changes(self):
+        changed, self.changed = self.changed, set()
+        return changed
+
+    def _chunk_shape(self, chunk_id):
+        cx, cy = divmod(chunk_id, self.chunk_rows)
+        size = self.chunk_size
+        return min(size, self.cols - cx * size), min(size, self.rows - cy * size)
+
+    def _open(self, chunk_id):
+        chunk = self.chunks[chunk_id] = _Chunk(*self._chunk_shape(chunk_id))
+        return chunk
+
+    def _locate(self, pos):
+        # Chunk id and the cell within it of a pixel position
+        cx, x = divmod(pos[0] // BLOCK_SIZE, self.chunk_size)
+        cy, y = divmod(pos[1] // BLOCK_SIZE, self.chunk_size)
+        return cx * self.chunk_rows + cy, x, y
+
+    def _by_chunk(self, xs, ys):
+        # The pixel coordinate arrays split by chunk: (chunk id, selection,
+        # cells within the chunk) for each chunk they touch
+        x, y = xs // BLOCK_SIZE, ys // BLOCK_SIZE
+        if self.unchunked:
+            yield 0, slice(None), x, y
+            return
+        cx, x = np.divmod(x, self.chunk_size)
+        cy, y = np.divmod(y, self.chunk_size)
+        ids = cx * self.chunk_rows + cy
+        for chunk_id in np.unique(ids).tolist():
+            here = ids == chunk_id
+            yield chunk_id, here, x[here], y[here]
+
+    def add(self, layer, pos):
+        x, y = pos[0] // BLOCK_SIZE, pos[1] // BLOCK_SIZE
+        chunk_id = 0
+        if not self.unchunked:
+            size = self.chunk_size
+            chunk_id = x // size * self.chunk_rows + y // size
+            x, y = x % size, y % size
+        chunk = self.chunks.get(chunk_id) or self._open(chunk_id)
+        chunk.layers[layer, x, y] += 1
+        chunk.entities += 1
+        self.versions[layer] += 1
+        if self.changed is not None:
+            self.changed.add(pos)
+        if self.blocks_spawn[layer]:
+            cell = x * chunk.rows + y
+            chunk.blockers[cell] += 1
+            if chunk.blockers[cell] == 1:
+                chunk.free.remove(cell)
+
+    def remove(self, layer, pos):
+        x, y = pos[0] // BLOCK_SIZE, pos[1] // BLOCK_SIZE
+        chunk_id = 0
+        if not self.unchunked:
+            size = self.chunk_size
+            chunk_id = x // size * self.chunk_rows + y // size
+            x, y = x % size, y % size
+        chunk = self.chunks[chunk_id]
+        chunk.layers[layer, x, y] -= 1
+        self.versions[layer] += 1
+        if self.changed is not None:
+            self.changed.add(pos)
+        if self.blocks_spawn[layer]:
+            cell = x * chunk.rows + y
+            chunk.blockers[cell] -= 1
+            if not chunk.blockers[cell]:
+                chunk.free.add(cell)
+        chunk.entities -= 1
+        if not chunk.entities:
+            del self.chunks[chunk_id]
+
+    def add_many(self, layer, xs, ys):
+        """``add`` for every position in the pixel coordinate arrays."""
+        self._update_many(layer, xs, ys, self.add, np.add)
+
+    def remove_many(self, layer, xs, ys):
+        self._update_many(layer, xs, ys, self.remove, np.subtract)
+
+    def _update_many(self, layer, xs, ys, update, ufunc):
+        if self.blocks_spawn[layer]:
+            # The free-cell set changes one cell at a time
+            for pos in zip(xs.tolist(), ys.tolist()):
+                update(layer, pos)
+            return
+        for chunk_id, _, x, y in self._by_chunk(xs, ys):
+            chunk = self.chunks.get(chunk_id) or self._open(chunk_id)
+            # Unbuffered, so a cell listed twice counts twice
+            ufunc.at(chunk.layers[layer], (x, y), 1)
+            chunk.entities = int(ufunc(chunk.entities, len(x)))
+            if not chunk.entities:
+                del self.chunks[chunk_id]
+        self.versions[layer] += 1
+        if self.changed is not None:
+            self.changed.update(zip(xs.tolist(), ys.tolist()))
+
+    def random_free(self, rng, chunks=None):
+        """Uniformly random free position in ``chunks`` (chunk ids, by
+        default the whole world), or ``None`` if they are full."""
+        if chunks is None:
+            chunks = range(self.chunk_cols * self.chunk_rows)
+        counts = []
+        for chunk_id in chunks:
+            chunk = self.chunks.get(chunk_id)
+            if chunk is None:
+                cols, rows = self._chunk_shape(chunk_id)
+                counts.append(cols * rows)
+            else:
+                counts.append(chunk.free.count)
+        total = sum(counts)
+        if not total:
+            return None
+        index = rng.randrange(total)
+        for chunk_id, count in zip(chunks, counts):
+            if index < count:
+                break
+            index -= count
+        chunk = self.chunks.get(chunk_id)
+        # A chunk that does not exist yet is free in cell order
+        cell = index if chunk is None else chunk.free.cells[index]
+        x, y = divmod(cell, self._chunk_shape(chunk_id)[1])
+        cx, cy = divmod(chunk_id, self.chunk_rows)
+        return ((cx * self.chunk_size + x) * BLOCK_SIZE, (cy * self.chunk_size + y) * BLOCK_SIZE)
+
+    def move(self, layer, old_pos, new_pos):
+        self.remove(layer, old_pos)
+        self.add(layer, new_pos)
+
+    def count(self, layer, pos):
+        # _locate, inlined: this is the hottest query in a tick
+        size = self.chunk_size
+        x, y = pos[0] // BLOCK_SIZE, pos[1] // BLOCK_SIZE
+        chunk = self.chunks.get(x // size * self.chunk_rows + y // size)
+        return 0 if chunk is None else int(chunk.layers[layer, x % size, y % size])
+
+    def _count_unchunked(self, layer, pos):
+        try:
+            return int(self.chunks[0].layers[layer, pos[0] // BLOCK_SIZE, pos[1] // BLOCK_SIZE])
+        except KeyError:
+            return 0
+
+    def counts(self, layer, xs, ys):
+        """``count`` for every position in the pixel coordinate arrays."""
+        counts = np.zeros(len(xs), dtype=np.uint16)
+        for chunk_id, here, x, y in self._by_chunk(xs, ys):
+            chunk = self.chunks.get(chunk_id)
+            if chunk is not None:
+                counts[here] = chunk.layers[layer, x, y]
+        return counts
+
+    def filled(self):
+        """Cells ``(xs, ys)`` (arrays, in cells) holding anything, chunk by
+        chunk."""
+        xs, ys = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+        for chunk_id, chunk in self.chunks.items():
+            cx, cy = divmod(chunk_id, self.chunk_rows)
+            x, y = np.nonzero(chunk.layers.any(axis=0))
+            xs.append(x + cx * self.chunk_size)
+            ys.append(y + cy * self.chunk_size)
+        return np.concatenate(xs), np.concatenate(ys)
+
+    def set_counts(self, pos, counts):
+        """Make the cell at ``pos`` hold ``counts[layer]`` entities on each
+        layer, through ``add`` and ``remove``."""
+        for layer, target in enumerate(counts):
+            difference = target - self.count(layer, pos)
+            for _ in range(abs(difference)):
+                (self.add if difference > 0 else self.remove)(layer, pos)
+
+    def occupied(self, pos, layers):
+        chunk_id, x, y = self._locate(pos)
+        chunk = self.chunks.get(chunk_id)
+        return chunk is not None and bool(chunk.layers[layers, x, y].any())
+
+    def mask(self, *layers):
+        return OccupancyMask(self, layers)
+
+    def region(self, layers, x, y, cols, rows, out=None):
+        """Counts of ``layers`` (one layer, or a sequence for a stack of
+        them) over the ``cols`` x ``rows`` cells from cell ``(x, y)``,
+        wrapping at the world edges; written into ``out`` (an array of
+        that shape, of any dtype) when given."""
+        if not isinstance(layers, int):
+            layers = list(layers)
+        if out is None:
+            shape = (cols, rows) if isinstance(layers, int) else (len(layers), cols, rows)
+            counts = np.zeros(shape, dtype=np.uint16)
+        else:
+            counts = out
+            counts.fill(0)
+        size = self.chunk_size
+        for cx, chunk_x, out_x, width in _spans(x, cols, self.cols, size):
+            for cy, chunk_y, out_y, height in _spans(y, rows, self.rows, size):
+                chunk = self.chunks.get(cx * self.chunk_rows + cy)
+                if chunk is not None:
+                    counts[..., out_x:out_x + width, out_y:out_y + height] = \
+                        chunk.layers[layers, chunk_x:chunk_x + width, chunk_y:chunk_y + height]
+        return counts
+
+    def region_around(self, pos, radius=ACTIVE_CHUNK_RADIUS):
+        """The cells ``(x, y, cols, rows)`` of the chunks at most ``radius``
+        chunks from the one holding ``pos``, wrapping; an axis with no more
+        chunks than that is covered whole."""
+        span = 2 * radius + 1
+        if span >= self.chunk_cols and span >= self.chunk_rows:
+            return 0, 0, self.cols, self.rows
+        size = self.chunk_size
+        key = (pos[0] // BLOCK_SIZE // size, pos[1] // BLOCK_SIZE // size, radius)
+        if key == self._last_region[0]:
+            return self._last_region[1]
+
+        def axis(cell, chunks, cells):
+            if span >= chunks:
+                return 0, cells
+            first = cell // size - radius
+            # The last chunk along an axis may be a short one
+            return (first % chunks) * size, sum(min(size, cells - (c % chunks) * size) for c in range(first, first + span))
+
+        x, cols = axis(pos[0] // BLOCK_SIZE, self.chunk_cols, self.cols)
+        y, rows = axis(pos[1] // BLOCK_SIZE, self.chunk_rows, self.rows)
+        self._last_region = key, (x, y, cols, rows)
+        return x, y, cols, rows
+
+    def view_around(self, pos, cols, rows):
+        """The cells ``(x, y, cols, rows)`` of a view of at most ``cols`` x
+        ``rows`` cells centred on ``pos``; an axis the view spans stays at
+        the world's origin."""
+        x = 0 if cols >= self.cols else (pos[0] // BLOCK_SIZE - cols // 2) % self.cols
+        y = 0 if rows >= self.rows else (pos[1] // BLOCK_SIZE - rows // 2) % self.rows
+        return x, y, min(cols, self.cols), min(rows, self.rows)
+
+    def chunks_in(self, x, y, cols, rows):
+        """Ids of the chunks overlapping the cells ``(x, y, cols, rows)``."""
+        size = self.chunk_size
+        return sorted({
+            cx * self.chunk_rows + cy
+            for cx, *_ in _spans(x, cols, self.cols, size)
+            for cy, *_ in _spans(y, rows, self.rows, size)
+        })
+
+    def in_region(self, pos, region):
+        x, y, cols, rows = region
+        return ((pos[0] // BLOCK_SIZE - x) % self.cols < cols
+                and (pos[1] // BLOCK_SIZE - y) % self.rows < rows)
+
+
+class OccupancyMask:
+    """Read-only ``in`` view over a set of layers, usable wherever a list of
+    blocked positions used to be passed."""
+
+    def __init__(self, grid, layers):
+        self.grid = grid
+        self.layers = list(layers)
+
+    def __contains__(self, pos):
+        return self.grid.occupied(pos, self.layers)
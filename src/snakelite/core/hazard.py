@@ -0,0 +1,119 @@
+import numpy as np
+from snakelite.settings import BLOCK_SIZE
+from snakelite.core.grid import _spans
+
+
+class HazardMap:
+    """When each cell of the grid's world stops burning, in milliseconds
+    (0 where nothing burns), laid out in the grid's chunks.
+
+    Explosions are stamped into it as whole arrays of cells, a cell
+    covered by several blasts keeping the latest end, so overlapping
+    waves cost the cells they cover rather than one entry per blast.
+    Whether the head is caught is one lookup.
+    """
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.chunks = {}
+        # Cells burning, across chunks
+        self.burning = 0
+
+    def clear(self):
+        self.chunks = {}
+        self.burning = 0
+
+    def snapshot(self):
+        return tuple((chunk_id, ends.tobytes()) for chunk_id, ends in self.chunks.items()), self.burning
+
+    def restore(self, state):
+        """Reload a snapshot, after the grid has been restored."""
+        chunks, self.burning = state
+        shape = self.grid._chunk_shape
+        self.chunks = {
+            chunk_id: np.frombuffer(bytearray(ends), dtype=np.int64).reshape(shape(chunk_id))
+            for chunk_id, ends in chunks
+        }
+
+    def end_at(self, pos):
+        grid = self.grid
+        size = grid.chunk_size
+        x, y = pos[0] // BLOCK_SIZE, pos[1] // BLOCK_SIZE
+        ends = self.chunks.get(x // size * grid.chunk_rows + y // size)
+        return 0 if ends is None else int(ends[x % size, y % size])
+
+    def ends_at(self, xs, ys):
+        """``end_at`` for every position in the pixel coordinate arrays."""
+        result = np.zeros(len(xs), dtype=np.int64)
+        for chunk_id, here, x, y in self.grid._by_chunk(xs, ys):
+            ends = self.chunks.get(chunk_id)
+            if ends is not None:
+                result[here] = ends[x, y]
+        return result
+
+    def region(self, x, y, cols, rows):
+        """End times over the ``cols`` x ``rows`` cells from cell ``(x,
+        y)``, wrapping, as ``OccupancyGrid.region`` reads counts."""
+        grid = self.grid
+        result = np.zeros((cols, rows), dtype=np.int64)
+        size = grid.chunk_size
+        for cx, chunk_x, out_x, width in _spans(x, cols, grid.cols, size):
+            for cy, chunk_y, out_y, height in _spans(y, rows, grid.rows, size):
+                ends = self.chunks.get(cx * grid.chunk_rows + cy)
+                if ends is not None:
+                    result[out_x:out_x + width, out_y:out_y + height] = \
+                        ends[chunk_x:chunk_x + width, chunk_y:chunk_y + height]
+        return result
+
+    def stamp(self, xs, ys, end):
+        """Burn the pixel positions ``xs, ys`` until ``end``, unless they
+        already burn longer. Returns the distinct positions and their end
+        times before the stamp as ``(xs, ys, before)``."""
+        grid = self.grid
+        xs, ys = np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64)
+        # Sorting and dropping repeats beats np.unique at blast sizes
+        keys = np.sort(xs // BLOCK_SIZE * grid.rows + ys // BLOCK_SIZE)
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        xs, ys = keys // grid.rows * BLOCK_SIZE, keys % grid.rows * BLOCK_SIZE
+        before = np.zeros(len(keys), dtype=np.int64)
+        for chunk_id, here, x, y in grid._by_chunk(xs, ys):
+            ends = self.chunks.get(chunk_id)
+            if ends is None:
+                ends = self.chunks[chunk_id] = np.zeros(grid._chunk_shape(chunk_id), dtype=np.int64)
+            old = before[here] = ends[x, y]
+            ends[x, y] = np.maximum(old, end)
+        self.burning += int(np.count_nonzero(before == 0))
+        # Longer burns show up in the grid's change record like new ones
+        if grid.changed is not None:
+            grid.changed.update(zip(xs.tolist(), ys.tolist()))
+        return xs, ys, before
+
+    def expire(self, xs, ys, end):
+        """Put out the positions whose burn ends at ``end`` (those a later
+        blast has not extended); returns them as ``(xs, ys)``."""
+        done = np.zeros(len(xs), dtype=bool)
+        index = np.arange(len(xs))
+        for chunk_id, here, x, y in self.grid._by_chunk(xs, ys):
+            ends = self.chunks.get(chunk_id)
+            if ends is None:
+                continue
+            out = ends[x, y] == end
+            ends[x[out], y[out]] = 0
+            done[index[here][out]] = True
+            if not ends.any():
+                del self.chunks[chunk_id]
+        self.burning -= int(np.count_nonzero(done))
+        return xs[done], ys[done]
+
+    def write(self, xs, ys, ends):
+        """Set the end times at the pixel positions outright, as a copy of
+        another map does."""
+        grid = self.grid
+        for chunk_id, here, x, y in grid._by_chunk(xs, ys):
+            chunk = self.chunks.get(chunk_id)
+            if chunk is None:
+                chunk = self.chunks[chunk_id] = np.zeros(grid._chunk_shape(chunk_id), dtype=np.int64)
+            self.burning += int(np.count_nonzero(ends[here])) - int(np.count_nonzero(chunk[x, y]))
+            chunk[x, y] = ends[here]
+            if not chunk.any():
+                del self.chunks[chunk_id]
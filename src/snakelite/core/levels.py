@@ -0,0 +1,327 @@
+"""Level files and their compiled binary cache.
+
+A level is a text file of ``key value...`` lines, then optionally ``map``
+followed by rows of ``.`` (open) and ``#`` (stone) cells:
+
+    # Two walls across the board
+    foods 5
+    food_types bomb slowdown
+    effect_chance 0.3
+    board 40 30
+    map
+    ........................................
+    .....##############################.....
+
+``foods`` is how many foods the level starts with, ``food_types`` the
+types each food is drawn from (uniformly; repeat a type to weight it),
+``effect_chance`` the chance that a moving or eaten food drops a bomb or
+slowdown, and ``board`` the board size in cells (the world size from the
+settings if left out). The map is centred on the board's centre, where the
+snake starts. Lines starting with ``#`` before the map are comments.
+
+Every ``*.level`` file of a directory, in file name order, compiles into
+one pack: a header, a fixed-size record per level, then each level's stones
+as a packed bit grid and as a table of cells, and its food type table. The
+pack is cached on disk, keyed by a hash of the sources' contents, and
+mapped into memory with ``mmap``, so loading any number of levels costs
+reading their sources, not parsing them.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from functools import lru_cache
+
+import numpy as np
+from snakelite.settings import BLOCK_SIZE, WORLD_COLS, WORLD_ROWS, LEVEL_DIR, LEVEL_CACHE_DIR
+
+MAGIC = b"SNKL"
+VERSION = 1
+# Magic, version, source hash, level count
+HEADER = struct.Struct("<4sB32sI")
+# Board cols and rows (0 for the world size), map cols and rows, foods,
+# food types, effect chance, then offsets into the pack: name (and its
+# length), stone table (and its length), packed stone grid, food types
+RECORD = struct.Struct("<6Hd6I")
+
+FOOD_TYPES = ("bomb", "slowdown")
+DEFAULT_EFFECT_CHANCE = 0.3
+STONE, OPEN = "#", "."
+# Cells of the snake's starting body, from its head, relative to the centre
+START_CELLS = ((0, 0), (-1, 0), (-2, 0))
+
+SHIPPED_LEVELS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "levels")
+
+
+class LevelError(ValueError):
+    pass
+
+
+def parse_level(text, name="<level>"):
+    """The fields of a level file: ``(board, foods, food_types,
+    effect_chance, grid)`` with ``grid`` a ``(cols, rows)`` bool array of
+    stones."""
+    board, foods, food_types, effect_chance = (0, 0), 1, FOOD_TYPES, DEFAULT_EFFECT_CHANCE
+    rows = None
+    for number, line in enumerate(text.splitlines(), start=1):
+        if rows is not None:
+            line = line.rstrip()
+            if line:
+                if set(line) - {STONE, OPEN}:
+                    raise LevelError(f"{name}:{number}: map rows may only hold '{STONE}' and '{OPEN}'")
+                if rows and len(line) != len(rows[0]):
+                    raise LevelError(f"{name}:{number}: map rows differ in length")
+                rows.append(line)
+            continue
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        key, *values = line.split()
+        if key == "map" and not values:
+            rows = []
+            continue
+        try:
+            if key == "foods" and len(values) == 1:
+                foods = int(values[0])
+            elif key == "food_types" and values:
+                food_types = tuple(values)
+            elif key == "effect_chance" and len(values) == 1:
+                effect_chance = float(values[0])
+            elif key == "board" and len(values) == 2:
+                board = (int(values[0]), int(values[1]))
+            else:
+                key = None
+        except ValueError:
+            raise LevelError(f"{name}:{number}: bad value in {line!r}") from None
+        if key is None:
+            raise LevelError(f"{name}:{number}: unknown setting {line!r}")
+
+    if not 0 <= foods < 2**16:
+        raise LevelError(f"{name}: foods must be between 0 and 65535")
+    unknown = set(food_types) - set(FOOD_TYPES)
+    if unknown:
+        raise LevelError(f"{name}: unknown food types {sorted(unknown)}, expected some of {FOOD_TYPES}")
+    if not 0 <= effect_chance <= 1:
+        raise LevelError(f"{name}: effect_chance must be between 0 and 1")
+    if not all(0 <= size < 2**16 for size in board) or (0 in board and board != (0, 0)):
+        raise LevelError(f"{name}: board must be two sizes between 1 and 65535")
+
+    grid = np.array([[cell == STONE for cell in row] for row in rows or []], dtype=bool).T
+    if grid.ndim != 2:
+        grid = np.zeros((0, 0), dtype=bool)
+    if board != (0, 0) and (grid.shape[0] > board[0] or grid.shape[1] > board[1]):
+        raise LevelError(f"{name}: the {grid.shape[0]}x{grid.shape[1]} map does not fit the board")
+    cols, rows = grid.shape
+    for dx, dy in START_CELLS:
+        x, y = cols // 2 + dx, rows // 2 + dy
+        if 0 <= x < cols and 0 <= y < rows and grid[x, y]:
+            raise LevelError(f"{name}: a stone lies under the snake's starting cells")
+    return board, foods, food_types, effect_chance, grid
+
+
+def source_hash(sources):
+    """Hash of the format version and every ``(name, text)`` source, in order."""
+    digest = hashlib.blake2b(bytes([VERSION]), digest_size=32)
+    for name, text in sources:
+        data = text.encode()
+        digest.update(f"{name}\0{len(data)}\0".encode())
+        digest.update(data)
+    return digest.digest()
+
+
+def _pad(out):
+    # Keep every table 8-byte aligned
+    out.extend(bytes(-len(out) % 8))
+
+
+def compile_pack(sources):
+    """The binary pack of the ``(name, text)`` level sources."""
+    parsed = [parse_level(text, name) for name, text in sources]
+    records = []
+    body = bytearray()
+    base = HEADER.size + RECORD.size * len(sources)
+    base += -base % 8
+    for (name, _), (board, foods, food_types, effect_chance, grid) in zip(sources, parsed):
+        name_offset = base + len(body)
+        name = name.encode()
+        body.extend(name)
+        _pad(body)
+        # Column by column, the order the stones are laid
+        stones = np.array(np.nonzero(grid), dtype=np.uint16).T
+        stones_offset = base + len(body)
+        body.extend(stones.tobytes())
+        _pad(body)
+        grid_offset = base + len(body)
+        body.extend(np.packbits(grid.ravel()).tobytes())
+        _pad(body)
+        types_offset = base + len(body)
+        body.extend(bytes(FOOD_TYPES.index(food_type) for food_type in food_types))
+        _pad(body)
+        records.append(RECORD.pack(
+            *board, *grid.shape, foods, len(food_types), effect_chance,
+            name_offset, len(name), stones_offset, len(stones), grid_offset, types_offset,
+        ))
+    out = bytearray(HEADER.pack(MAGIC, VERSION, source_hash(sources), len(sources)))
+    for record in records:
+        out.extend(record)
+    _pad(out)
+    out.extend(body)
+    return bytes(out)
+
+
+class Level:
+    """One level of a pack, read in place from the pack's buffer.
+
+    ``board`` is resolved to the world size when the level leaves it out,
+    so a level follows the settings it is played with.
+    """
+
+    def __init__(self, buffer, offset):
+        (cols, rows, map_cols, map_rows, self.foods, type_count, self.effect_chance,
+         name_offset, name_length, stones_offset, stone_count, grid_offset, types_offset) = \
+            RECORD.unpack_from(buffer, offset)
+        self.name = bytes(buffer[name_offset:name_offset + name_length]).decode()
+        self.board = (cols, rows) if cols else (WORLD_COLS, WORLD_ROWS)
+        self.map_size = (map_cols, map_rows)
+        if map_cols > self.board[0] or map_rows > self.board[1]:
+            raise LevelError(f"{self.name}: the {map_cols}x{map_rows} map does not fit the "
+                             f"{self.board[0]}x{self.board[1]} board")
+        # Stone cells of the map, as (x, y) rows
+        self.stones = np.frombuffer(buffer, dtype=np.uint16, count=2 * stone_count,
+                                    offset=stones_offset).reshape(stone_count, 2)
+        self._packed = np.frombuffer(buffer, dtype=np.uint8, count=-(-map_cols * map_rows // 8),
+                                     offset=grid_offset)
+        self.food_types = tuple(FOOD_TYPES[code] for code in buffer[types_offset:types_offset + type_count])
+
+    def __repr__(self):
+        return f"<Level {self.name} {self.board[0]}x{self.board[1]} foods={self.foods}>"
+
+    def origin(self):
+        """Board cell of the map's top left corner: the map's centre lies on
+        the board's."""
+        (cols, rows), (map_cols, map_rows) = self.board, self.map_size
+        return (cols // 2 - map_cols // 2) % cols, (rows // 2 - map_rows // 2) % rows
+
+    def stone_positions(self):
+        """Pixel positions of the stones on the board, column by column."""
+        (cols, rows), (x, y) = self.board, self.origin()
+        xs = (self.stones[:, 0].astype(np.int64) + x) % cols * BLOCK_SIZE
+        ys = (self.stones[:, 1].astype(np.int64) + y) % rows * BLOCK_SIZE
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def stone_grid(self):
+        """``(cols, rows)`` bool array of the stones on the whole board."""
+        (cols, rows), (x, y), (map_cols, map_rows) = self.board, self.origin(), self.map_size
+        stones = np.unpackbits(self._packed, count=map_cols * map_rows).astype(bool).reshape(map_cols, map_rows)
+        board = np.zeros((cols, rows), dtype=bool)
+        board[np.ix_((x + np.arange(map_cols)) % cols, (y + np.arange(map_rows)) % rows)] = stones
+        return board
+
+
+class LevelPack:
+    """The levels of a compiled pack, indexed from 0."""
+
+    def __init__(self, buffer):
+        magic, version, self.source_hash, count = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise LevelError("not a level pack of this version")
+        # Keeps an mmap alive for as long as the levels read from it
+        self.buffer = buffer
+        self.levels = [Level(buffer, HEADER.size + RECORD.size * i) for i in range(count)]
+
+    def __len__(self):
+        return len(self.levels)
+
+    def __getitem__(self, index):
+        return self.levels[index]
+
+    def __iter__(self):
+        return iter(self.levels)
+
+
+def read_sources(directory):
+    """``(name, text)`` of every level file in ``directory``, by name."""
+    names = sorted(name for name in os.listdir(directory) if name.endswith(".level"))
+    sources = []
+    for name in names:
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            sources.append((name, f.read()))
+    if not sources:
+        raise LevelError(f"no .level files in {directory}")
+    return sources
+
+
+def cache_path(directory, cache_dir=None):
+    """Where the pack compiled from ``directory`` is cached."""
+    if cache_dir is None:
+        cache_dir = LEVEL_CACHE_DIR
+    if cache_dir is None:
+        cache_dir = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "snakelite")
+    key = hashlib.blake2b(os.path.abspath(directory).encode(), digest_size=8).hexdigest()
+    return os.path.join(cache_dir, f"levels-{key}.bin")
+
+
+def _map_cache(path, expected_hash):
+    # The cached pack, mapped read-only, if it was built from these sources
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        pack = LevelPack(buffer)
+    except (LevelError, struct.error):
+        return None
+    return pack if pack.source_hash == expected_hash else None
+
+
+@lru_cache(maxsize=None)
+def load_levels(directory=None, cache_dir=None):
+    """The levels of ``directory`` (the shipped ones by default), from the
+    cache when it matches the sources' hash, else compiled and cached.
+
+    Loaded once per process; when the cache cannot be written the pack is
+    kept in memory instead.
+    """
+    directory = directory or LEVEL_DIR or SHIPPED_LEVELS
+    sources = read_sources(directory)
+    expected = source_hash(sources)
+    path = cache_path(directory, cache_dir)
+    pack = _map_cache(path, expected)
+    if pack is not None:
+        return pack
+    data = compile_pack(sources)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written aside and renamed, so a concurrent loader never maps a
+        # half-written pack
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            f.write(data)
+        os.replace(partial, path)
+    except OSError:
+        return LevelPack(data)
+    return _map_cache(path, expected) or LevelPack(data)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Compile a directory of snakelite levels and list them")
+    parser.add_argument("directory", nargs="?", help="level files to compile (default: the shipped levels)")
+    parser.add_argument("--cache-dir", help="where to cache the compiled pack")
+    args = parser.parse_args(argv)
+    try:
+        levels = load_levels(args.directory, args.cache_dir)
+    except (LevelError, OSError) as error:
+        print(error, file=sys.stderr)
+        return 1
+    print(cache_path(args.directory or LEVEL_DIR or SHIPPED_LEVELS, args.cache_dir))
+    for number, level in enumerate(levels, start=1):
+        print(f"{number:>4} {level.name:<24} {level.board[0]}x{level.board[1]} foods {level.foods:<3} "
+              f"stones {len(level.stones):<5} {' '.join(level.food_types)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import time
+from collections import deque
+
+from snakelite.settings import PROFILE_WINDOW, PROFILE_REFRESH
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class StageProfiler:
+    """Rolling per-stage timings for the live game loop.
+
+    ``wrap`` returns a timed version of a callable; ``SnakeGame`` swaps its
+    tick stages for wrapped ones only while a profiler is attached, so an
+    unprofiled game runs exactly the code it always did. Each stage keeps
+    its last ``window`` durations, from which ``summary`` derives rolling
+    percentiles.
+    """
+
+    def __init__(self, export_path=None, window=PROFILE_WINDOW, refresh=PROFILE_REFRESH):
+        self.export_path = export_path
+        self.window = window
+        self.refresh = refresh
+        self.samples = {}
+        self.overlay = False
+        self.frames = 0
+        self._lines = []
+
+    def wrap(self, name, fn):
+        samples = self.samples.setdefault(name, deque(maxlen=self.window))
+        clock = time.perf_counter
+
+        def timed():
+            start = clock()
+            result = fn()
+            samples.append(clock() - start)
+            return result
+        return timed
+
+    def instrument(self, stages):
+        return tuple((name, self.wrap(name, fn)) for name, fn in stages)
+
+    def end_frame(self):
+        self.frames += 1
+        if self.overlay and self.frames % self.refresh == 0:
+            self._lines = None
+
+    def summary(self):
+        """``{stage: {"count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}}``
+        over each stage's rolling window."""
+        stats = {}
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            stats[name] = {
+                "count": len(ordered),
+                "mean_ms": sum(ordered) / len(ordered) * 1000,
+                "p50_ms": percentile(ordered, 0.50) * 1000,
+                "p95_ms": percentile(ordered, 0.95) * 1000,
+                "p99_ms": percentile(ordered, 0.99) * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+        return stats
+
+    def overlay_lines(self):
+        """Text for the frame-time overlay, rebuilt every ``refresh`` frames
+        so the rendered lines stay cached in between."""
+        if not self._lines:
+            self._lines = ["stage              p50    p95    p99 ms"]
+            for name, s in self.summary().items():
+                self._lines.append(f"{name[:16]:<16} {s['p50_ms']:6.2f} {s['p95_ms']:6.2f} {s['p99_ms']:6.2f}")
+        return self._lines
+
+    def export(self, path=None):
+        import json
+        path = path or self.export_path
+        with open(path, "w") as f:
+            json.dump({"window": self.window, "frames": self.frames, "stages": self.summary()}, f, indent=2)
@@ -0,0 +1,172 @@
+import struct
+import sys
+
+from snakelite.settings import UP, DOWN, LEFT, RIGHT
+from snakelite.core.levels import load_levels
+
+# File layout: header (magic, version, seed and the source hash of the level
+# pack played), then a stream of one-byte opcodes. Runs of simulated ticks
+# are a single TICKS opcode followed by the run length as a LEB128 varint;
+# every other opcode is a command applied between ticks.
+MAGIC = b"SNKR"
+VERSION = 2
+LEVEL_HASH_SIZE = 32
+HEADER = struct.Struct(f"<4sBQ{LEVEL_HASH_SIZE}s")
+
+TICKS = 0
+COMMANDS = (
+    "up", "down", "left", "right", "fire",
+    "start", "begin_level", "next_level", "restart", "open_shop", "buy_shield", "new_run",
+)
+OPCODES = {name: op for op, name in enumerate(COMMANDS, start=1)}
+DIRECTIONS = {UP: "up", DOWN: "down", LEFT: "left", RIGHT: "right"}
+TURNS = {name: direction for direction, name in DIRECTIONS.items()}
+
+
+class ReplayError(ValueError):
+    pass
+
+
+def _write_varint(out, value):
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(stream):
+    value = shift = 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            raise ReplayError("replay truncated inside a tick count")
+        value |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+
+class ReplayRecorder:
+    """Streams a game's seed, level pack hash, commands and ticks to a
+    binary file.
+
+    Attach with ``game.recorder = ReplayRecorder(path, game.seed,
+    game.levels.source_hash)`` before the first command. Ticks are counted and written as one run when the
+    next command arrives, so a long stretch of play without input costs a
+    few bytes. Everything is flushed on ``close``.
+    """
+
+    def __init__(self, target, seed, level_hash):
+        if not 0 <= seed < 2**64:
+            raise ReplayError(f"seed {seed} does not fit the replay header")
+        if len(level_hash) != LEVEL_HASH_SIZE:
+            raise ReplayError("level hash does not fit the replay header")
+        self._owns_file = isinstance(target, (str, bytes)) or hasattr(target, "__fspath__")
+        self.file = open(target, "wb") if self._owns_file else target
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, level_hash))
+        self.pending_ticks = 0
+
+    def tick(self):
+        self.pending_ticks += 1
+
+    def record(self, command):
+        out = bytearray()
+        self._flush_ticks(out)
+        out.append(OPCODES[command])
+        self.file.write(out)
+
+    def _flush_ticks(self, out):
+        if self.pending_ticks:
+            out.append(TICKS)
+            _write_varint(out, self.pending_ticks)
+            self.pending_ticks = 0
+
+    def close(self):
+        if self.file is None:
+            return
+        out = bytearray()
+        self._flush_ticks(out)
+        self.file.write(out)
+        self.file.flush()
+        if self._owns_file:
+            self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_header(stream):
+    """``(seed, level_hash)`` of an open replay, leaving it just past its
+    header."""
+    header = stream.read(HEADER.size)
+    if len(header) != HEADER.size:
+        raise ReplayError("replay header truncated")
+    magic, version, seed, level_hash = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ReplayError("not a snakelite replay")
+    if version != VERSION:
+        raise ReplayError(f"unsupported replay version {version}")
+    return seed, level_hash
+
+
+def read_events(stream):
+    """Yield ``("ticks", count)`` or ``(command, None)`` from an open replay
+    positioned just past its header."""
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            return
+        op = byte[0]
+        if op == TICKS:
+            yield "ticks", _read_varint(stream)
+        elif op <= len(COMMANDS):
+            yield COMMANDS[op - 1], None
+        else:
+            raise ReplayError(f"unknown replay opcode {op}")
+
+
+def play(source, levels=None):
+    """Re-simulate a recorded run headlessly and return the final game.
+
+    ``levels`` (a level pack, by default ``load_levels()``) must be the pack
+    the run was recorded on; any other would silently play a different
+    game, so it is rejected.
+    """
+    from snakelite.entities.player.snake import SnakeGame
+
+    if levels is None:
+        levels = load_levels()
+    owns_file = not hasattr(source, "read")
+    stream = open(source, "rb") if owns_file else source
+    try:
+        seed, level_hash = read_header(stream)
+        if level_hash != levels.source_hash:
+            raise ReplayError("replay was recorded on different levels")
+        game = SnakeGame(seed=seed, levels=levels)
+        for command, count in read_events(stream):
+            if command == "ticks":
+                for _ in range(count):
+                    game.step()
+            elif command in TURNS:
+                game.turn(TURNS[command])
+            else:
+                getattr(game, command)()
+    finally:
+        if owns_file:
+            stream.close()
+    return game
+
+
+def main(argv=None):
+    """Print the final level, score and coins of each replay file given."""
+    for path in (sys.argv[1:] if argv is None else argv):
+        game = play(path)
+        print(f"{path}\tlevel={game.current_level}\tscore={game.score}\tcoins={game.coins}\tstate={game.game_state}")
+
+
+if __name__ == "__main__":
+    main()
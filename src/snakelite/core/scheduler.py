@@ -0,0 +1,67 @@
+import heapq
+
+
+class Scheduler:
+    """Pending expirations, kept in one min-heap per event kind.
+
+    ``schedule`` returns a timer id that callers use to key whatever they
+    track the timed item in. ``run(kind, now)`` pops every due timer of that
+    kind and calls its handler once with the ``(timer_id, item)`` pairs in
+    due order, so a tick's cost grows with the timers that fire, not with
+    how many are pending, and a handler can treat a wave as one batch. Each
+    system drains its own kinds at its usual point in the tick, which keeps
+    the order of a tick's effects unchanged.
+
+    Cancelling is lazy: the id is remembered and skipped when it comes due.
+    Items should be plain values (tuples, times) so the queues can be copied
+    as they are.
+    """
+
+    def __init__(self):
+        self.queues = {}
+        self.handlers = {}
+        self.cancelled = set()
+        self.next_id = 0
+
+    def on(self, kind, handler):
+        self.handlers[kind] = handler
+        self.queues.setdefault(kind, [])
+
+    def schedule(self, kind, due, item):
+        timer_id = self.next_id
+        self.next_id += 1
+        heapq.heappush(self.queues[kind], (due, timer_id, item))
+        return timer_id
+
+    def cancel(self, timer_id):
+        self.cancelled.add(timer_id)
+
+    def run(self, kind, now):
+        queue = self.queues[kind]
+        if not queue or queue[0][0] > now:
+            return
+        cancelled = self.cancelled
+        due = []
+        while queue and queue[0][0] <= now:
+            _, timer_id, item = heapq.heappop(queue)
+            if timer_id in cancelled:
+                cancelled.discard(timer_id)
+            else:
+                due.append((timer_id, item))
+        if due:
+            self.handlers[kind](due)
+
+    def snapshot(self):
+        return {kind: queue[:] for kind, queue in self.queues.items()}, set(self.cancelled), self.next_id
+
+    def restore(self, state):
+        queues, cancelled, self.next_id = state
+        for kind, queue in queues.items():
+            self.queues[kind] = queue[:]
+        self.cancelled = set(cancelled)
+
+    def clear(self, kind):
+        queue = self.queues[kind]
+        if self.cancelled:
+            self.cancelled.difference_update(timer_id for _, timer_id, _ in queue)
+        queue.clear()
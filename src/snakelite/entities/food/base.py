@@ -1,46 +1,56 @@
-import pygame
-import random
-from snakelite.settings import *
+from snakelite.settings import BLOCK_SIZE, FOOD_MOVE_INTERVAL, UP, DOWN, LEFT, RIGHT
 
 class FoodEnemy:
-    def __init__(self, x, y, food_type):
+    def __init__(self, x, y, food_type, current_time, rng):
         self.position = (x, y)
-        self.last_move_time = pygame.time.get_ticks()
+        self.rng = rng
+        self.last_move_time = current_time
         self.active_effects = []
-        self.creation_time = pygame.time.get_ticks()
+        self.creation_time = current_time
         self.eaten_remaining = 5
         self.food_type = food_type
 
+    def snapshot(self):
+        state = {name: value[:] if isinstance(value, list) else value for name, value in vars(self).items()}
+        del state["rng"]
+        return type(self), state
+
+    @staticmethod
+    def from_snapshot(snapshot, rng):
+        cls, state = snapshot
+        food = cls.__new__(cls)
+        food.__dict__.update({name: value[:] if isinstance(value, list) else value for name, value in state.items()})
+        food.rng = rng
+        return food
+
     @classmethod
-    def generate(cls, existing_positions, food_type):
-        while True:
-            x = random.randint(0, (WIDTH - BLOCK_SIZE) // BLOCK_SIZE) * BLOCK_SIZE
-            y = random.randint(0, (HEIGHT - BLOCK_SIZE) // BLOCK_SIZE) * BLOCK_SIZE
-            if (x, y) not in existing_positions:
-                return cls(x, y, food_type)
-            break
-
-    def move(self, head_position, blocked_positions):
-        current_time = pygame.time.get_ticks()
+    def generate(cls, grid, food_type, current_time, rng, chunks=None):
+        position = grid.random_free(rng, chunks)
+        if position is None:
+            return None
+        return cls(*position, food_type, current_time, rng)
+
+    def create_bomb(self, current_time):
+        radius = 3  # Default radius
+        return (self.position[0], self.position[1], current_time, radius)
+
+    def create_slowdown(self, current_time):
+        return (self.position[0], self.position[1], current_time)
+
+    def move(self, distance_field, blocked_positions, current_time):
+        """Step to the free neighbouring cell farthest from the snake's head,
+        measured by ``distance_field``."""
         if current_time - self.last_move_time >= FOOD_MOVE_INTERVAL:
             current_x, current_y = self.position
-            head_x, head_y = head_position
-            
-            valid_directions = []
+            grid = distance_field.grid
+
+            valid_positions = []
             for direction in [UP, DOWN, LEFT, RIGHT]:
-                new_x = (current_x + direction[0] * BLOCK_SIZE) % WIDTH
-                new_y = (current_y + direction[1] * BLOCK_SIZE) % HEIGHT
+                new_x = (current_x + direction[0] * BLOCK_SIZE) % grid.width
+                new_y = (current_y + direction[1] * BLOCK_SIZE) % grid.height
                 if (new_x, new_y) not in blocked_positions:
-                    valid_directions.append(direction)
-            
-            if valid_directions:
-                best_dir = max(
-                    valid_directions,
-                    key=lambda d: ((current_x + d[0]*BLOCK_SIZE - head_x) % WIDTH)**2 +
-                             ((current_y + d[1]*BLOCK_SIZE - head_y) % HEIGHT)**2
-                )
-                
-                new_x = (current_x + best_dir[0] * BLOCK_SIZE) % WIDTH
-                new_y = (current_y + best_dir[1] * BLOCK_SIZE) % HEIGHT
-                self.position = (new_x, new_y)
-                self.last_move_time = current_time 
\ No newline at end of file
+                    valid_positions.append((new_x, new_y))
+
+            if valid_positions:
+                self.position = max(valid_positions, key=distance_field.distance)
+                self.last_move_time = current_time
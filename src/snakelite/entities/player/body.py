@@ -0,0 +1,97 @@
+from itertools import chain, islice
+
+from snakelite.core.grid import LAYER_SNAKE
+
+# Segments preallocated; a board no larger than this never grows the buffer
+INITIAL_CAPACITY = 4096
+
+
+class SnakeBody:
+    """The snake's segments, head first, in a preallocated ring buffer.
+
+    Growing at the head and shrinking at the tail only move an index, and
+    each change is mirrored into the occupancy grid's snake layer, which
+    answers ``pos in body`` with one lookup. Indexing, iteration and slices
+    behave like the list this replaces.
+    """
+
+    def __init__(self, grid, capacity=None):
+        self.grid = grid
+        capacity = capacity or min(grid.cols * grid.rows, INITIAL_CAPACITY)
+        self.cells = [None] * capacity
+        self.start = 0
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def __contains__(self, pos):
+        return bool(self.grid.count(LAYER_SNAKE, pos))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("snake segment index out of range")
+        return self.cells[(self.start + index) % len(self.cells)]
+
+    def __iter__(self):
+        cells, start, end = self.cells, self.start, self.start + self.length
+        if end <= len(cells):
+            return islice(cells, start, end)
+        return chain(islice(cells, start, None), islice(cells, 0, end - len(cells)))
+
+    def __repr__(self):
+        return f"SnakeBody({list(self)!r})"
+
+    def snapshot(self):
+        return tuple(self)
+
+    def restore(self, segments):
+        """Put the segments back as they were; the grid's snake layer is
+        restored with the rest of the grid."""
+        if len(segments) > len(self.cells):
+            self.cells = [None] * len(segments)
+        # Slots past the tail are never read, so they can keep old cells
+        self.cells[:len(segments)] = segments
+        self.start = 0
+        self.length = len(segments)
+
+    def push_head(self, pos):
+        if self.length == len(self.cells):
+            self._grow()
+        self.start = (self.start - 1) % len(self.cells)
+        self.cells[self.start] = pos
+        self.length += 1
+        self.grid.add(LAYER_SNAKE, pos)
+
+    def pop_tail(self):
+        self.length -= 1
+        index = (self.start + self.length) % len(self.cells)
+        pos = self.cells[index]
+        self.cells[index] = None
+        self.grid.remove(LAYER_SNAKE, pos)
+        return pos
+
+    def extend(self, segments):
+        """Append ``segments`` behind the current tail."""
+        for pos in segments:
+            if self.length == len(self.cells):
+                self._grow()
+            self.cells[(self.start + self.length) % len(self.cells)] = pos
+            self.length += 1
+            self.grid.add(LAYER_SNAKE, pos)
+
+    def clear(self):
+        """Drop every segment, taking them off the grid as well."""
+        while self.length:
+            self.pop_tail()
+        self.start = 0
+
+    def _grow(self):
+        # Doubles, so a snake outgrowing the first buffer on a big board
+        # copies its segments a handful of times at most
+        self.cells = list(self) + [None] * len(self.cells)
+        self.start = 0
@@ -1,52 +1,111 @@
-import os
-import sys
-import pygame
 import random
-from snakelite.settings import *
+from functools import partial
+from operator import attrgetter
+import numpy as np
+from snakelite.settings import (
+    BLOCK_SIZE, BASE_SPEED, SLOW_DURATION, SLOWDOWN_LIFETIME, BOMB_DURATION,
+    POWERUP_EFFECT_DURATION, PROJECTILE_LIFETIME, SHIELD_PRICE, DISPLAY_FPS, MAX_FRAME_TIME,
+    AUTOPILOT_BUDGET_MS, UP, DOWN, LEFT, RIGHT,
+)
+from snakelite.core.clock import TickClock
+from snakelite.core.distance_field import DistanceField
+from snakelite.core.entity_store import EntityStore
+from snakelite.core.hazard import HazardMap
+from snakelite.core.grid import (
+    OccupancyGrid, LAYER_STONE, LAYER_FOOD, LAYER_BOMB, LAYER_SLOWDOWN, LAYER_POWERUP,
+)
+from snakelite.core.levels import load_levels
+from snakelite.core.profiler import StageProfiler
+from snakelite.core.replay import DIRECTIONS as DIRECTION_NAMES, ReplayRecorder
+from snakelite.core.scheduler import Scheduler
+from snakelite.envs import observation
+from snakelite.systems.autopilot import Autopilot
 from snakelite.systems.combat import CombatSystem
-from snakelite.ui.renderer import GameRenderer
+from snakelite.entities.player.body import SnakeBody
+from snakelite.entities.food.base import FoodEnemy
 from snakelite.entities.food.bomb_food import BombFood
 from snakelite.entities.food.slowdown_food import SlowdownFood
 
-# Initialize Pygame
-pygame.init()
+FOOD_KINDS = {"bomb": BombFood, "slowdown": SlowdownFood}
 
-# Directions
-UP = (0, -1)
-DOWN = (0, 1)
-LEFT = (-1, 0)
-RIGHT = (1, 0)
+# Columns of the map entity stores
+STORE_COLUMNS = {
+    "bombs": dict(x=np.int32, y=np.int32, t=np.int64, radius=np.int16, timer=np.int64),
+    "slowdown_elements": dict(x=np.int32, y=np.int32, t=np.int64, timer=np.int64),
+    "powerups": dict(x=np.int32, y=np.int32, t=np.int64, timer=np.int64),
+    "projectiles": dict(x=np.int32, y=np.int32, dx=np.int8, dy=np.int8, t=np.int64, timer=np.int64),
+}
+
+# Plain values that make up the rest of a snapshot
+SNAPSHOT_FIELDS = (
+    "direction", "score", "game_over", "game_state", "current_speed", "current_level", "level",
+    "shield_count", "coins", "death_reason", "moved", "last_tail",
+)
+_snapshot_fields = attrgetter(*SNAPSHOT_FIELDS)
 
 class SnakeGame:
-    def __init__(self):
-        self.renderer = GameRenderer(self)
-        self.clock = pygame.time.Clock()
+    def __init__(self, clock=None, seed=None, levels=None):
+        self.clock = clock if clock is not None else TickClock()
+        # Always run from a known seed so any game can be recorded
+        self.seed = seed if seed is not None else random.randrange(2**64)
+        self.rng = random.Random(self.seed)
+        self.renderer = None
+        self.recorder = None
+        self.profiler = None
+        # Set to an Autopilot to have it steer instead of the keyboard
+        self.autopilot = None
+        # Fraction of the next tick that has elapsed when a frame is drawn
+        self.frame_alpha = 1.0
+        self.grid = OccupancyGrid()
+        self.distance_field = DistanceField(self.grid)
+        # When each burning cell's explosion ends
+        self.hazards = HazardMap(self.grid)
+        self.snake = SnakeBody(self.grid)
+        # Other snakes on the board, drawn but not played (arena clients)
+        self.rivals = ()
         self.combat_system = CombatSystem()
-        self.max_level = 3
+        combat = self.combat_system
+        # Map entities live in columnar stores, the cancellable ones with the
+        # id of their expiry timer; effect buffs are dicts keyed by theirs
+        for name, columns in STORE_COLUMNS.items():
+            setattr(self, name, EntityStore(**columns))
+        self.scheduler = Scheduler()
+        self.scheduler.on("bomb", partial(combat.explode_bombs, self))
+        self.scheduler.on("explosion", partial(combat.end_explosions, self))
+        self.scheduler.on("slowdown", partial(combat.expire_slowdowns, self))
+        self.scheduler.on("slow_effect", partial(combat.end_slow_effects, self))
+        self.scheduler.on("powerup", self.expire_powerups)
+        self.scheduler.on("powerup_effect", self.end_powerup_effects)
+        self.scheduler.on("projectile", self.expire_projectiles)
+        # One simulation tick, in order; step() runs these and the
+        # benchmarks time them one by one
+        self.stages = (
+            ("move_food", self.move_food),
+            ("update_bombs", partial(combat.update_bombs, self)),
+            ("check_explosion_collision", partial(combat.check_explosion_collision, self)),
+            ("update_explosions", partial(combat.update_explosions, self)),
+            ("update_slowdowns", partial(combat.update_slowdowns, self)),
+            ("update_powerups", self.update_powerups),
+            ("update_projectiles", self.update_projectiles),
+            ("move", self.move),
+        )
+        # Compiled levels, shared by every game in the process
+        self.levels = levels if levels is not None else load_levels()
+        self.max_level = len(self.levels)
         self.next_run_powerups = []
         self.coins = 0
         self.death_reason = ""
         self.reset_game()
 
     def reset_game(self):
-        self.snake = [
-            (WIDTH // 2, HEIGHT // 2),
-            (WIDTH // 2 - BLOCK_SIZE, HEIGHT // 2),
-            (WIDTH // 2 - 2 * BLOCK_SIZE, HEIGHT // 2),
-        ]
         self.direction = RIGHT
         self.foods = []
-        self.stone_blocks = []
-        self.slowdown_elements = []
-        self.bombs = []
-        self.affected_blocks = []
+        self.stone_blocks = set()
         self.score = 0
         self.game_over = False
         self.current_speed = BASE_SPEED
-        self.active_slowdowns = []
-        self.powerups = []
-        self.active_powerups = []
-        self.projectiles = []
+        self.powerups.clear()
+        self.scheduler.clear("powerup")
         self.current_level = 1
         self.shield_count = self.next_run_powerups.count('shield')
         self.next_run_powerups = []
@@ -55,115 +114,177 @@ class SnakeGame:
         self.setup_level()
 
     def setup_level(self):
-        self.snake = [
-            (WIDTH // 2, HEIGHT // 2),
-            (WIDTH // 2 - BLOCK_SIZE, HEIGHT // 2),
-            (WIDTH // 2 - 2 * BLOCK_SIZE, HEIGHT // 2),
-        ]
+        self.snake.clear()
         self.direction = RIGHT
         self.foods = []
-        self.stone_blocks = []
-        self.bombs = []
-        self.slowdown_elements = []
-        self.active_slowdowns = []
-        self.active_powerups = []
-        self.projectiles = []
-        self.affected_blocks = []
+        self.stone_blocks = set()
+        for store in (self.bombs, self.slowdown_elements, self.projectiles):
+            store.clear()
+        self.active_slowdowns = {}
+        self.active_powerups = {}
+        # Powerups on the map outlast the level; everything else goes
+        for kind in ("bomb", "explosion", "slowdown", "slow_effect", "powerup_effect", "projectile"):
+            self.scheduler.clear(kind)
         self.game_over = False
+        # Whether the last tick shifted the snake, and the tail cell it left
+        self.moved = False
+        self.last_tail = None
+
+        level = self.level = self.levels[self.current_level - 1]
+        if level.board != (self.grid.cols, self.grid.rows):
+            self.grid.resize(*level.board)
+        else:
+            self.grid.clear()
+        self.hazards.clear()
+        # Start in the middle of the board, where the level's map is centred
+        center_x = self.grid.cols // 2 * BLOCK_SIZE
+        center_y = self.grid.rows // 2 * BLOCK_SIZE
+        self.snake.extend([
+            (center_x, center_y),
+            (center_x - BLOCK_SIZE, center_y),
+            (center_x - 2 * BLOCK_SIZE, center_y),
+        ])
+        live = self.powerups.live()
+        self.grid.add_many(LAYER_POWERUP, self.powerups.x[live], self.powerups.y[live])
 
-        if self.current_level == 1:
-            num_foods = 1
-        elif self.current_level == 2:
-            num_foods = 3
-        elif self.current_level == 3:
-            num_foods = 5
-            for x in range(BLOCK_SIZE*5, WIDTH-BLOCK_SIZE*5, BLOCK_SIZE):
-                self.stone_blocks.append((x, HEIGHT//3))
-                self.stone_blocks.append((x, HEIGHT//3*2))
+        self.stone_blocks = set(level.stone_positions())
+        for block in self.stone_blocks:
+            self.grid.add(LAYER_STONE, block)
 
-        for _ in range(num_foods):
-            self.foods.append(self.generate_food())
+        for _ in range(level.foods):
+            food = self.generate_food()
+            if food is not None:
+                self.foods.append(food)
+                self.grid.add(LAYER_FOOD, food.position)
+
+    def active_region(self):
+        """The cells ``(x, y, cols, rows)`` of the chunks around the head,
+        the only part of the world where foods move and spawn."""
+        return self.grid.region_around(self.snake[0])
+
+    def active_chunks(self):
+        return self.grid.chunks_in(*self.active_region())
 
     def generate_food(self):
-        existing = [f.position for f in self.foods] + self.stone_blocks + self.snake + \
-                  [bomb[:2] for bomb in self.bombs] + \
-                  [slow[:2] for slow in self.slowdown_elements] + \
-                  [pwr[:2] for pwr in self.powerups]
-        
-        # Randomly choose between bomb and slowdown food
-        food_type = random.choice(['bomb', 'slowdown'])
-        
-        # Generate new position until we find one that's not blocked
-        while True:
-            x = random.randint(0, (WIDTH - BLOCK_SIZE) // BLOCK_SIZE) * BLOCK_SIZE
-            y = random.randint(0, (HEIGHT - BLOCK_SIZE) // BLOCK_SIZE) * BLOCK_SIZE
-            pos = (x, y)
-            if pos not in existing:
-                if food_type == 'bomb':
-                    return BombFood.generate(existing, food_type)
-                else:
-                    return SlowdownFood.generate(existing, food_type)
+        # Randomly choose among the level's food types
+        food_type = self.rng.choice(self.level.food_types)
+        return FOOD_KINDS[food_type].generate(self.grid, food_type, self.clock.now(), self.rng, self.active_chunks())
 
     def move_food(self):
-        current_time = pygame.time.get_ticks()
+        current_time = self.clock.now()
+        # Other foods are the only FOOD entries a neighbour cell can hold
+        blocked = self.grid.mask(LAYER_STONE, LAYER_BOMB, LAYER_SLOWDOWN, LAYER_POWERUP, LAYER_FOOD)
+        head = self.snake[0]
+        active = self.grid.region_around(head)
+        self.distance_field.track(head, active)
+        everywhere = active[2] == self.grid.cols and active[3] == self.grid.rows
+        effect_chance = self.level.effect_chance
         for food in self.foods:
-            # Collect all blocked positions
-            blocked = self.stone_blocks + \
-                     [bomb[:2] for bomb in self.bombs] + \
-                     [slow[:2] for slow in self.slowdown_elements] + \
-                     [pwr[:2] for pwr in self.powerups] + \
-                     [f.position for f in self.foods if f != food]
-            
-            new_food = food.move(self.snake[0], blocked)
+            # Foods far from the snake wait until it comes near
+            if not everywhere and not self.grid.in_region(food.position, active):
+                continue
+            old_position = food.position
+            new_food = food.move(self.distance_field, blocked, current_time)
+            if food.position != old_position:
+                self.grid.move(LAYER_FOOD, old_position, food.position)
             if new_food:
                 self.foods.append(new_food)
+                self.grid.add(LAYER_FOOD, new_food.position)
 
             # Handle bomb/slowdown creation
-            if random.random() < 0.3:
-                existing_positions = [f.position for f in self.foods] + \
-                                  self.stone_blocks + \
-                                  [bomb[:2] for bomb in self.bombs] + \
-                                  [slow[:2] for slow in self.slowdown_elements] + \
-                                  [pwr[:2] for pwr in self.powerups]
-                
+            if self.rng.random() < effect_chance:
                 if isinstance(food, BombFood):
                     if bomb := food.create_bomb(current_time):
-                        food.active_bombs.append(bomb)
-                        self.bombs.append(bomb)
+                        self.add_bomb(bomb)
                 elif isinstance(food, SlowdownFood):
                     if slowdown := food.create_slowdown(current_time):
-                        food.active_slowdowns.append(slowdown)
-                        self.slowdown_elements.append(slowdown)
+                        self.add_slowdown(slowdown)
+
+    def add_timed(self, collection, kind, due, item):
+        """Store ``item`` in ``collection`` under a new ``kind`` timer due at ``due``."""
+        timer_id = self.scheduler.schedule(kind, due, item)
+        collection[timer_id] = item
+        return timer_id
+
+    def add_expiring(self, store, kind, due, **values):
+        """Add an entity to ``store`` that a new ``kind`` timer removes at ``due``."""
+        entity_id = store.add(**values)
+        store.timer[store.slot(entity_id)] = self.scheduler.schedule(kind, due, entity_id)
+        return entity_id
+
+    def remove_expiring(self, store, slots):
+        """Take the entities in ``slots`` out of ``store`` before they expire."""
+        for timer_id in store.timer[slots].tolist():
+            self.scheduler.cancel(timer_id)
+        store.remove_slots(slots)
+
+    def add_bomb(self, bomb):
+        x, y, t, radius = bomb
+        self.add_expiring(self.bombs, "bomb", t + BOMB_DURATION, x=x, y=y, t=t, radius=radius)
+        self.grid.add(LAYER_BOMB, (x, y))
+
+    def add_slowdown(self, slowdown):
+        x, y, t = slowdown
+        self.add_expiring(self.slowdown_elements, "slowdown", t + SLOWDOWN_LIFETIME, x=x, y=y, t=t)
+        self.grid.add(LAYER_SLOWDOWN, (x, y))
 
-            # Update active effects
-            if isinstance(food, BombFood):
-                food.active_bombs = [b for b in food.active_bombs if current_time - b[2] < BOMB_DURATION]
-            elif isinstance(food, SlowdownFood):
-                food.active_slowdowns = [s for s in food.active_slowdowns if current_time - s[2] < 5000]
+    def entities_at(self, store, pos):
+        """Slots of the live entities of ``store`` standing on ``pos``."""
+        return np.flatnonzero(store.alive & (store.x == pos[0]) & (store.y == pos[1]))
 
     def update_powerups(self):
-        current_time = pygame.time.get_ticks()
-        self.powerups = [p for p in self.powerups if current_time - p[2] < POWERUP_DURATION_ON_MAP]
-        self.active_powerups = [t for t in self.active_powerups if t > current_time]
+        current_time = self.clock.now()
+        self.scheduler.run("powerup", current_time)
+        self.scheduler.run("powerup_effect", current_time)
+
+    def expire_powerups(self, due):
+        slots = self.powerups.slots([powerup_id for _, powerup_id in due])
+        self.grid.remove_many(LAYER_POWERUP, self.powerups.x[slots], self.powerups.y[slots])
+        self.powerups.remove_slots(slots)
+
+    def end_powerup_effects(self, due):
+        for timer_id, _ in due:
+            del self.active_powerups[timer_id]
 
     def update_projectiles(self):
-        current_time = pygame.time.get_ticks()
-        new_projectiles = []
-        for proj in self.projectiles:
-            x, y, direction, t = proj
-            if current_time - t > PROJECTILE_LIFETIME:
-                continue
-            dx, dy = direction
-            new_x = (x + dx * BLOCK_SIZE) % WIDTH
-            new_y = (y + dy * BLOCK_SIZE) % HEIGHT
-            if (new_x, new_y) in self.stone_blocks:
-                self.stone_blocks.remove((new_x, new_y))
+        self.scheduler.run("projectile", self.clock.now())
+        shots = self.projectiles
+        if not len(shots):
+            return
+        slots = shots.live()
+        xs = (shots.x[slots] + shots.dx[slots] * BLOCK_SIZE) % self.grid.width
+        ys = (shots.y[slots] + shots.dy[slots] * BLOCK_SIZE) % self.grid.height
+        shots.x[slots] = xs
+        shots.y[slots] = ys
+        hit = self.grid.counts(LAYER_STONE, xs, ys) > 0
+        if not hit.any():
+            return
+        # Shots reaching one stone together: the oldest breaks it and the
+        # rest fly on
+        hits = slots[hit]
+        spent = []
+        for slot in hits[np.argsort(shots.timer[hits])].tolist():
+            pos = (int(shots.x[slot]), int(shots.y[slot]))
+            if self.grid.count(LAYER_STONE, pos):
+                self.stone_blocks.discard(pos)
+                self.grid.remove(LAYER_STONE, pos)
                 self.score += 1
-                continue
-            new_projectiles.append((new_x, new_y, direction, t))
-        self.projectiles = new_projectiles
+                spent.append(slot)
+        self.remove_expiring(shots, spent)
+
+    def expire_projectiles(self, due):
+        self.projectiles.remove_slots(self.projectiles.slots([shot_id for _, shot_id in due]))
+
+    def food_at(self, position):
+        if not self.grid.count(LAYER_FOOD, position):
+            return None
+        for food in self.foods:
+            if food.position == position:
+                return food
+        return None
 
     def move(self):
+        self.moved = False
         if self.game_over or self.game_state != "playing":
             return
 
@@ -171,19 +292,21 @@ class SnakeGame:
 
         dx, dy = self.direction
         head = (
-            (self.snake[0][0] + dx * BLOCK_SIZE) % WIDTH,
-            (self.snake[0][1] + dy * BLOCK_SIZE) % HEIGHT
+            (self.snake[0][0] + dx * BLOCK_SIZE) % self.grid.width,
+            (self.snake[0][1] + dy * BLOCK_SIZE) % self.grid.height
         )
 
         powered_up = len(self.active_powerups) > 0
 
-        if head in self.stone_blocks:
+        if self.grid.count(LAYER_STONE, head):
             if powered_up:
-                self.stone_blocks.remove(head)
+                self.stone_blocks.discard(head)
+                self.grid.remove(LAYER_STONE, head)
                 self.score += 1
             else:
                 if self.shield_count > 0:
-                    self.stone_blocks.remove(head)
+                    self.stone_blocks.discard(head)
+                    self.grid.remove(LAYER_STONE, head)
                     self.shield_count -= 1
                     self.score += 1
                 else:
@@ -204,44 +327,43 @@ class SnakeGame:
                 self.coins += self.score
                 return
 
-        self.snake.insert(0, head)
+        self.snake.push_head(head)
 
-        ate_food = False
-        for food in self.foods[:]:
-            if head == food.position:
-                self.score += 1
-                food.eaten_remaining -= 1
-                if food.eaten_remaining > 0:
-                    # Regenerate food with reset properties
-                    current_time = pygame.time.get_ticks()
-                    while True:
-                        new_x = random.randint(0, (WIDTH - BLOCK_SIZE) // BLOCK_SIZE) * BLOCK_SIZE
-                        new_y = random.randint(0, (HEIGHT - BLOCK_SIZE) // BLOCK_SIZE) * BLOCK_SIZE
-                        existing = [f.position for f in self.foods if f != food] + self.stone_blocks + self.snake
-                        if (new_x, new_y) not in existing:
-                            food.position = (new_x, new_y)
-                            food.last_move_time = current_time
-                            food.creation_time = current_time  # Reset creation time
-                            food.active_bombs = []  # Clear existing bombs
-                            break
-                else:
-                    self.foods.remove(food)
-                ate_food = True
-                break
+        food = self.food_at(head)
+        ate_food = food is not None
+        if ate_food:
+            self.score += 1
+            food.eaten_remaining -= 1
+            # Regenerate food with reset properties; a full board eats it up
+            if food.eaten_remaining > 0:
+                new_position = self.grid.random_free(self.rng, self.active_chunks())
+            else:
+                new_position = None
+            if new_position is not None:
+                current_time = self.clock.now()
+                self.grid.move(LAYER_FOOD, food.position, new_position)
+                food.position = new_position
+                food.last_move_time = current_time
+                food.creation_time = current_time  # Reset creation time
+            else:
+                self.foods.remove(food)
+                self.grid.remove(LAYER_FOOD, food.position)
 
+        self.moved = True
         if not ate_food:
-            self.snake.pop()
+            self.last_tail = self.snake.pop_tail()
         else:
+            self.last_tail = None
             # Create either bomb OR slowdown when food is eaten
-            current_time = pygame.time.get_ticks()
-            if random.random() < 0.3:  # 30% chance for any effect
+            current_time = self.clock.now()
+            if self.rng.random() < self.level.effect_chance:  # Chance for any effect
                 # Randomly choose between bomb or slowdown
-                if random.choice([True, False]):
+                if self.rng.choice([True, False]):
                     if bomb := food.create_bomb(current_time):
-                        self.bombs.append(bomb)
+                        self.add_bomb(bomb)
                 else:
                     if slowdown := food.create_slowdown(current_time):
-                        self.slowdown_elements.append(slowdown)
+                        self.add_slowdown(slowdown)
                 
             if not self.foods:
                 if self.current_level < self.max_level:
@@ -249,88 +371,272 @@ class SnakeGame:
                 else:
                     self.game_state = "victory"
 
-        current_time = pygame.time.get_ticks()
-        for elem in self.slowdown_elements[:]:
-            if (elem[0], elem[1]) == head:
-                self.active_slowdowns.append(current_time + SLOW_DURATION)
-                self.slowdown_elements.remove(elem)
+        current_time = self.clock.now()
+        if self.grid.count(LAYER_SLOWDOWN, head):
+            slots = self.entities_at(self.slowdown_elements, head)
+            end_time = current_time + SLOW_DURATION
+            for _ in slots:
+                self.add_timed(self.active_slowdowns, "slow_effect", end_time, end_time)
+            self.remove_expiring(self.slowdown_elements, slots)
+            self.grid.remove_many(LAYER_SLOWDOWN, self.slowdown_elements.x[slots], self.slowdown_elements.y[slots])
+
+        if self.grid.count(LAYER_POWERUP, head):
+            slots = self.entities_at(self.powerups, head)
+            end_time = current_time + POWERUP_EFFECT_DURATION
+            for _ in slots:
+                self.add_timed(self.active_powerups, "powerup_effect", end_time, end_time)
+            self.remove_expiring(self.powerups, slots)
+            self.grid.remove_many(LAYER_POWERUP, self.powerups.x[slots], self.powerups.y[slots])
 
-        for powerup in self.powerups[:]:
-            if (powerup[0], powerup[1]) == head:
-                self.powerups.remove(powerup)
-                self.active_powerups.append(current_time + POWERUP_EFFECT_DURATION)
+    def _record(self, command):
+        if self.recorder is not None:
+            self.recorder.record(command)
+
+    def turn(self, direction):
+        dx, dy = direction
+        if (-dx, -dy) != self.direction and direction != self.direction:
+            self._record(DIRECTION_NAMES[direction])
+            self.direction = direction
+
+    def fire(self):
+        if self.active_powerups:
+            self._record("fire")
+            head_x, head_y = self.snake[0]
+            dx, dy = self.direction
+            now = self.clock.now()
+            # Dropped once older than PROJECTILE_LIFETIME
+            self.add_expiring(self.projectiles, "projectile", now + PROJECTILE_LIFETIME + 1,
+                              x=head_x, y=head_y, dx=dx, dy=dy, t=now)
+
+    def start(self):
+        self._record("start")
+        self.setup_level()
+        self.game_state = "level_intro"
+
+    def begin_level(self):
+        self._record("begin_level")
+        self.game_state = "playing"
+
+    def next_level(self):
+        self._record("next_level")
+        self.current_level += 1
+        if self.current_level <= self.max_level:
+            self.setup_level()
+            self.game_state = "level_intro"
+        else:
+            self.game_state = "victory"
+
+    def restart(self):
+        self._record("restart")
+        self.reset_game()
+
+    def open_shop(self):
+        self._record("open_shop")
+        self.game_state = "shop"
+
+    def buy_shield(self):
+        if self.coins >= SHIELD_PRICE:
+            self._record("buy_shield")
+            self.coins -= SHIELD_PRICE
+            self.next_run_powerups.append('shield')
+
+    def new_run(self):
+        self._record("new_run")
+        self.reset_game()
+        self.game_state = "level_intro"
+
+    def step(self, action=None):
+        """Advance the simulation by one tick.
+
+        ``action`` is a direction, ``"fire"`` or ``None`` to keep going.
+        Returns ``(reward, done)`` where reward is the score gained this tick.
+        """
+        if action == "fire":
+            self.fire()
+        elif action is not None:
+            self.turn(action)
+
+        score = self.score
+        if self.game_state == "playing":
+            for _, stage in self.stages:
+                stage()
+            self.clock.advance(1000 // self.current_speed)
+            if self.recorder is not None:
+                self.recorder.tick()
+        return self.score - score, self.game_over or self.game_state == "victory"
+
+    def snapshot(self):
+        """The whole simulation state, for ``restore``.
+
+        Each part is copied as flat buffers (NumPy arrays, lists, tuples),
+        never through ``copy.deepcopy``, so lookahead search and rollback
+        can take and restore snapshots thousands of times a second. The
+        renderer, recorder and profiler are not part of the state.
+        """
+        return (
+            _snapshot_fields(self),
+            self.clock.time,
+            self.rng.getstate(),
+            self.next_run_powerups[:],
+            tuple(food.snapshot() for food in self.foods),
+            set(self.stone_blocks),
+            self.snake.snapshot(),
+            self.grid.snapshot(),
+            self.hazards.snapshot(),
+            self.distance_field.snapshot(),
+            self.scheduler.snapshot(),
+            tuple(store.snapshot() for store in self._stores()),
+            dict(self.active_slowdowns),
+            dict(self.active_powerups),
+        )
+
+    def restore(self, snapshot):
+        """Return to the state ``snapshot`` captured; a snapshot can be
+        restored any number of times."""
+        (fields, self.clock.time, rng_state, next_run_powerups, foods, stone_blocks, snake, grid, hazards,
+         distance_field, scheduler, stores, active_slowdowns, active_powerups) = snapshot
+        for name, value in zip(SNAPSHOT_FIELDS, fields):
+            setattr(self, name, value)
+        self.rng.setstate(rng_state)
+        self.next_run_powerups = next_run_powerups[:]
+        self.foods = [FoodEnemy.from_snapshot(food, self.rng) for food in foods]
+        self.stone_blocks = set(stone_blocks)
+        self.snake.restore(snake)
+        self.grid.restore(grid)
+        self.hazards.restore(hazards)
+        self.distance_field.restore(distance_field)
+        self.scheduler.restore(scheduler)
+        for store, state in zip(self._stores(), stores):
+            store.restore(state)
+        self.active_slowdowns = dict(active_slowdowns)
+        self.active_powerups = dict(active_powerups)
+        if self.renderer is not None:
+            self.renderer.invalidate()
+
+    def _stores(self):
+        return tuple(getattr(self, name) for name in STORE_COLUMNS)
+
+    def observe(self, out=None, view=None):
+        """The game as an ``(OBS_CHANNELS, cols, rows)`` grid of channels
+        (see ``snakelite.envs.observation``), written into ``out`` when
+        given so agents can reuse one buffer; ``view = (cols, rows)``
+        limits it to a window centred on the head."""
+        if out is None:
+            out = np.empty(observation.observation_shape(self, view), dtype=np.float32)
+        return observation.observe(self, out, view)
+
+    def observe_pixels(self, out=None):
+        """The rendered frame as a ``(WIDTH, HEIGHT, 3)`` uint8 array."""
+        return observation.observe_pixels(self, out)
+
+    def enable_profiler(self, profiler):
+        """Time every tick stage with ``profiler`` from now on."""
+        self.profiler = profiler
+        self.stages = profiler.instrument(self.stages)
 
     def draw(self):
+        if self.renderer is None:
+            from snakelite.ui.renderer import GameRenderer
+            self.renderer = GameRenderer(self)
         self.renderer.draw()
 
     def handle_input(self):
+        import pygame
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 quit()
             
             if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3 and self.profiler is not None:
+                    self.profiler.overlay = not self.profiler.overlay
+                    continue
                 if self.game_state == "start":
-                    self.setup_level()
-                    self.game_state = "level_intro"
+                    self.start()
                 elif self.game_state == "level_intro" and event.key == pygame.K_SPACE:
-                    self.game_state = "playing"
+                    self.begin_level()
                 elif self.game_state == "level_complete" and event.key == pygame.K_SPACE:
-                    self.current_level += 1
-                    if self.current_level <= self.max_level:
-                        self.setup_level()
-                        self.game_state = "level_intro"
-                    else:
-                        self.game_state = "victory"
+                    self.next_level()
                 elif self.game_state == "victory" and event.key == pygame.K_SPACE:
-                    self.reset_game()
+                    self.restart()
                 elif self.game_state == "game_over":
                     if event.key == pygame.K_r:
-                        self.reset_game()
+                        self.restart()
                     elif event.key == pygame.K_SPACE:
-                        self.game_state = "shop"
+                        self.open_shop()
                 elif self.game_state == "shop":
                     if event.key == pygame.K_1:
-                        if self.coins >= 5:
-                            self.coins -= 5
-                            self.next_run_powerups.append('shield')
+                        self.buy_shield()
                     elif event.key == pygame.K_SPACE:
-                        self.reset_game()
-                        self.game_state = "level_intro"
+                        self.new_run()
                 
                 if self.game_state == "playing":
-                    if event.key == pygame.K_UP and self.direction != DOWN:
-                        self.direction = UP
-                    elif event.key == pygame.K_DOWN and self.direction != UP:
-                        self.direction = DOWN
-                    elif event.key == pygame.K_LEFT and self.direction != RIGHT:
-                        self.direction = LEFT
-                    elif event.key == pygame.K_RIGHT and self.direction != LEFT:
-                        self.direction = RIGHT
-                    elif event.key == pygame.K_SPACE and self.active_powerups:
-                        head_x, head_y = self.snake[0]
-                        self.projectiles.append((head_x, head_y, self.direction, pygame.time.get_ticks()))
+                    if event.key == pygame.K_UP:
+                        self.turn(UP)
+                    elif event.key == pygame.K_DOWN:
+                        self.turn(DOWN)
+                    elif event.key == pygame.K_LEFT:
+                        self.turn(LEFT)
+                    elif event.key == pygame.K_RIGHT:
+                        self.turn(RIGHT)
+                    elif event.key == pygame.K_SPACE:
+                        self.fire()
 
     def run(self):
-        while True:
-            self.handle_input()
-            
-            if self.game_state == "playing":
-                self.move_food()
-                self.combat_system.update_bombs(self)
-                self.combat_system.check_explosion_collision(self)
-                self.combat_system.update_explosions(self)
-                self.combat_system.update_slowdowns(self)
-                self.update_powerups()
-                self.update_projectiles()
-                self.move()
-            
-            self.draw()
-            self.clock.tick(self.current_speed)
+        import pygame
+        # Only the display (which brings the event queue) is needed; fonts
+        # start with the first text drawn and audio never does
+        pygame.display.init()
+        frame_clock = pygame.time.Clock()
+        handle_input, draw = self.handle_input, self.draw
+        if self.profiler is not None:
+            handle_input = self.profiler.wrap("handle_input", handle_input)
+            draw = self.profiler.wrap("draw", draw)
+        # Fixed timestep: ticks run at the game's own pace while input and
+        # drawing run at the display rate, so slowdowns don't drop frames
+        accumulator = 0
+        try:
+            while True:
+                handle_input()
+                if self.autopilot is not None and self.game_state != "playing":
+                    self.autopilot.skip_menus()
+                accumulator = min(accumulator + frame_clock.tick(DISPLAY_FPS), MAX_FRAME_TIME)
+                if self.game_state != "playing":
+                    accumulator = 0
+                tick_ms = 1000 // self.current_speed
+                while accumulator >= tick_ms:
+                    self.step(self.autopilot.act() if self.autopilot is not None else None)
+                    accumulator -= tick_ms
+                    tick_ms = 1000 // self.current_speed
+                self.frame_alpha = accumulator / tick_ms
+                draw()
+                if self.profiler is not None:
+                    self.profiler.end_frame()
+        finally:
+            if self.recorder is not None:
+                self.recorder.close()
+            if self.profiler is not None and self.profiler.export_path:
+                self.profiler.export()
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Snakelite - A snake roguelite game")
+    parser.add_argument("--seed", type=int, help="seed for a reproducible run")
+    parser.add_argument("--record", metavar="PATH", help="record the session to a replay file")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="time each stage of the loop (F3 shows the overlay) and write the stats here on exit")
+    parser.add_argument("--autopilot", metavar="MS", nargs="?", type=float, const=AUTOPILOT_BUDGET_MS,
+                        help="let the built-in bot play, searching for up to MS milliseconds a tick")
+    args = parser.parse_args(argv)
 
-def main():
-    game = SnakeGame()
+    game = SnakeGame(seed=args.seed)
+    if args.autopilot is not None:
+        game.autopilot = Autopilot(game, budget_ms=args.autopilot)
+    if args.record:
+        game.recorder = ReplayRecorder(args.record, game.seed, game.levels.source_hash)
+    if args.profile:
+        game.enable_profiler(StageProfiler(args.profile))
     game.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,124 @@
+from itertools import chain
+
+import numpy as np
+from snakelite.settings import (
+    BLOCK_SIZE, WIDTH, HEIGHT, BOMB_DURATION, EXPLOSION_DURATION, SLOWDOWN_LIFETIME, FOOD_MAX_AGE,
+)
+from snakelite.core.grid import LAYER_STONE
+
+# Observation channels; values are 0 where nothing is
+OBS_HEAD = 0
+OBS_BODY = 1  # 1 at the head, falling towards 0 past the tail
+OBS_BOMB_FOOD = 2  # 1 for a new food, falling to 0.5 at FOOD_MAX_AGE
+OBS_SLOWDOWN_FOOD = 3
+OBS_BOMB = 4  # 1 for a new bomb, falling to 0.5 as its fuse runs out
+OBS_BOMB_RADIUS = 5  # Reach of the bomb's blast, in cells
+OBS_EXPLOSION = 6  # Fraction of EXPLOSION_DURATION left to burn
+OBS_SLOWDOWN = 7  # 1 for a new slowdown, falling to 0.5 as it expires
+OBS_POWERUP = 8
+OBS_PROJECTILE = 9
+OBS_STONE = 10
+OBS_CHANNELS = 11
+
+FOOD_CHANNELS = {"bomb": OBS_BOMB_FOOD, "slowdown": OBS_SLOWDOWN_FOOD}
+
+
+def observation_region(game, view=None):
+    """The cells ``(x, y, cols, rows)`` an observation covers: the whole
+    board, or a ``view = (cols, rows)`` window centred on the head."""
+    grid = game.grid
+    if view is None:
+        return 0, 0, grid.cols, grid.rows
+    return grid.view_around(game.snake[0], *view)
+
+
+def observation_shape(game, view=None):
+    _, _, cols, rows = observation_region(game, view)
+    return OBS_CHANNELS, cols, rows
+
+
+def observe(game, out, view=None):
+    """Write the state of ``game`` into ``out``, an ``observation_shape``
+    array of any float dtype, one ``(cols, rows)`` plane per channel.
+
+    Everything is read from the occupancy grid, the hazard map and the
+    entity stores and written in place: the stone and explosion planes
+    are copied from their chunks and each entity kind is scattered into
+    its plane with one array operation, so an observation costs the
+    entities in view plus clearing the buffer. Where entities share a cell
+    the larger value wins.
+    """
+    x, y, cols, rows = region = observation_region(game, view)
+    if out.shape != (OBS_CHANNELS, cols, rows):
+        raise ValueError(f"observation buffer has shape {out.shape}, expected {(OBS_CHANNELS, cols, rows)}")
+    grid = game.grid
+    now = game.clock.now()
+    # Clears the stone plane too
+    out.fill(0)
+    grid.region(LAYER_STONE, *region, out=out[OBS_STONE])
+
+    def stamp(channel, xs, ys, values=1.0):
+        # Scatter ``values`` into a channel at pixel positions, keeping the
+        # largest per cell and dropping positions outside the view
+        xs = (xs // BLOCK_SIZE - x) % grid.cols
+        ys = (ys // BLOCK_SIZE - y) % grid.rows
+        inside = (xs < cols) & (ys < rows)
+        if not isinstance(values, float):
+            values = values[inside]
+        np.maximum.at(out[channel], (xs[inside], ys[inside]), values)
+
+    snake = game.snake
+    if len(snake):
+        length = len(snake)
+        cells = np.fromiter(chain.from_iterable(snake), dtype=np.int64, count=2 * length)
+        stamp(OBS_HEAD, cells[:1], cells[1:2])
+        stamp(OBS_BODY, cells[0::2], cells[1::2], np.arange(length, 0, -1) / length)
+
+    for food_type, channel in FOOD_CHANNELS.items():
+        foods = [food for food in game.foods if food.food_type == food_type]
+        if foods:
+            xs = np.array([food.position[0] for food in foods])
+            ys = np.array([food.position[1] for food in foods])
+            age = now - np.array([food.creation_time for food in foods])
+            stamp(channel, xs, ys, 1.0 - 0.5 * np.minimum(age / FOOD_MAX_AGE, 1.0))
+
+    bombs = game.bombs
+    live = bombs.live()
+    if len(live):
+        xs, ys = bombs.x[live], bombs.y[live]
+        stamp(OBS_BOMB, xs, ys, 1.0 - 0.5 * np.minimum((now - bombs.t[live]) / BOMB_DURATION, 1.0))
+        stamp(OBS_BOMB_RADIUS, xs, ys, bombs.radius[live].astype(np.float64))
+
+    if game.hazards.burning:
+        left = game.hazards.region(*region) - now
+        np.clip(left, 0, EXPLOSION_DURATION, out=left)
+        out[OBS_EXPLOSION] = left / EXPLOSION_DURATION
+
+    elements = game.slowdown_elements
+    live = elements.live()
+    if len(live):
+        age = np.minimum((now - elements.t[live]) / SLOWDOWN_LIFETIME, 1.0)
+        stamp(OBS_SLOWDOWN, elements.x[live], elements.y[live], 1.0 - 0.5 * age)
+
+    for store, channel in ((game.powerups, OBS_POWERUP), (game.projectiles, OBS_PROJECTILE)):
+        live = store.live()
+        if len(live):
+            stamp(channel, store.x[live], store.y[live])
+    return out
+
+
+def observe_pixels(game, out=None):
+    """The frame ``GameRenderer`` draws, as a ``(WIDTH, HEIGHT, 3)`` uint8
+    array copied into ``out`` through a ``pygame.surfarray`` view of the
+    window, for agents that learn from pixels."""
+    import pygame
+    game.draw()
+    if out is None:
+        out = np.empty((WIDTH, HEIGHT, 3), dtype=np.uint8)
+    pixels = pygame.surfarray.pixels3d(game.renderer.window)
+    try:
+        np.copyto(out, pixels)
+    finally:
+        # The view locks the window until it is gone
+        del pixels
+    return out
@@ -0,0 +1,215 @@
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from snakelite.core.grid import LAYER_COUNT
+from snakelite.core.levels import load_levels
+from snakelite.envs.vec_env import ACTIONS
+
+
+def random_policy(game, rng):
+    return rng.randrange(len(ACTIONS))
+
+
+def _attach(name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _restart(game):
+    # Keep every game in play: advance past cleared levels, start a new
+    # run after a death or a victory
+    if game.game_state == "level_complete":
+        game.next_level()
+    elif game.game_state != "playing":
+        game.new_run()
+    game.begin_level()
+
+
+def observation_view(levels, view=None):
+    """The ``(cols, rows)`` a rollout observes: ``view`` if given, else the
+    board every level shares. Every level's board must cover the view, so
+    observations keep one shape from level to level."""
+    boards = {level.board for level in levels}
+    if view is None:
+        if len(boards) != 1:
+            raise ValueError("the levels have boards of different sizes; pass a view")
+        (view,) = boards
+    cols, rows = view
+    if cols < 1 or rows < 1:
+        raise ValueError(f"bad view {cols}x{rows}")
+    small = sorted(board for board in boards if board[0] < cols or board[1] < rows)
+    if small:
+        raise ValueError(f"a {cols}x{rows} view does not fit the {small[0][0]}x{small[0][1]} board")
+    return cols, rows
+
+
+def _worker(conn, worker_id, num_workers, games, seeds, buffers, policy, levels, view):
+    from snakelite.entities.player.snake import SnakeGame
+    import random
+
+    total = num_workers * games
+    handles = [_attach(name, (total,) + shape, dtype) for name, shape, dtype in buffers]
+    (_, obs), (_, actions), (_, rewards), (_, dones) = handles
+    first = worker_id * games
+    shard = range(first, first + games)
+
+    envs = [SnakeGame(seed=seed, levels=levels) for seed in seeds[:games]]
+    policy_rng = random.Random(seeds[games])
+    steps = 0
+    busy = 0.0
+
+    def write_obs(i, game):
+        # The view around the head (the whole board by default)
+        grid = game.grid
+        layers = grid.region(range(LAYER_COUNT), *grid.view_around(game.snake[0], *view))
+        np.minimum(layers, 255, out=obs[i], casting="unsafe")
+
+    try:
+        while True:
+            command, arg = conn.recv()
+            start = time.perf_counter()
+            if command == "reset":
+                for i, game in zip(shard, envs):
+                    game.start()
+                    game.begin_level()
+                    write_obs(i, game)
+            elif command == "step":
+                for i, game in zip(shard, envs):
+                    rewards[i], dones[i] = game.step(ACTIONS[actions[i]])
+                    if game.game_state != "playing":
+                        _restart(game)
+                    write_obs(i, game)
+                steps += games
+            elif command == "run":
+                for _ in range(arg):
+                    for i, game in zip(shard, envs):
+                        rewards[i], dones[i] = game.step(ACTIONS[policy(game, policy_rng)])
+                        if game.game_state != "playing":
+                            _restart(game)
+                for i, game in zip(shard, envs):
+                    write_obs(i, game)
+                steps += arg * games
+            elif command == "close":
+                break
+            busy += time.perf_counter() - start
+            conn.send((steps, busy))
+    finally:
+        for shm, _ in handles:
+            shm.close()
+        conn.close()
+
+
+class RolloutRunner:
+    """Runs headless SnakeGame instances sharded across worker processes.
+
+    Observations (the occupancy grid layers of every game, clipped to
+    ``uint8``), actions, rewards and done flags live in shared memory, so a
+    step only sends a short command down each worker's pipe. Game ``i`` is
+    owned by worker ``i // games_per_worker``. Each worker seeds its games
+    and its policy from its own branch of a ``SeedSequence`` rooted at
+    ``seed``, so a run is reproducible for a given seed and worker count.
+
+    Games play ``levels`` (the shipped pack by default) and observe a
+    ``view = (cols, rows)`` window around the head, by default the whole
+    board; see ``observation_view``.
+    """
+
+    def __init__(self, num_workers=None, games_per_worker=16, seed=0, policy=random_policy, levels=None,
+                 view=None):
+        self.view = observation_view(levels if levels is not None else load_levels(), view)
+        if levels is not None:
+            # A level pack maps its cache file, which does not pickle; the
+            # levels themselves do. Left out, workers load the pack themselves
+            levels = list(levels)
+        self.obs_shape = (LAYER_COUNT,) + self.view
+        self.num_workers = num_workers or mp.cpu_count()
+        self.games_per_worker = games_per_worker
+        self.num_games = self.num_workers * games_per_worker
+
+        specs = [
+            ("obs", self.obs_shape, np.uint8),
+            ("actions", (), np.int8),
+            ("rewards", (), np.float32),
+            ("dones", (), np.bool_),
+        ]
+        self._shm = []
+        buffers = []
+        for name, shape, dtype in specs:
+            full = (self.num_games,) + shape
+            shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(full)) * np.dtype(dtype).itemsize))
+            self._shm.append(shm)
+            setattr(self, name, np.ndarray(full, dtype=dtype, buffer=shm.buf))
+            buffers.append((shm.name, shape, dtype))
+
+        # One seed per game plus one for the worker's policy
+        sequences = np.random.SeedSequence(seed).spawn(self.num_workers)
+
+        ctx = mp.get_context("spawn")
+        self._conns = []
+        self._procs = []
+        for worker_id, seq in enumerate(sequences):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(
+                target=_worker,
+                args=(child, worker_id, self.num_workers, games_per_worker,
+                      seq.generate_state(games_per_worker + 1).tolist(), buffers, policy, levels, self.view),
+                daemon=True,
+            )
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+        self._stats = [(0, 0.0)] * self.num_workers
+
+    def _broadcast(self, command, arg=None):
+        for conn in self._conns:
+            conn.send((command, arg))
+        self._stats = [conn.recv() for conn in self._conns]
+
+    def reset(self):
+        self._broadcast("reset")
+        return self.obs
+
+    def step(self, actions):
+        """Step every game once; ``actions`` index ``ACTIONS``.
+
+        Returns views of the shared ``(obs, rewards, dones)`` buffers, which
+        the next call overwrites.
+        """
+        self.actions[:] = actions
+        self._broadcast("step")
+        return self.obs, self.rewards, self.dones
+
+    def run(self, num_steps):
+        """Let every worker drive its games with the policy for ``num_steps``
+        ticks, then return the per-worker throughput."""
+        self._broadcast("run", num_steps)
+        return self.throughput()
+
+    def throughput(self):
+        """Steps per second of busy time for each worker."""
+        return [steps / busy if busy else 0.0 for steps, busy in self._stats]
+
+    def close(self):
+        for conn, proc in zip(self._conns, self._procs):
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+            proc.join()
+            conn.close()
+        self._conns = []
+        self._procs = []
+        for shm in self._shm:
+            shm.close()
+            shm.unlink()
+        self._shm = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,398 @@
+import numpy as np
+from snakelite.settings import (
+    BASE_SPEED, FOOD_MOVE_INTERVAL, SLOW_DURATION, SLOWDOWN_LIFETIME,
+    BOMB_DURATION, EXPLOSION_DURATION, FOOD_MAX_AGE, UP, DOWN, LEFT, RIGHT,
+)
+from snakelite.core.levels import load_levels
+
+# Action i turns the snake towards ACTIONS[i]; 0 keeps the current heading
+ACTIONS = (None, UP, DOWN, LEFT, RIGHT)
+_STEPS = np.array([(0, 0), UP, DOWN, LEFT, RIGHT], dtype=np.int64)
+
+# Observation channels
+OBS_HEAD = 0
+OBS_BODY = 1
+OBS_BOMB_FOOD = 2
+OBS_SLOWDOWN_FOOD = 3
+OBS_BOMB = 4
+OBS_EXPLOSION = 5
+OBS_STONE = 6
+OBS_SLOWDOWN = 7
+OBS_CHANNELS = 8
+
+FOOD_BOMB = 0
+FOOD_SLOWDOWN = 1
+FOOD_CODES = {"bomb": FOOD_BOMB, "slowdown": FOOD_SLOWDOWN}
+
+
+class VecSnakeEnv:
+    """Steps ``num_envs`` independent games as stacked NumPy arrays.
+
+    The per-tick rules follow ``SnakeGame.step``: fleeing food that lays
+    bombs and slowdowns, cross-shaped toroidal explosions that set off the
+    bombs they reach and leave a stone behind, stone and self collisions,
+    shields and slowdowns that stretch the tick length. Everything works in
+    cell units rather than pixels. Powerups and projectiles are not modelled
+    because nothing in a level spawns them.
+    Food flees by wrapped Manhattan distance rather than the game's
+    stone-aware distance field; the two agree until stones cut a path off.
+
+    Boards, stones, food counts and types and the effect chance come from
+    the same compiled levels ``SnakeGame`` plays, so each environment is
+    the level's board in cells.
+
+    An episode is one level: it ends when the snake dies or eats the last
+    food, and that environment is reset in the same ``step`` call. The
+    returned observation is an internal buffer that the next call
+    overwrites.
+    """
+
+    def __init__(self, num_envs, level=1, seed=None, shields=0, max_bombs=128, max_slowdowns=64, max_slowed=8,
+                 levels=None):
+        self.num_envs = num_envs
+        self.level = level
+        data = (levels if levels is not None else load_levels())[level - 1]
+        self.cols, self.rows = data.board
+        self.num_foods = data.foods
+        self.food_types = np.array([FOOD_CODES[food_type] for food_type in data.food_types], dtype=np.int8)
+        self.effect_chance = data.effect_chance
+        self.level_stones = data.stone_grid()
+        self.start_shields = shields
+        self.rng = np.random.default_rng(seed)
+
+        n = num_envs
+        cells = (n, self.cols, self.rows)
+        # A body cell stores the move count at which it became the head; it
+        # is occupied while that is within the last ``length`` moves, so
+        # moving and growing never touch the rest of the grid
+        self.body_tick = np.zeros(cells, dtype=np.int32)
+        self.stones = np.zeros(cells, dtype=bool)
+        self.explosion_until = np.zeros(cells, dtype=np.int32)
+        self.food_grid = np.zeros(cells, dtype=np.int16)
+        self.bomb_grid = np.zeros(cells, dtype=np.int16)
+        self.slowdown_grid = np.zeros(cells, dtype=np.int16)
+
+        self.head = np.zeros((n, 2), dtype=np.int64)
+        self.direction = np.zeros((n, 2), dtype=np.int64)
+        self.length = np.zeros(n, dtype=np.int32)
+        self.moves = np.zeros(n, dtype=np.int32)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.shields = np.zeros(n, dtype=np.int64)
+        self.clock = np.zeros(n, dtype=np.int64)
+        self.speed = np.full(n, BASE_SPEED, dtype=np.int64)
+        self.slowed_until = np.zeros((n, max_slowed), dtype=np.int64)
+
+        f = self.num_foods
+        self.food_pos = np.zeros((n, f, 2), dtype=np.int64)
+        self.food_alive = np.zeros((n, f), dtype=bool)
+        self.food_type = np.zeros((n, f), dtype=np.int8)
+        self.food_created = np.zeros((n, f), dtype=np.int64)
+        self.food_last_move = np.zeros((n, f), dtype=np.int64)
+        self.food_remaining = np.zeros((n, f), dtype=np.int64)
+
+        self.bomb_pos = np.zeros((n, max_bombs, 2), dtype=np.int64)
+        self.bomb_time = np.zeros((n, max_bombs), dtype=np.int64)
+        self.bomb_radius = np.zeros((n, max_bombs), dtype=np.int64)
+        self.bomb_alive = np.zeros((n, max_bombs), dtype=bool)
+
+        self.slowdown_pos = np.zeros((n, max_slowdowns, 2), dtype=np.int64)
+        self.slowdown_time = np.zeros((n, max_slowdowns), dtype=np.int64)
+        self.slowdown_alive = np.zeros((n, max_slowdowns), dtype=bool)
+
+        self.obs = np.zeros((n, OBS_CHANNELS, self.cols, self.rows), dtype=np.float32)
+        self._scratch = np.zeros(cells, dtype=np.int32)
+
+    def reset(self):
+        self._reset(np.arange(self.num_envs))
+        return self.observe()
+
+    def step(self, actions):
+        """Advance every environment one tick.
+
+        ``actions`` holds one index into ``ACTIONS`` per environment.
+        Returns ``(obs, reward, done)``; reward is the score gained this tick.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        steps = _STEPS[actions]
+        turn = (actions > 0) & (steps != -self.direction).any(axis=1)
+        self.direction[turn] = steps[turn]
+
+        score = self.score.copy()
+        now = self.clock.copy()
+        envs = np.arange(self.num_envs)
+
+        self._move_foods(now)
+        self._update_bombs(now)
+        hx, hy = self.head[:, 0], self.head[:, 1]
+        exploded = (self.explosion_until[envs, hx, hy] > now) & (self.shields == 0)
+        self._update_slowdowns(now)
+        crashed, cleared = self._move_snakes(np.nonzero(~exploded)[0], now)
+
+        self.clock += 1000 // self.speed
+        reward = (self.score - score).astype(np.float32)
+        done = exploded | crashed | cleared
+        if done.any():
+            self._reset(np.nonzero(done)[0])
+        return self.observe(), reward, done
+
+    def body(self, envs=slice(None)):
+        """Boolean occupancy of the snake bodies in ``envs``."""
+        tail = self.moves[envs] - self.length[envs]
+        return self.body_tick[envs] > tail[..., None, None]
+
+    def observe(self):
+        obs = self.obs
+        scratch = self._scratch
+        for channel in (OBS_HEAD, OBS_BOMB_FOOD, OBS_SLOWDOWN_FOOD, OBS_BOMB):
+            obs[:, channel] = 0
+        envs = np.arange(self.num_envs)
+        obs[envs, OBS_HEAD, self.head[:, 0], self.head[:, 1]] = 1.0
+
+        # Body: 1 at the head falling towards 0 past the tail
+        np.subtract(self.body_tick, (self.moves - self.length)[:, None, None], out=scratch)
+        np.maximum(scratch, 0, out=scratch)
+        obs[:, OBS_BODY] = scratch
+        obs[:, OBS_BODY] *= (1.0 / self.length).astype(np.float32)[:, None, None]
+
+        fe, ff = np.nonzero(self.food_alive)
+        channel = np.where(self.food_type[fe, ff] == FOOD_BOMB, OBS_BOMB_FOOD, OBS_SLOWDOWN_FOOD)
+        age = (self.clock[fe] - self.food_created[fe, ff]) / FOOD_MAX_AGE
+        obs[fe, channel, self.food_pos[fe, ff, 0], self.food_pos[fe, ff, 1]] = 1.0 - 0.5 * np.minimum(age, 1.0)
+
+        be, bb = np.nonzero(self.bomb_alive)
+        fuse = 1.0 - 0.5 * np.minimum((self.clock[be] - self.bomb_time[be, bb]) / BOMB_DURATION, 1.0)
+        # Stacked bombs show the freshest fuse: write in ascending order so
+        # the largest value lands last
+        order = np.argsort(fuse, kind="stable")
+        be, bb = be[order], bb[order]
+        obs[be, OBS_BOMB, self.bomb_pos[be, bb, 0], self.bomb_pos[be, bb, 1]] = fuse[order]
+
+        np.subtract(self.explosion_until, self.clock[:, None, None], out=scratch, casting="unsafe")
+        np.clip(scratch, 0, EXPLOSION_DURATION, out=scratch)
+        obs[:, OBS_EXPLOSION] = scratch
+        obs[:, OBS_EXPLOSION] *= np.float32(1.0 / EXPLOSION_DURATION)
+        obs[:, OBS_STONE] = self.stones
+        np.greater(self.slowdown_grid, 0, out=obs[:, OBS_SLOWDOWN], casting="unsafe")
+        return obs
+
+    def _reset(self, envs):
+        for grid in (self.body_tick, self.stones, self.explosion_until,
+                     self.food_grid, self.bomb_grid, self.slowdown_grid):
+            grid[envs] = 0
+        self.food_alive[envs] = False
+        self.bomb_alive[envs] = False
+        self.slowdown_alive[envs] = False
+        self.slowed_until[envs] = 0
+        self.score[envs] = 0
+        self.shields[envs] = self.start_shields
+        self.clock[envs] = 0
+        self.speed[envs] = BASE_SPEED
+
+        head_x, head_y = self.cols // 2, self.rows // 2
+        self.head[envs] = (head_x, head_y)
+        self.direction[envs] = RIGHT
+        self.length[envs] = 3
+        self.moves[envs] = 3
+        for i in range(3):
+            self.body_tick[envs, head_x - i, head_y] = 3 - i
+
+        self.stones[envs] = self.level_stones
+
+        for f in range(self.num_foods):
+            blocked = (self.food_grid[envs] > 0) | self.stones[envs] | self.body(envs)
+            x, y, ok = self._random_cells(blocked)
+            placed = envs[ok]
+            self._place_food(placed, f, x[ok], y[ok])
+            self.food_type[placed, f] = self.food_types[self.rng.integers(0, len(self.food_types), len(placed))]
+            self.food_remaining[placed, f] = 5
+
+    def _random_cells(self, blocked):
+        # Uniform pick among the unblocked cells of each board
+        weights = self.rng.random((len(blocked), self.cols * self.rows))
+        weights[blocked.reshape(len(blocked), -1)] = -1.0
+        flat = weights.argmax(axis=1)
+        ok = weights[np.arange(len(blocked)), flat] >= 0
+        return flat // self.rows, flat % self.rows, ok
+
+    def _place_food(self, envs, f, x, y):
+        self.food_pos[envs, f, 0] = x
+        self.food_pos[envs, f, 1] = y
+        self.food_alive[envs, f] = True
+        self.food_created[envs, f] = self.clock[envs]
+        self.food_last_move[envs, f] = self.clock[envs]
+        self.food_grid[envs, x, y] += 1
+
+    def _add_bombs(self, envs, x, y, radius=3):
+        slots = self.bomb_alive[envs].argmin(axis=1)
+        free = ~self.bomb_alive[envs, slots]
+        envs, slots, x, y = envs[free], slots[free], x[free], y[free]
+        self.bomb_pos[envs, slots, 0] = x
+        self.bomb_pos[envs, slots, 1] = y
+        self.bomb_time[envs, slots] = self.clock[envs]
+        self.bomb_radius[envs, slots] = radius
+        self.bomb_alive[envs, slots] = True
+        self.bomb_grid[envs, x, y] += 1
+
+    def _add_slowdowns(self, envs, x, y):
+        slots = self.slowdown_alive[envs].argmin(axis=1)
+        free = ~self.slowdown_alive[envs, slots]
+        envs, slots, x, y = envs[free], slots[free], x[free], y[free]
+        self.slowdown_pos[envs, slots, 0] = x
+        self.slowdown_pos[envs, slots, 1] = y
+        self.slowdown_time[envs, slots] = self.clock[envs]
+        self.slowdown_alive[envs, slots] = True
+        self.slowdown_grid[envs, x, y] += 1
+
+    def _add_effects(self, envs, x, y, bomb):
+        self._add_bombs(envs[bomb], x[bomb], y[bomb])
+        self._add_slowdowns(envs[~bomb], x[~bomb], y[~bomb])
+
+    def _move_foods(self, now):
+        # Food only ever lays effects on its own cell, which the food itself
+        # already blocks, so one blocker snapshot serves the whole pass
+        blocked = self.stones | (self.bomb_grid > 0) | (self.slowdown_grid > 0)
+        head_x, head_y = self.head[:, 0], self.head[:, 1]
+        for f in range(self.num_foods):
+            alive = self.food_alive[:, f]
+            envs = np.nonzero(alive & (now - self.food_last_move[:, f] >= FOOD_MOVE_INTERVAL))[0]
+            if len(envs):
+                e = envs[:, None]
+                fx, fy = self.food_pos[envs, f, 0], self.food_pos[envs, f, 1]
+                nx = (fx[:, None] + _STEPS[1:, 0]) % self.cols
+                ny = (fy[:, None] + _STEPS[1:, 1]) % self.rows
+                free = ~(blocked[e, nx, ny] | (self.food_grid[e, nx, ny] > 0))
+                dx = np.abs(nx - head_x[e])
+                dy = np.abs(ny - head_y[e])
+                distance = np.minimum(dx, self.cols - dx) + np.minimum(dy, self.rows - dy)
+                best = np.where(free, distance, -1).argmax(axis=1)
+                moved = free.any(axis=1)
+                envs, best, fx, fy = envs[moved], best[moved], fx[moved], fy[moved]
+                picked = np.arange(len(best))
+                x, y = nx[moved][picked, best], ny[moved][picked, best]
+                self.food_grid[envs, fx, fy] -= 1
+                self.food_grid[envs, x, y] += 1
+                self.food_pos[envs, f, 0] = x
+                self.food_pos[envs, f, 1] = y
+                self.food_last_move[envs, f] = now[envs]
+
+            envs = np.nonzero(alive & (self.rng.random(self.num_envs) < self.effect_chance))[0]
+            self._add_effects(envs, self.food_pos[envs, f, 0], self.food_pos[envs, f, 1],
+                              self.food_type[envs, f] == FOOD_BOMB)
+
+    def _update_bombs(self, now):
+        going_off = self.bomb_alive & (now[:, None] - self.bomb_time >= BOMB_DURATION)
+        # Bombs caught in a blast go off in the same tick, and so on down
+        # the chain; every blast in an env this tick shares one end time that
+        # is never earlier than what is already on the grid, so plain stores
+        # suffice and a cell burning until it marks the bombs reached
+        end_at = now + EXPLOSION_DURATION
+        while True:
+            en, eb = np.nonzero(going_off)
+            if not len(en):
+                return
+            x, y, radius = self.bomb_pos[en, eb, 0], self.bomb_pos[en, eb, 1], self.bomb_radius[en, eb]
+            self.bomb_alive[en, eb] = False
+            np.subtract.at(self.bomb_grid, (en, x, y), 1)
+            self.stones[en, x, y] = True
+
+            end = end_at[en]
+            self.explosion_until[en, x, y] = end
+            for i in range(1, radius.max() + 1):
+                reach = i <= radius
+                e, cx, cy, t = en[reach], x[reach], y[reach], end[reach]
+                self.explosion_until[e, (cx + i) % self.cols, cy] = t
+                self.explosion_until[e, (cx - i) % self.cols, cy] = t
+                self.explosion_until[e, cx, (cy + i) % self.rows] = t
+                self.explosion_until[e, cx, (cy - i) % self.rows] = t
+            envs = np.arange(self.num_envs)[:, None]
+            reached = self.explosion_until[envs, self.bomb_pos[..., 0], self.bomb_pos[..., 1]] == end_at[:, None]
+            going_off = self.bomb_alive & reached
+
+    def _update_slowdowns(self, now):
+        en, es = np.nonzero(self.slowdown_alive & (now[:, None] - self.slowdown_time >= SLOWDOWN_LIFETIME))
+        self.slowdown_alive[en, es] = False
+        np.subtract.at(self.slowdown_grid, (en, self.slowdown_pos[en, es, 0], self.slowdown_pos[en, es, 1]), 1)
+        active = (self.slowed_until > now[:, None]).sum(axis=1)
+        self.speed = BASE_SPEED // (1 + 2 * np.minimum(active, 3))
+
+    def _move_snakes(self, envs, now):
+        crashed = np.zeros(self.num_envs, dtype=bool)
+        cleared = np.zeros(self.num_envs, dtype=bool)
+
+        # Bombs under the current head are defused for points
+        hx, hy = self.head[envs, 0], self.head[envs, 1]
+        on_bomb = envs[self.bomb_grid[envs, hx, hy] > 0]
+        if len(on_bomb):
+            hit = self.bomb_alive[on_bomb] & (self.bomb_pos[on_bomb] == self.head[on_bomb, None]).all(axis=2)
+            count = hit.sum(axis=1)
+            self.bomb_alive[on_bomb] &= ~hit
+            self.bomb_grid[on_bomb, self.head[on_bomb, 0], self.head[on_bomb, 1]] -= count.astype(np.int16)
+            self.score[on_bomb] += 5 * count
+
+        x = (hx + self.direction[envs, 0]) % self.cols
+        y = (hy + self.direction[envs, 1]) % self.rows
+
+        stone = self.stones[envs, x, y]
+        shielded = stone & (self.shields[envs] > 0)
+        self.stones[envs[shielded], x[shielded], y[shielded]] = False
+        self.shields[envs[shielded]] -= 1
+        self.score[envs[shielded]] += 1
+        crashed[envs[stone & ~shielded]] = True
+
+        self_hit = ~(stone & ~shielded) & (self.body_tick[envs, x, y] > self.moves[envs] - self.length[envs])
+        blocked = self_hit & (self.shields[envs] > 0)
+        self.shields[envs[blocked]] -= 1
+        crashed[envs[self_hit & ~blocked]] = True
+
+        moving = ~(stone & ~shielded) & ~self_hit
+        envs, x, y = envs[moving], x[moving], y[moving]
+        self.head[envs, 0] = x
+        self.head[envs, 1] = y
+
+        match = self.food_alive[envs] & (self.food_pos[envs, :, 0] == x[:, None]) & (self.food_pos[envs, :, 1] == y[:, None])
+        ate = match.any(axis=1)
+        eaters, ex, ey, slot = envs[ate], x[ate], y[ate], match[ate].argmax(axis=1)
+        self.length[eaters] += 1
+        self.moves[envs] += 1
+        self.body_tick[envs, x, y] = self.moves[envs]
+
+        if len(eaters):
+            self.score[eaters] += 1
+            self.food_remaining[eaters, slot] -= 1
+            regen = self.food_remaining[eaters, slot] > 0
+            gone = ~regen
+            self.food_alive[eaters[gone], slot[gone]] = False
+            self.food_grid[eaters[gone], ex[gone], ey[gone]] -= 1
+
+            renv, rslot = eaters[regen], slot[regen]
+            blocked = ((self.food_grid[renv] > 0) | self.stones[renv] | self.body(renv)
+                       | (self.bomb_grid[renv] > 0) | (self.slowdown_grid[renv] > 0))
+            nx, ny, ok = self._random_cells(blocked)
+            # With no free cell left the food is used up like its last one
+            fenv, fslot = renv[~ok], rslot[~ok]
+            self.food_alive[fenv, fslot] = False
+            self.food_grid[fenv, self.food_pos[fenv, fslot, 0], self.food_pos[fenv, fslot, 1]] -= 1
+            renv, rslot, nx, ny = renv[ok], rslot[ok], nx[ok], ny[ok]
+            self.food_grid[renv, self.food_pos[renv, rslot, 0], self.food_pos[renv, rslot, 1]] -= 1
+            self._place_food(renv, rslot, nx, ny)
+
+            drop = self.rng.random(len(eaters)) < self.effect_chance
+            bomb = self.rng.random(len(eaters)) < 0.5
+            denv, dslot = eaters[drop], slot[drop]
+            self._add_effects(denv, self.food_pos[denv, dslot, 0], self.food_pos[denv, dslot, 1], bomb[drop])
+            cleared[eaters[~self.food_alive[eaters].any(axis=1)]] = True
+
+        on_slowdown = self.slowdown_grid[envs, x, y] > 0
+        if on_slowdown.any():
+            senv, sx, sy = envs[on_slowdown], x[on_slowdown], y[on_slowdown]
+            hit = self.slowdown_alive[senv] & (self.slowdown_pos[senv, :, 0] == sx[:, None]) & (self.slowdown_pos[senv, :, 1] == sy[:, None])
+            count = hit.sum(axis=1)
+            self.slowdown_alive[senv] &= ~hit
+            self.slowdown_grid[senv, sx, sy] -= count.astype(np.int16)
+            for _ in range(count.max()):
+                need = count > 0
+                e = senv[need]
+                slot = self.slowed_until[e].argmin(axis=1)
+                self.slowed_until[e, slot] = now[e] + SLOW_DURATION
+                count -= need
+        return crashed, cleared
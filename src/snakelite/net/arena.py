@@ -0,0 +1,223 @@
+from snakelite.settings import BLOCK_SIZE, ARENA_RESPAWN_MS, ARENA_BOT_BUDGET_MS, ARENA_MAX_PLAYERS, RIGHT
+from snakelite.core.grid import LAYER_STONE, LAYER_SNAKE, LAYER_FOOD, LAYER_BOMB, LAYER_EXPLOSION
+from snakelite.entities.player.body import SnakeBody
+from snakelite.entities.player.snake import SnakeGame
+from snakelite.systems.autopilot import Autopilot
+
+# What SnakeGame keeps for its one snake; each player has its own copy,
+# swapped into the game while that player is simulated
+PLAYER_FIELDS = (
+    "snake", "direction", "score", "shield_count", "game_over", "death_reason",
+    "active_slowdowns", "active_powerups", "moved", "last_tail", "coins",
+)
+# A new snake needs these clear under its body and just ahead of its head
+SPAWN_CLEAR = (LAYER_STONE, LAYER_SNAKE, LAYER_BOMB, LAYER_EXPLOSION)
+SPAWN_ATTEMPTS = 32
+
+
+class Player:
+    """One snake in an arena, with the per-snake state of a ``SnakeGame``."""
+
+    def __init__(self, player_id, grid):
+        self.id = player_id
+        self.snake = SnakeBody(grid)
+        self.direction = RIGHT
+        self.score = 0
+        self.shield_count = 0
+        # Dead until the first spawn
+        self.game_over = True
+        self.death_reason = ""
+        self.active_slowdowns = {}
+        self.active_powerups = {}
+        self.moved = False
+        self.last_tail = None
+        self.coins = 0
+        # Times this player has been (re)spawned, so clients can tell a new
+        # body from a moved one
+        self.spawns = 0
+        self.respawn_at = 0
+        # Autopilot steering a server-side bot
+        self.bot = None
+
+
+class ArenaGame(SnakeGame):
+    """Several snakes sharing one ``SnakeGame`` board.
+
+    The world (foods, bombs, explosions, slowdowns, the level) is the
+    game's own. Every player keeps the fields ``SnakeGame`` holds for its
+    single snake, and ``advance`` swaps each player's fields into the game in
+    turn to run the usual explosion check and ``move`` for it, so all the
+    rules of the single-player game apply unchanged. On top of them a snake
+    running into another one dies (a shield absorbs the hit), and a dead
+    snake respawns after ``ARENA_RESPAWN_MS``.
+
+    The arena ticks at ``BASE_SPEED``; a slowed snake moves only on every
+    third, fifth or seventh tick instead of slowing the whole arena. Foods
+    flee the living snakes' heads in turn, one snake per tick. When the
+    last food is eaten the level's foods come back.
+    """
+
+    def __init__(self, level=1, seed=None, levels=None, max_players=ARENA_MAX_PLAYERS):
+        super().__init__(seed=seed, levels=levels)
+        self.max_players = max_players
+        self.players = {}
+        self.tick = 0
+        self.current_level = level
+        self.setup_level()
+        # The game's own snake stands in for nobody
+        self.snake.clear()
+        self.game_state = "playing"
+        self.tick_ms = 1000 // self.current_speed
+        # Bound while the world (not any one snake) is simulated
+        self.house = Player(-1, self.grid)
+        self.house.game_over = False
+        self.scheduler.on("slow_effect", self.end_slow_effects)
+
+    def _bind(self, player):
+        for name in PLAYER_FIELDS:
+            setattr(self, name, getattr(player, name))
+
+    def _unbind(self, player):
+        for name in PLAYER_FIELDS:
+            setattr(player, name, getattr(self, name))
+
+    def add_player(self, bot=False):
+        """Join a new snake, spawned on the next tick; returns its id, or
+        ``None`` when the arena is full."""
+        if len(self.players) >= self.max_players:
+            return None
+        player_id = next(i for i in range(len(self.players) + 1) if i not in self.players)
+        player = self.players[player_id] = Player(player_id, self.grid)
+        player.respawn_at = self.clock.now()
+        if bot:
+            player.bot = Autopilot(self, budget_ms=ARENA_BOT_BUDGET_MS)
+        return player_id
+
+    def remove_player(self, player_id):
+        player = self.players.pop(player_id, None)
+        if player is not None:
+            player.snake.clear()
+
+    def steer(self, player_id, direction):
+        player = self.players.get(player_id)
+        if player is None or player.game_over:
+            return
+        dx, dy = direction
+        if (-dx, -dy) != player.direction:
+            player.direction = direction
+
+    def fire_for(self, player_id):
+        player = self.players.get(player_id)
+        if player is None or player.game_over:
+            return
+        self._bind(player)
+        self.fire()
+        self._unbind(player)
+
+    def end_powerup_effects(self, due):
+        # The timer may belong to any player, or to one who has left
+        self._end_effects(due, "active_powerups")
+
+    def end_slow_effects(self, due):
+        self._end_effects(due, "active_slowdowns")
+
+    def _end_effects(self, due, field):
+        holders = [getattr(player, field) for player in self.players.values()]
+        for timer_id, _ in due:
+            for effects in holders:
+                if effects.pop(timer_id, None) is not None:
+                    break
+
+    def advance(self):
+        """Advance the arena one tick. Players steer between ticks with
+        ``steer`` and ``fire_for``.
+
+        Named apart from ``SnakeGame.step``: the arena takes no single
+        action and has no one reward to report."""
+        now = self.clock.now()
+        for player in self.players.values():
+            if player.game_over and now >= player.respawn_at:
+                self._spawn(player)
+        living = [player for player in self.players.values() if not player.game_over]
+
+        for player in living:
+            if player.bot is not None:
+                self._bind(player)
+                direction = player.bot.act()
+                self._unbind(player)
+                if direction is not None:
+                    self.steer(player.id, direction)
+
+        if living:
+            focus = living[self.tick % len(living)]
+            self._bind(focus)
+            self.move_food()
+            self._unbind(focus)
+        self._bind(self.house)
+        for name, stage in self.stages:
+            if name not in ("move_food", "check_explosion_collision", "move"):
+                stage()
+        self._unbind(self.house)
+
+        for player in living:
+            self._bind(player)
+            self.combat_system.check_explosion_collision(self)
+            # Slowed snakes skip ticks rather than slowing everyone
+            if not self.game_over and self.tick % (1 + 2 * min(len(self.active_slowdowns), 3)) == 0:
+                self.move()
+            if self.game_state in ("level_complete", "victory"):
+                self._refill_foods()
+            self.game_state = "playing"
+            self._unbind(player)
+            if player.game_over:
+                self._kill(player, now)
+
+        self.tick += 1
+        self.clock.advance(self.tick_ms)
+
+    def move(self):
+        # The snake layer holds every snake, so the base game already treats
+        # rivals' bodies as walls; only the reason for dying differs
+        dx, dy = self.direction
+        head = ((self.snake[0][0] + dx * BLOCK_SIZE) % self.grid.width,
+                (self.snake[0][1] + dy * BLOCK_SIZE) % self.grid.height)
+        super().move()
+        if self.game_over and self.death_reason == "You collided with yourself!" and head not in list(self.snake):
+            self.death_reason = "You ran into another snake!"
+
+    def _refill_foods(self):
+        for _ in range(self.level.foods):
+            food = self.generate_food()
+            if food is not None:
+                self.foods.append(food)
+                self.grid.add(LAYER_FOOD, food.position)
+
+    def _kill(self, player, now):
+        player.snake.clear()
+        player.active_slowdowns.clear()
+        player.active_powerups.clear()
+        player.respawn_at = now + ARENA_RESPAWN_MS
+
+    def _spawn(self, player):
+        """Lay a three-segment snake heading right on a clear stretch of
+        the board; tries again next tick if none is found."""
+        grid = self.grid
+        width = grid.width
+        for _ in range(SPAWN_ATTEMPTS):
+            head = grid.random_free(self.rng)
+            if head is None:
+                return
+            x, y = head
+            cells = [((x + i * BLOCK_SIZE) % width, y) for i in range(-2, 3)]
+            if not any(grid.occupied(cell, SPAWN_CLEAR) for cell in cells):
+                break
+        else:
+            return
+        player.snake.extend([cells[2], cells[1], cells[0]])
+        player.direction = RIGHT
+        player.score = 0
+        player.game_over = False
+        player.death_reason = ""
+        player.moved = False
+        player.last_tail = None
+        player.spawns += 1
@@ -0,0 +1,339 @@
+import asyncio
+import random
+import time
+from collections import deque
+
+from snakelite.settings import ARENA_PORT, DISPLAY_FPS, UP, DOWN, LEFT, RIGHT
+from snakelite.core.clock import TickClock
+from snakelite.core.entity_store import EntityStore
+from snakelite.core.grid import OccupancyGrid
+from snakelite.core.hazard import HazardMap
+from snakelite.entities.player.snake import STORE_COLUMNS
+from snakelite.net import protocol
+from snakelite.net.link import Link
+
+# Seconds between HELLOs while waiting to be let in
+HELLO_INTERVAL = 0.5
+
+
+class RemoteFood:
+    """A food as the renderer needs it."""
+
+    __slots__ = ("position", "creation_time", "food_type")
+
+    def __init__(self, position, creation_time, food_type):
+        self.position = position
+        self.creation_time = creation_time
+        self.food_type = food_type
+
+
+class RemotePlayer:
+    """A snake as the client follows it from the server's records."""
+
+    def __init__(self, player_id):
+        self.id = player_id
+        self.body = deque()
+        self.record = None
+
+    def update(self, record, segments):
+        self.record = record
+        if segments is not None:
+            self.body = deque(map(tuple, segments.tolist()))
+        elif not record["flags"] & protocol.ALIVE:
+            self.body.clear()
+        else:
+            head = (int(record["x"]), int(record["y"]))
+            if not self.body or self.body[0] != head:
+                self.body.appendleft(head)
+            while len(self.body) > record["length"]:
+                self.body.pop()
+
+
+class ArenaView:
+    """The arena as one client sees it, shaped like the ``SnakeGame``
+    attributes ``GameRenderer`` reads, so the renderer draws it as it is.
+
+    ``apply`` takes the server's keyframes and deltas. A delta only applies
+    on top of the tick before it; after a gap the view keeps the last tick
+    it had and sets ``need_keyframe`` until a keyframe arrives.
+    """
+
+    def __init__(self, player_id, cols, rows, level=1):
+        self.player_id = player_id
+        self.clock = TickClock()
+        self.grid = OccupancyGrid(cols, rows)
+        self.hazards = HazardMap(self.grid)
+        for name, columns in STORE_COLUMNS.items():
+            setattr(self, name, EntityStore(**columns))
+        self.store_dtypes = [store.dtype for store in self._stores()]
+        self.players = {}
+        self.food_index = {}
+        self.foods = []
+        self.snake = []
+        self.rivals = []
+        self.tick = -1
+        self.synced = False
+        self.need_keyframe = False
+        self.game_state = "start"
+        self.current_level = level
+        self.score = 0
+        self.shield_count = 0
+        self.coins = 0
+        self.death_reason = ""
+        self.active_slowdowns = {}
+        self.active_powerups = {}
+        # Ticks arrive whole, so there is nothing to interpolate
+        self.frame_alpha = 1.0
+        self.moved = False
+        self.last_tail = None
+        self.profiler = None
+        self.renderer = None
+
+    def _stores(self):
+        return tuple(getattr(self, name) for name in STORE_COLUMNS)
+
+    def apply(self, kind, tick, body):
+        """Apply a ``KEYFRAME`` or ``DELTA``; returns whether it was used."""
+        if tick <= self.tick:
+            return False
+        if kind == protocol.DELTA and (not self.synced or tick != self.tick + 1):
+            self.need_keyframe = True
+            return False
+        state = protocol.read_state(body, self.store_dtypes)
+        if kind == protocol.KEYFRAME:
+            self._reset()
+        self._apply_state(*state)
+        self.tick = tick
+        self.synced = True
+        self.need_keyframe = False
+        return True
+
+    def _reset(self):
+        self.grid.clear()
+        self.hazards.clear()
+        for store in self._stores():
+            store.clear()
+        self.food_index.clear()
+        self.players.clear()
+        if self.renderer is not None:
+            self.renderer.invalidate()
+
+    def _apply_state(self, now, cells, stores, foods, removed_foods, players, removed_players):
+        self.clock.time = now
+        xs, ys, counts, ends = cells
+        for pos, cell_counts in zip(zip(xs.tolist(), ys.tolist()), counts.tolist()):
+            self.grid.set_counts(pos, cell_counts)
+        self.hazards.write(xs, ys, ends)
+        for store, (slots, records) in zip(self._stores(), stores):
+            store.write_slots(slots, records)
+
+        for key, x, y, created, food_type in foods.tolist():
+            food = self.food_index.get(key)
+            if food is None:
+                self.food_index[key] = RemoteFood((x, y), created, protocol.FOOD_TYPES[food_type])
+            else:
+                food.position, food.creation_time = (x, y), created
+        for key in removed_foods:
+            self.food_index.pop(key, None)
+        self.foods = list(self.food_index.values())
+
+        for record, segments in players:
+            player_id = int(record["id"])
+            player = self.players.get(player_id) or self.players.setdefault(player_id, RemotePlayer(player_id))
+            player.update(record, segments)
+        for player_id in removed_players:
+            self.players.pop(player_id, None)
+
+        me = self.players.get(self.player_id)
+        self.rivals = [list(player.body) for player in self.players.values() if player is not me and player.body]
+        if me is None or me.record is None:
+            self.snake = []
+            self.game_state = "start"
+            return
+        record = me.record
+        self.snake = list(me.body)
+        self.game_state = "playing" if record["flags"] & protocol.ALIVE and self.snake else "game_over"
+        self.score = int(record["score"])
+        self.shield_count = int(record["shields"])
+        self.death_reason = protocol.DEATH_REASONS[min(int(record["reason"]), len(protocol.DEATH_REASONS) - 1)]
+        self.active_slowdowns = dict.fromkeys(range(int(record["slowed"])))
+        self.active_powerups = dict.fromkeys(range(int(record["powered"])))
+
+    def spawns(self):
+        me = self.players.get(self.player_id)
+        return None if me is None or me.record is None else int(me.record["spawns"])
+
+
+class ArenaClient(asyncio.DatagramProtocol):
+    """Joins an arena server, keeps an ``ArenaView`` of it and sends the
+    player's input.
+
+    Inputs go out on every tick applied and on every steer or fire, each
+    carrying the current direction and a running count of fire presses, so
+    the server catches up from whichever input reaches it.
+    """
+
+    def __init__(self, link=None):
+        self.link = link if link is not None else Link()
+        self.transport = None
+        self.view = None
+        self.welcomed = asyncio.Event()
+        self.direction = 0
+        self.fires = 0
+        self.spawns = None
+        self.keyframes = 0
+        self.deltas = 0
+        self.skipped = 0
+        self.received = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.received += len(data)
+        try:
+            kind, _, tick, body = protocol.unpack(data)
+            if kind == protocol.WELCOME:
+                if self.view is None:
+                    player_id, cols, rows, _, level = protocol.WELCOME_BODY.unpack(body)
+                    self.view = ArenaView(player_id, cols, rows, level)
+                    self.welcomed.set()
+                return
+            if self.view is None or kind not in (protocol.KEYFRAME, protocol.DELTA):
+                return
+            applied = self.view.apply(kind, tick, body)
+        except protocol.ProtocolError:
+            return
+        if applied:
+            if kind == protocol.KEYFRAME:
+                self.keyframes += 1
+            else:
+                self.deltas += 1
+            spawns = self.view.spawns()
+            if spawns != self.spawns:
+                # A new snake starts with the server's direction
+                self.spawns = spawns
+                self.direction = 0
+        else:
+            self.skipped += 1
+        self.send_input()
+
+    async def join(self, timeout=5.0):
+        """Say hello until the server answers; raises ``TimeoutError``."""
+        deadline = time.monotonic() + timeout
+        while not self.welcomed.is_set():
+            if time.monotonic() > deadline:
+                raise TimeoutError("no answer from the arena server")
+            self.link.send(self.transport, protocol.pack(protocol.HELLO, 0))
+            try:
+                await asyncio.wait_for(self.welcomed.wait(), HELLO_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+        return self.view
+
+    def send_input(self):
+        if self.view is None or self.transport is None:
+            return
+        flags = protocol.NEED_KEYFRAME if self.view.need_keyframe else 0
+        body = protocol.INPUT_BODY.pack(self.direction, self.fires, flags)
+        self.link.send(self.transport, protocol.pack(protocol.INPUT, max(self.view.tick, 0), body))
+
+    def steer(self, direction):
+        self.direction = protocol.DIRECTION_CODES[direction]
+        self.send_input()
+
+    def fire(self):
+        self.fires = (self.fires + 1) % 256
+        self.send_input()
+
+    def close(self):
+        if self.transport is not None and not self.transport.is_closing():
+            self.transport.sendto(protocol.pack(protocol.BYE, 0))
+            self.transport.close()
+
+    def stats(self):
+        view = self.view
+        return (f"player={view.player_id if view else '-'}\ttick={view.tick if view else '-'}"
+                f"\tkeyframes={self.keyframes}\tdeltas={self.deltas}\tskipped={self.skipped}"
+                f"\treceived={self.received / 1024:.1f}KiB\tsent={self.link.sent}\tlost={self.link.dropped}")
+
+
+async def connect(host, port, link=None):
+    loop = asyncio.get_running_loop()
+    _, client = await loop.create_datagram_endpoint(lambda: ArenaClient(link), remote_addr=(host, port))
+    await client.join()
+    return client
+
+
+async def play(client):
+    """Draw the arena and send the arrow keys and space until the window
+    closes."""
+    import pygame
+    from snakelite.ui.renderer import GameRenderer
+    pygame.display.init()
+    keys = {pygame.K_UP: UP, pygame.K_DOWN: DOWN, pygame.K_LEFT: LEFT, pygame.K_RIGHT: RIGHT}
+    view = client.view
+    view.renderer = GameRenderer(view)
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key in keys:
+                    client.steer(keys[event.key])
+                elif event.key == pygame.K_SPACE:
+                    client.fire()
+        if view.synced:
+            view.renderer.draw()
+        await asyncio.sleep(1 / DISPLAY_FPS)
+
+
+async def wander(client, ticks, rng):
+    """Steer at random now and then until the view has applied ``ticks``
+    ticks, for load tests without a window."""
+    while client.keyframes + client.deltas < ticks:
+        if rng.random() < 0.2:
+            client.steer(rng.choice((UP, DOWN, LEFT, RIGHT)))
+        await asyncio.sleep(0.05)
+
+
+async def run_clients(args):
+    rng = random.Random(args.seed)
+    links = [Link(args.latency, args.jitter, args.loss, rng.randrange(2**32)) for _ in range(args.clients)]
+    clients = [await connect(args.host, args.port, link) for link in links]
+    try:
+        if args.headless:
+            await asyncio.gather(*(wander(client, args.ticks, rng) for client in clients))
+        else:
+            await play(clients[0])
+    finally:
+        for client in clients:
+            print(client.stats())
+            client.close()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Join a snakelite multiplayer arena")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=ARENA_PORT)
+    parser.add_argument("--headless", action="store_true", help="steer at random without a window")
+    parser.add_argument("--clients", type=int, default=1, help="clients to run in this process (headless)")
+    parser.add_argument("--ticks", type=int, default=300, help="ticks to play headless before leaving")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--latency", type=float, default=0, metavar="MS", help="simulated one-way delay")
+    parser.add_argument("--jitter", type=float, default=0, metavar="MS", help="simulated extra random delay")
+    parser.add_argument("--loss", type=float, default=0, help="simulated fraction of datagrams lost")
+    args = parser.parse_args(argv)
+    if args.clients > 1 and not args.headless:
+        parser.error("--clients needs --headless")
+    try:
+        asyncio.run(run_clients(args))
+    except KeyboardInterrupt:
+        pass
+    except TimeoutError as error:
+        parser.exit(1, f"{error}\n")
+
+
+if __name__ == "__main__":
+    main()
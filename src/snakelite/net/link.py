@@ -0,0 +1,35 @@
+import asyncio
+import random
+
+
+class Link:
+    """Sends datagrams as a worse network would: each one is dropped with
+    probability ``loss``, or held back ``latency_ms`` plus up to
+    ``jitter_ms`` (so datagrams can overtake each other), for trying the
+    arena out on localhost. With the defaults it sends straight away."""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, loss=0.0, seed=None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.sent = 0
+        self.dropped = 0
+        self.bytes = 0
+
+    def send(self, transport, data, addr=None):
+        if self.loss and self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        self.sent += 1
+        self.bytes += len(data)
+        delay = self.latency + self.jitter * self.rng.random()
+        if delay <= 0:
+            transport.sendto(data, addr)
+        else:
+            asyncio.get_running_loop().call_later(delay, self._deliver, transport, data, addr)
+
+    @staticmethod
+    def _deliver(transport, data, addr):
+        if not transport.is_closing():
+            transport.sendto(data, addr)
@@ -0,0 +1,294 @@
+"""Arena messages, as sent over UDP.
+
+Every datagram starts with ``HEADER``: the message kind, flags and a tick
+number. Clients send ``HELLO`` to join, ``INPUT`` every tick they hear
+from the server and whenever they steer (the tick is the last one they
+applied), and ``BYE`` to leave. The server answers ``WELCOME`` and then
+sends one ``KEYFRAME`` or ``DELTA`` per tick.
+
+A keyframe is the whole world; a delta is what changed in one tick: the
+grid cells touched (with every layer's count and when the cell stops
+burning), the entity store slots
+whose records differ, foods added, moved or gone, and the snakes whose
+state changed. A snake's body is sent whole only in keyframes and when it
+respawns; otherwise the new head and the length are enough to follow it.
+Both are laid out the same way, so one reader applies either:
+
+    time (i8)
+    cells: n (u4), xs, ys (u2[n] each, in cells), counts (u2[n, LAYER_COUNT]),
+           burning until (i8[n], 0 where nothing burns)
+    per store of STORE_COLUMNS: n (u4), slots (u4[n]), records (store dtype)
+    foods: n (u4), FOOD records, removed: m (u4), keys (u4[m])
+    players: n (u4), PLAYER records, bodies (u2 pairs, in cells),
+             removed: m (u4), ids (u2[m])
+
+Bodies larger than ``COMPRESS_OVER`` bytes are zlib-compressed.
+"""
+import struct
+import zlib
+
+import numpy as np
+from snakelite.settings import BLOCK_SIZE, UP, DOWN, LEFT, RIGHT
+from snakelite.core.grid import LAYER_COUNT
+
+# Kind, flags, tick
+HEADER = struct.Struct("<BBI")
+# Client to server
+HELLO, INPUT, BYE = 1, 2, 3
+# Server to client
+WELCOME, KEYFRAME, DELTA = 10, 11, 12
+
+# Header flags
+COMPRESSED = 1
+# Input flags
+NEED_KEYFRAME = 1
+
+# Player id, board cols and rows, tick length (ms), level
+WELCOME_BODY = struct.Struct("<HHHHH")
+# Direction (index into DIRECTIONS), fire counter (mod 256), input flags
+INPUT_BODY = struct.Struct("<BBB")
+DIRECTIONS = (None, UP, DOWN, LEFT, RIGHT)
+DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+
+DEATH_REASONS = (
+    "",
+    "You crashed into a stone block!",
+    "You collided with yourself!",
+    "You were caught in an explosion!",
+    "You ran into another snake!",
+)
+DEATH_CODES = {reason: code for code, reason in enumerate(DEATH_REASONS)}
+
+FOOD_TYPES = ("bomb", "slowdown")
+FOOD = np.dtype([("key", "<u4"), ("x", "<i4"), ("y", "<i4"), ("created", "<i8"), ("type", "u1")])
+
+# Player flags
+ALIVE, FULL_BODY = 1, 2
+PLAYER = np.dtype([
+    ("id", "<u2"), ("flags", "u1"), ("direction", "u1"), ("reason", "u1"), ("powered", "u1"),
+    ("slowed", "u1"), ("shields", "<u2"), ("score", "<u4"), ("spawns", "<u4"), ("length", "<u4"),
+    ("x", "<i4"), ("y", "<i4"),
+])
+SPAWNS = PLAYER.names.index("spawns")
+
+COUNT = struct.Struct("<I")
+TIME = struct.Struct("<q")
+COMPRESS_OVER = 512
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def pack(kind, tick, body=b"", flags=0):
+    if len(body) > COMPRESS_OVER:
+        body = zlib.compress(body, 1)
+        flags |= COMPRESSED
+    return HEADER.pack(kind, flags, tick) + body
+
+
+def unpack(data):
+    """``(kind, flags, tick, body)`` of a datagram."""
+    if len(data) < HEADER.size:
+        raise ProtocolError("datagram shorter than its header")
+    kind, flags, tick = HEADER.unpack_from(data)
+    body = data[HEADER.size:]
+    if flags & COMPRESSED:
+        try:
+            body = zlib.decompress(body)
+        except zlib.error as error:
+            raise ProtocolError(f"bad compressed body: {error}") from None
+    return kind, flags, tick, body
+
+
+class Reader:
+    """Reads the fields of a message body in order."""
+
+    def __init__(self, body):
+        self.body = body
+        self.offset = 0
+
+    def struct(self, layout):
+        if self.offset + layout.size > len(self.body):
+            raise ProtocolError("message ends early")
+        values = layout.unpack_from(self.body, self.offset)
+        self.offset += layout.size
+        return values
+
+    def count(self):
+        return self.struct(COUNT)[0]
+
+    def array(self, dtype, n):
+        dtype = np.dtype(dtype)
+        end = self.offset + dtype.itemsize * n
+        if end > len(self.body):
+            raise ProtocolError("message ends early")
+        values = np.frombuffer(self.body, dtype=dtype, count=n, offset=self.offset)
+        self.offset = end
+        return values
+
+
+def _cells(xs, ys):
+    # Pixel positions to the cell columns sent on the wire
+    return (np.asarray(xs) // BLOCK_SIZE).astype("<u2"), (np.asarray(ys) // BLOCK_SIZE).astype("<u2")
+
+
+class StateEncoder:
+    """Turns an ``ArenaGame``'s ticks into delta and keyframe bodies.
+
+    The encoder remembers what its last delta described (a copy of each
+    store's records, the foods and the players) and records the grid's
+    changes, so ``delta`` costs what changed in the tick. Every client is
+    sent the same delta; a client that missed one waits for a keyframe.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        game.grid.track_changes()
+        self.stores = [store.data.copy() for store in game._stores()]
+        # Keys the foods are sent under, by id() of the food, and the foods
+        # themselves by key (which keeps their ids from being reused)
+        self.food_keys = {}
+        self.keyed_foods = {}
+        self.next_food_key = 0
+        # Records in the last delta, by food key and by player id
+        self.foods = {}
+        self.players = {}
+
+    def delta(self):
+        """What changed since the last call, as a ``DELTA`` body."""
+        game = self.game
+        parts = [TIME.pack(game.clock.now())]
+        changed = game.grid.drain_changes()
+        self._write_cells(parts, [x for x, _ in changed], [y for _, y in changed])
+
+        for i, store in enumerate(game._stores()):
+            data, last = store.data, self.stores[i]
+            size = min(len(data), len(last))
+            slots = np.flatnonzero(data[:size] != last[:size])
+            if len(data) > size:
+                slots = np.concatenate([slots, np.arange(size, len(data))])
+            self._write_records(parts, slots, data[slots])
+            self.stores[i] = data.copy()
+
+        foods = self._food_records()
+        current = {int(key): record for key, record in zip(foods["key"].tolist(), foods.tolist())}
+        changed = np.array([self.foods.get(key) != record for key, record in current.items()], dtype=bool)
+        gone = [key for key in self.foods if key not in current]
+        for key in gone:
+            del self.food_keys[id(self.keyed_foods.pop(key))]
+        self.foods = current
+        parts += [COUNT.pack(np.count_nonzero(changed)), foods[changed].tobytes()]
+        parts += [COUNT.pack(len(gone)), np.array(gone, dtype="<u4").tobytes()]
+
+        players, bodies = self._player_records()
+        current = {player_id: record for player_id, record in zip(players["id"].tolist(), players.tolist())}
+        changed = np.zeros(len(players), dtype=bool)
+        for i, (player_id, record) in enumerate(current.items()):
+            last = self.players.get(player_id)
+            changed[i] = last != record
+            if last is None or last[SPAWNS] != record[SPAWNS]:
+                players["flags"][i] |= FULL_BODY
+        gone = [player_id for player_id in self.players if player_id not in current]
+        self.players = current
+        self._write_players(parts, players[changed], bodies, gone)
+        return b"".join(parts)
+
+    def keyframe(self):
+        """The whole world, as a ``KEYFRAME`` body."""
+        game = self.game
+        parts = [TIME.pack(game.clock.now())]
+        xs, ys = game.grid.filled()
+        self._write_cells(parts, xs * BLOCK_SIZE, ys * BLOCK_SIZE)
+        for store in game._stores():
+            live = store.live()
+            self._write_records(parts, live, store.data[live])
+        foods = self._food_records()
+        parts += [COUNT.pack(len(foods)), foods.tobytes(), COUNT.pack(0)]
+        players, bodies = self._player_records()
+        players["flags"] |= FULL_BODY
+        self._write_players(parts, players, bodies, [])
+        return b"".join(parts)
+
+    def _write_cells(self, parts, xs, ys):
+        xs, ys = np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64)
+        grid = self.game.grid
+        counts = np.stack([grid.counts(layer, xs, ys) for layer in range(LAYER_COUNT)], axis=1)
+        ends = self.game.hazards.ends_at(xs, ys)
+        cell_xs, cell_ys = _cells(xs, ys)
+        parts += [COUNT.pack(len(xs)), cell_xs.tobytes(), cell_ys.tobytes(), counts.astype("<u2").tobytes(),
+                  ends.astype("<i8").tobytes()]
+
+    @staticmethod
+    def _write_records(parts, slots, records):
+        parts += [COUNT.pack(len(slots)), np.asarray(slots, dtype="<u4").tobytes(), records.tobytes()]
+
+    def _food_records(self):
+        records = []
+        for food in self.game.foods:
+            key = self.food_keys.get(id(food))
+            if key is None:
+                key = self.food_keys[id(food)] = self.next_food_key
+                self.keyed_foods[key] = food
+                self.next_food_key = (self.next_food_key + 1) % 2**32
+            records.append((key, *food.position, food.creation_time, FOOD_TYPES.index(food.food_type)))
+        return np.array(records, dtype=FOOD)
+
+    def _player_records(self):
+        records = []
+        bodies = {}
+        for player in self.game.players.values():
+            alive = not player.game_over
+            head = player.snake[0] if alive else (0, 0)
+            records.append((
+                player.id, ALIVE if alive else 0, DIRECTION_CODES.get(player.direction, 0),
+                DEATH_CODES.get(player.death_reason, 0), min(len(player.active_powerups), 255),
+                min(len(player.active_slowdowns), 255), player.shield_count, player.score, player.spawns,
+                len(player.snake), *head,
+            ))
+            bodies[player.id] = player.snake
+        return np.array(records, dtype=PLAYER), bodies
+
+    @staticmethod
+    def _write_players(parts, records, bodies, gone):
+        parts += [COUNT.pack(len(records)), records.tobytes()]
+        for player_id in records["id"][records["flags"] & FULL_BODY != 0].tolist():
+            body = np.array(list(bodies[player_id]), dtype=np.int64).reshape(-1, 2)
+            xs, ys = _cells(body[:, 0], body[:, 1])
+            parts.append(np.column_stack([xs, ys]).tobytes())
+        parts += [COUNT.pack(len(gone)), np.array(gone, dtype="<u2").tobytes()]
+
+
+def read_state(body, store_dtypes):
+    """The sections of a delta or keyframe body, in order: ``time``,
+    ``cells`` as ``(xs, ys, counts, ends)`` in pixels, ``stores`` as a ``(slots,
+    records)`` pair per store of ``STORE_COLUMNS`` (``store_dtypes`` are
+    their record dtypes), ``foods`` and ``removed_foods`` (keys),
+    ``players`` as ``(record, body)`` pairs with ``body`` the ``(n, 2)``
+    pixel positions of a full body or ``None``, and ``removed_players``
+    (ids)."""
+    reader = Reader(body)
+    (time,) = reader.struct(TIME)
+    n = reader.count()
+    xs = reader.array("<u2", n).astype(np.int64) * BLOCK_SIZE
+    ys = reader.array("<u2", n).astype(np.int64) * BLOCK_SIZE
+    counts = reader.array("<u2", n * LAYER_COUNT).reshape(n, LAYER_COUNT)
+    ends = reader.array("<i8", n).astype(np.int64)
+    stores = []
+    for dtype in store_dtypes:
+        n = reader.count()
+        slots = reader.array("<u4", n).astype(np.int64)
+        stores.append((slots, reader.array(dtype, n)))
+    foods = reader.array(FOOD, reader.count())
+    removed_foods = reader.array("<u4", reader.count()).tolist()
+    records = reader.array(PLAYER, reader.count())
+    players = []
+    for record in records:
+        segments = None
+        if record["flags"] & FULL_BODY:
+            segments = reader.array("<u2", 2 * int(record["length"])).reshape(-1, 2).astype(np.int64) * BLOCK_SIZE
+        players.append((record, segments))
+    removed_players = reader.array("<u2", reader.count()).tolist()
+    if reader.offset != len(body):
+        raise ProtocolError("trailing bytes after the state")
+    return time, (xs, ys, counts, ends), stores, foods, removed_foods, players, removed_players
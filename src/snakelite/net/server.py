@@ -0,0 +1,195 @@
+import asyncio
+import os
+import struct
+import time
+
+from snakelite.settings import (
+    ARENA_PORT, ARENA_KEYFRAME_INTERVAL, ARENA_KEYFRAME_RETRY, ARENA_TIMEOUT_MS, ARENA_MAX_PLAYERS,
+)
+from snakelite.core.levels import SHIPPED_LEVELS, load_levels
+from snakelite.net import protocol
+from snakelite.net.arena import ArenaGame
+from snakelite.net.link import Link
+
+ARENA_LEVELS = os.path.join(SHIPPED_LEVELS, "arena")
+# Seconds between the stats lines ``serve`` prints
+STATS_INTERVAL = 5
+
+
+class Client:
+    """What the server knows about one address."""
+
+    def __init__(self, player_id, now):
+        self.player_id = player_id
+        self.last_seen = now
+        # Fire counter from the client's last input
+        self.fires = 0
+        self.need_keyframe = True
+        # Tick of the last keyframe sent, None before the first
+        self.keyframe_tick = None
+
+
+class ArenaServer(asyncio.DatagramProtocol):
+    """Authoritative arena server over UDP.
+
+    The server alone runs the ``ArenaGame``; clients only send their
+    direction and fire presses. Each tick is encoded once, as a delta, and
+    the same datagram goes to every client that is in step. A client gets
+    a keyframe instead when it joins, every ``ARENA_KEYFRAME_INTERVAL``
+    ticks (staggered by player, so keyframes don't all go out on one
+    tick), and when it reports a lost delta, at most once every
+    ``ARENA_KEYFRAME_RETRY`` ticks.
+    """
+
+    def __init__(self, game, link=None, max_players=ARENA_MAX_PLAYERS):
+        self.game = game
+        self.encoder = protocol.StateEncoder(game)
+        self.link = link if link is not None else Link()
+        self.max_players = max_players
+        self.clients = {}
+        self.transport = None
+        # Seconds spent simulating and encoding, and ticks run, since the
+        # last stats line
+        self.busy = 0.0
+        self.ticks = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        try:
+            kind, flags, tick, body = protocol.unpack(data)
+        except protocol.ProtocolError:
+            return
+        now = time.monotonic()
+        client = self.clients.get(addr)
+        if kind == protocol.HELLO:
+            if client is None:
+                if len(self.clients) >= self.max_players:
+                    return
+                player_id = self.game.add_player()
+                if player_id is None:
+                    return
+                client = self.clients[addr] = Client(player_id, now)
+            client.last_seen = now
+            self._welcome(client, addr)
+        elif client is None:
+            return
+        elif kind == protocol.INPUT:
+            client.last_seen = now
+            try:
+                direction, fires, input_flags = protocol.INPUT_BODY.unpack(body)
+            except struct.error:
+                return
+            if input_flags & protocol.NEED_KEYFRAME:
+                client.need_keyframe = True
+            if 0 < direction < len(protocol.DIRECTIONS):
+                self.game.steer(client.player_id, protocol.DIRECTIONS[direction])
+            # The counter is resent with every input, so a lost one only
+            # delays the shot
+            for _ in range((fires - client.fires) % 256):
+                self.game.fire_for(client.player_id)
+            client.fires = fires
+        elif kind == protocol.BYE:
+            self._drop(addr)
+
+    def _welcome(self, client, addr):
+        game = self.game
+        body = protocol.WELCOME_BODY.pack(client.player_id, game.grid.cols, game.grid.rows, game.tick_ms,
+                                          game.current_level)
+        self.link.send(self.transport, protocol.pack(protocol.WELCOME, game.tick, body), addr)
+
+    def _drop(self, addr):
+        client = self.clients.pop(addr, None)
+        if client is not None:
+            self.game.remove_player(client.player_id)
+
+    def tick(self):
+        """Step the game and send the tick to every client."""
+        started = time.perf_counter()
+        now = time.monotonic()
+        timeout = ARENA_TIMEOUT_MS / 1000
+        for addr in [addr for addr, client in self.clients.items() if now - client.last_seen > timeout]:
+            self._drop(addr)
+
+        game = self.game
+        game.advance()
+        tick = game.tick
+        delta = protocol.pack(protocol.DELTA, tick, self.encoder.delta())
+        keyframe = None
+        for addr, client in self.clients.items():
+            due = (tick + client.player_id) % ARENA_KEYFRAME_INTERVAL == 0
+            if client.need_keyframe and (client.keyframe_tick is None
+                                         or tick - client.keyframe_tick >= ARENA_KEYFRAME_RETRY):
+                due = True
+            if due:
+                if keyframe is None:
+                    keyframe = protocol.pack(protocol.KEYFRAME, tick, self.encoder.keyframe())
+                client.keyframe_tick = tick
+                client.need_keyframe = False
+                self.link.send(self.transport, keyframe, addr)
+            else:
+                self.link.send(self.transport, delta, addr)
+        self.busy += time.perf_counter() - started
+        self.ticks += 1
+
+    async def serve(self, stats=True):
+        """Tick at the game's pace until cancelled."""
+        loop = asyncio.get_running_loop()
+        period = self.game.tick_ms / 1000
+        deadline = loop.time()
+        reported, sent = loop.time(), self.link.bytes
+        while True:
+            self.tick()
+            deadline += period
+            now = loop.time()
+            if stats and now - reported >= STATS_INTERVAL:
+                print(f"tick={self.game.tick}\tplayers={len(self.game.players)}\tclients={len(self.clients)}"
+                      f"\tbusy={1000 * self.busy / self.ticks:.2f}ms/tick"
+                      f"\tout={(self.link.bytes - sent) / (now - reported) / 1024:.1f}KiB/s", flush=True)
+                reported, sent = now, self.link.bytes
+                self.busy, self.ticks = 0.0, 0
+            # Fall behind by at most a tick rather than bursting to catch up
+            deadline = max(deadline, now - period)
+            await asyncio.sleep(max(0.0, deadline - now))
+
+
+async def run_server(host, port, game, link=None):
+    loop = asyncio.get_running_loop()
+    server = ArenaServer(game, link)
+    transport, _ = await loop.create_datagram_endpoint(lambda: server, local_addr=(host, port))
+    try:
+        await server.serve()
+    finally:
+        transport.close()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Run a snakelite multiplayer arena")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=ARENA_PORT)
+    parser.add_argument("--levels", default=ARENA_LEVELS, help="level directory (default: the shipped arenas)")
+    parser.add_argument("--level", type=int, default=1, help="which level of the directory to play")
+    parser.add_argument("--bots", type=int, default=0, help="server-side autopilot snakes to add")
+    parser.add_argument("--seed", type=int, help="seed for a reproducible arena")
+    parser.add_argument("--latency", type=float, default=0, metavar="MS", help="simulated one-way delay")
+    parser.add_argument("--jitter", type=float, default=0, metavar="MS", help="simulated extra random delay")
+    parser.add_argument("--loss", type=float, default=0, help="simulated fraction of datagrams lost")
+    args = parser.parse_args(argv)
+
+    levels = load_levels(args.levels)
+    if not 1 <= args.level <= len(levels):
+        parser.error(f"--level must be between 1 and {len(levels)}")
+    game = ArenaGame(level=args.level, seed=args.seed, levels=levels)
+    for _ in range(args.bots):
+        game.add_player(bot=True)
+    link = Link(args.latency, args.jitter, args.loss, args.seed)
+    try:
+        asyncio.run(run_server(args.host, args.port, game, link))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,20 @@ BASE_SPEED = 15
 WIDTH = 800
 HEIGHT = 600
 
+# World
+WORLD_COLS = WIDTH // BLOCK_SIZE  # Board size in cells, up to far larger than the window
+WORLD_ROWS = HEIGHT // BLOCK_SIZE
+CHUNK_SIZE = 64  # Cells per side of a storage chunk
+ACTIVE_CHUNK_RADIUS = 1  # Chunks around the head's own that are simulated
+
+# Levels
+LEVEL_DIR = None  # Directory of .level files; None plays the shipped ones
+LEVEL_CACHE_DIR = None  # Where compiled level packs go; None uses the user cache directory
+
 # Timing constants
 FOOD_MOVE_INTERVAL = 500
 SLOW_DURATION = 3000
+SLOWDOWN_LIFETIME = 5000
 BOMB_DURATION = 3000
 EXPLOSION_DURATION = 1000
 FOOD_MAX_AGE = 15000
@@ -14,6 +25,40 @@ POWERUP_DURATION_ON_MAP = 10000
 POWERUP_EFFECT_DURATION = 10000
 PROJECTILE_LIFETIME = 5000
 
+# Shop
+SHIELD_PRICE = 5  # Coins for a shield on the next run
+
+# Rendering
+DISPLAY_FPS = 60  # Frame and input rate, independent of the game's tick rate
+MAX_FRAME_TIME = 250  # Longest frame gap (ms) the simulation catches up on
+INTERPOLATE = True  # Slide the snake and projectiles between ticks
+DIRTY_RECTS = False  # Redraw only changed cells instead of the whole window
+FONT_CACHE_SIZE = 8  # Fonts kept loaded, one per text size
+TEXT_CACHE_SIZE = 64  # Rendered text surfaces kept for reuse
+FOOD_COLOR_STEPS = 64  # Aging shades baked for food tiles
+EFFECT_ALPHA_STEPS = 32  # Fade levels baked for slowdown and explosion tiles
+
+# Profiling
+PROFILE_WINDOW = 600  # Frames of timings kept per stage
+PROFILE_REFRESH = 15  # Frames between overlay text updates
+STARTUP_TARGET_MS = 200  # Median wall time for a fresh interpreter to import and build a SnakeGame
+
+# Autopilot
+AUTOPILOT_BUDGET_MS = 2.0  # Search time per tick
+
+# Balance sweeps
+SWEEP_CACHE_DIR = None  # Where sweep results are cached; None uses the user cache directory
+SWEEP_TICK_LIMIT = 3000  # Ticks a sweep run may take before it is cut off
+
+# Arena (multiplayer)
+ARENA_PORT = 7777
+ARENA_KEYFRAME_INTERVAL = 45  # Ticks between keyframes sent to every client
+ARENA_KEYFRAME_RETRY = 8  # Ticks before a client that lost a delta is sent another keyframe
+ARENA_RESPAWN_MS = 2000  # Time dead snakes wait before rejoining
+ARENA_TIMEOUT_MS = 5000  # Silence after which a client is dropped
+ARENA_MAX_PLAYERS = 64
+ARENA_BOT_BUDGET_MS = 0.5  # Search time per tick for each server-side bot
+
 # Colors
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
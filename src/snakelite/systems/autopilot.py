@@ -0,0 +1,271 @@
+import time
+
+import numpy as np
+from snakelite.settings import (
+    BLOCK_SIZE, BOMB_DURATION, EXPLOSION_DURATION, AUTOPILOT_BUDGET_MS, UP, DOWN, LEFT, RIGHT,
+)
+from snakelite.core.grid import LAYER_STONE, LAYER_SNAKE, region_neighbors
+from snakelite.systems.combat import explosion_cross
+
+MOVES = (UP, DOWN, LEFT, RIGHT)
+
+
+class Autopilot:
+    """Search-based driver for a ``SnakeGame``, used in place of the keyboard.
+
+    Every tick it first works out when each cell is closed to the head:
+    stones, body segments until the tail has pulled out of them, bomb
+    crosses while their explosion burns (a bomb caught in another's blast
+    going off with it) and the stone each bomb leaves, and explosions
+    already burning, all wrapping around the board edges like the snake
+    does. On a world larger than the simulated chunks it
+    only looks inside them.
+
+    A breadth-first search from the head then deepens one move at a time,
+    noting which first move reached each cell. It stops at the first food
+    behind a first move that leaves the snake at least its own length of
+    room, when the board runs out, or when the tick's budget is spent; a
+    search cut short decides from the deepest ply it finished. With
+    ``budget_ms=None`` it always runs to the end, which makes runs
+    reproducible for soak tests.
+    """
+
+    def __init__(self, game, budget_ms=AUTOPILOT_BUDGET_MS):
+        self.game = game
+        self.budget = None if budget_ms is None else budget_ms / 1000
+        # Cells ``(x, y, cols, rows)`` searched this tick
+        self.region = None
+        # Plies the last search completed
+        self.depth = 0
+        # ``(key, crosses)`` of the bombs the last search saw
+        self._last_crosses = None
+
+    def skip_menus(self):
+        """Press through whatever screen is up so an unattended run keeps going."""
+        game = self.game
+        if game.game_state == "start":
+            game.start()
+        elif game.game_state == "level_intro":
+            game.begin_level()
+        elif game.game_state == "level_complete":
+            game.next_level()
+        elif game.game_state == "victory":
+            game.restart()
+        elif game.game_state == "game_over":
+            game.open_shop()
+        elif game.game_state == "shop":
+            game.new_run()
+
+    def act(self):
+        """Direction to steer for the coming tick (``None`` between levels)."""
+        game = self.game
+        if game.game_state != "playing" or game.game_over:
+            return None
+        deadline = None if self.budget is None else time.perf_counter() + self.budget
+        grid = game.grid
+        snake = game.snake
+        self.region = grid.region_around(snake[0])
+        _, _, cols, rows = self.region
+        # Each cell's neighbours, in MOVES order
+        neighbors = region_neighbors(cols, rows, cols == grid.cols, rows == grid.rows)
+        locate = self._cell
+        head = locate(snake[0])
+        foods = {locate(food.position) for food in game.foods} - {None}
+        need = len(snake)
+        reverse = (-game.direction[0], -game.direction[1])
+        blocked, changes, bounds = self._timeline()
+
+        def advance(move):
+            # Bring ``blocked`` to what the head meets on this move
+            if move < len(bounds) - 1:
+                cells, deltas = changes
+                lo, hi = bounds[move], bounds[move + 1]
+                for cell, delta in zip(cells[lo:hi].tolist(), deltas[lo:hi].tolist()):
+                    blocked[cell] += delta
+            # The k-th segment from the tail has moved on by move k + 1
+            if move - 1 <= len(snake) and move > 1:
+                tail = locate(snake[1 - move])
+                if tail is not None:
+                    blocked[tail] -= 1
+
+        # Cells reached, by the first move that got there; first moves whose
+        # searches meet share their room (union-find over the four moves)
+        owner = [-1] * (cols * rows)
+        parent = [0, 1, 2, 3]
+        room = [0, 0, 0, 0]
+        food_step = [None] * 4
+
+        def find(origin):
+            while parent[origin] != origin:
+                origin = parent[origin]
+            return origin
+
+        def room_of(origin):
+            root = find(origin)
+            return sum(room[o] for o in range(4) if find(o) == root)
+
+        advance(0)
+        advance(1)
+        frontiers = {}
+        for origin, move in enumerate(MOVES):
+            cell = neighbors[head][origin]
+            if move == reverse or blocked[cell]:
+                continue
+            owner[cell] = origin
+            room[origin] = 1
+            frontiers[origin] = [cell]
+            if cell in foods:
+                food_step[origin] = 1
+        origins = list(frontiers)
+        if not origins:
+            # Boxed in: the cell with the fewest blockers is the best bet
+            # (an explosion may end early, a shield breaks a stone)
+            moves = [origin for origin, move in enumerate(MOVES) if move != reverse]
+            return MOVES[min(moves, key=lambda origin: blocked[neighbors[head][origin]])]
+
+        step = 1
+        while frontiers:
+            if any(food_step[o] is not None and room_of(o) >= need for o in origins):
+                break
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            step += 1
+            advance(step)
+            for origin, cells in list(frontiers.items()):
+                reached = []
+                for cell in cells:
+                    for neighbor in neighbors[cell]:
+                        if blocked[neighbor]:
+                            continue
+                        other = owner[neighbor]
+                        if other < 0:
+                            owner[neighbor] = origin
+                            reached.append(neighbor)
+                        elif other != origin:
+                            a, b = find(other), find(origin)
+                            if a != b:
+                                parent[b] = a
+                if reached:
+                    room[origin] += len(reached)
+                    frontiers[origin] = reached
+                    if food_step[origin] is None and not foods.isdisjoint(reached):
+                        food_step[origin] = step
+                else:
+                    del frontiers[origin]
+        self.depth = step
+
+        # Room is only a lower bound for searches the deadline cut off
+        unfinished = {find(origin) for origin in frontiers}
+
+        def rank(origin):
+            roomy = room_of(origin) >= need or find(origin) in unfinished
+            found = food_step[origin]
+            return (not roomy, found is None, found or 0, -room_of(origin), MOVES[origin] != game.direction)
+
+        return MOVES[min(origins, key=rank)]
+
+    def _cell(self, pos):
+        # Index of a position in the searched region, or None outside it
+        x, y, cols, rows = self.region
+        grid = self.game.grid
+        x = (pos[0] // BLOCK_SIZE - x) % grid.cols
+        y = (pos[1] // BLOCK_SIZE - y) % grid.rows
+        return x * rows + y if x < cols and y < rows else None
+
+    def _cells(self, xs, ys):
+        # Column form of ``_cell``: indexes and which positions are inside
+        x, y, cols, rows = self.region
+        grid = self.game.grid
+        xs = (xs // BLOCK_SIZE - x) % grid.cols
+        ys = (ys // BLOCK_SIZE - y) % grid.rows
+        return xs * rows + ys, (xs < cols) & (ys < rows)
+
+    def _crosses(self, xs, ys, radii, due):
+        """The bombs' chained due times, and their crosses with each cross
+        cell's due time. The bombs rarely change from one tick to the next,
+        so the last answer is kept and reused while they stay the same."""
+        grid = self.game.grid
+        key = (grid.width, grid.height, xs.tobytes(), ys.tobytes(), radii.tobytes(), due.tobytes())
+        if self._last_crosses is None or self._last_crosses[0] != key:
+            cross_x, cross_y = explosion_cross(xs, ys, radii, grid.width, grid.height)
+            due = self._chain(xs, ys, radii, due, cross_x, cross_y)
+            self._last_crosses = key, (due, cross_x, cross_y, np.repeat(due, 1 + 4 * radii))
+        return self._last_crosses[1]
+
+    def _chain(self, xs, ys, radii, due, cross_x, cross_y):
+        """When each bomb goes off, given that a bomb caught in another's
+        blast goes off with it: the earliest fuse along any chain of
+        crosses leading to it."""
+        rows = self.game.grid.rows
+        cells = xs.astype(np.int64) // BLOCK_SIZE * rows + ys // BLOCK_SIZE
+        order = np.argsort(cells, kind="stable")
+        sorted_cells = cells[order]
+        cross = cross_x // BLOCK_SIZE * rows + cross_y // BLOCK_SIZE
+        first = np.searchsorted(sorted_cells, cross, "left")
+        hits = np.searchsorted(sorted_cells, cross, "right") - first
+        if not hits.any():
+            return due
+        # (blasting bomb, bomb it catches) pairs, one per bomb on a cross cell
+        sources = np.repeat(np.repeat(np.arange(len(xs)), 1 + 4 * radii), hits)
+        offsets = np.arange(hits.sum()) - np.repeat(np.cumsum(hits) - hits, hits)
+        targets = order[np.repeat(first, hits) + offsets]
+        due = due.copy()
+        while True:
+            earlier = due.copy()
+            np.minimum.at(earlier, targets, due[sources])
+            if np.array_equal(earlier, due):
+                return due
+            due = earlier
+
+    def _timeline(self):
+        """What blocks the head on its next moves: per-cell counts of
+        blockers now (stones, body, burning explosions) and the changes to
+        them as ``(cells, deltas)`` sorted by move, with ``bounds[m]`` the
+        first change due at move ``m``. The body's shrinking is left to
+        the search, which only needs it as far as it looks. The count past
+        the last cell stands for everything outside the region."""
+        game = self.game
+        now = game.clock.now()
+        tick = 1000 // game.current_speed
+        grid = game.grid
+        blocked = grid.region((LAYER_STONE, LAYER_SNAKE), *self.region).sum(axis=0).ravel().tolist() + [1]
+
+        def moves_until(times):
+            # First move whose check runs at or after each time
+            return np.maximum(-((now - times) // tick), 0)
+
+        moves, cells, deltas = [], [], []
+        bombs = game.bombs
+        live = bombs.live()
+        if len(live):
+            xs, ys, radii = bombs.x[live], bombs.y[live], bombs.radius[live]
+            due, cross_x, cross_y, cross_due = self._crosses(xs, ys, radii, bombs.t[live] + BOMB_DURATION)
+            # Explosions start at the first tick after their fuse runs out
+            cross, inside = self._cells(cross_x, cross_y)
+            cross_due = cross_due[inside]
+            cross = cross[inside]
+            moves += [moves_until(cross_due), moves_until(cross_due + EXPLOSION_DURATION + tick)]
+            cells += [cross, cross]
+            deltas += [np.ones(len(cross), dtype=np.int64), np.full(len(cross), -1)]
+            # and leave a stone where the bomb was
+            centers, inside = self._cells(xs, ys)
+            moves.append(moves_until(due[inside]))
+            cells.append(centers[inside])
+            deltas.append(np.ones(np.count_nonzero(inside), dtype=np.int64))
+
+        if game.hazards.burning:
+            ends = game.hazards.region(*self.region).ravel()
+            burning = np.flatnonzero(ends > now)
+            moves += [np.zeros(len(burning), dtype=np.int64), moves_until(ends[burning])]
+            cells += [burning, burning]
+            deltas += [np.ones(len(burning), dtype=np.int64), np.full(len(burning), -1)]
+
+        moves = np.concatenate(moves) if moves else np.zeros(0, dtype=np.int64)
+        if not len(moves):
+            return blocked, (moves, moves), [0]
+        # Counting order: moves are few and small, so a stable radix sort
+        # on 16 bits and a histogram stand in for comparison sorting
+        per_move = np.bincount(moves)
+        order = np.argsort(moves.astype(np.uint16) if len(per_move) <= 1 << 16 else moves, kind="stable")
+        bounds = [0] + np.cumsum(per_move).tolist()
+        return blocked, (np.concatenate(cells)[order], np.concatenate(deltas)[order]), bounds
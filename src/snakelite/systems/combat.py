@@ -1,55 +1,127 @@
-import pygame
-from snakelite.settings import *
+from functools import lru_cache
+
+import numpy as np
+from snakelite.settings import BLOCK_SIZE, BASE_SPEED, WORLD_COLS, WORLD_ROWS, EXPLOSION_DURATION
+from snakelite.core.grid import LAYER_STONE, LAYER_BOMB, LAYER_SLOWDOWN, LAYER_EXPLOSION
+
+
+@lru_cache(maxsize=None)
+def _cross_offsets(reach):
+    # Centre, then the four arms one step further out at a time
+    steps = np.repeat(np.arange(1, reach + 1), 4) * BLOCK_SIZE
+    offset_x = np.concatenate([[0], steps * np.tile([1, -1, 0, 0], reach)])
+    offset_y = np.concatenate([[0], steps * np.tile([0, 0, 1, -1], reach)])
+    return offset_x, offset_y
+
+
+def explosion_cross(xs, ys, radii, width=WORLD_COLS * BLOCK_SIZE, height=WORLD_ROWS * BLOCK_SIZE):
+    """Cells covered by bombs exploding at ``xs, ys``: each bomb's own cell
+    and its four arms, wrapping at the edges of a ``width`` x ``height``
+    world, bomb by bomb."""
+    offset_x, offset_y = _cross_offsets(int(radii.max()))
+    # Bomb i covers the first 1 + 4 * radius offsets
+    used = np.arange(len(offset_x)) < (1 + 4 * radii)[:, None]
+    cells_x = (xs[:, None] + offset_x) % width
+    cells_y = (ys[:, None] + offset_y) % height
+    return cells_x[used], cells_y[used]
+
 
 class CombatSystem:
     def update_bombs(self, game):
-        current_time = pygame.time.get_ticks()
-        new_bombs = []
-        for bomb in game.bombs:
-            x, y, t, radius = bomb
-            if current_time - t < BOMB_DURATION:
-                new_bombs.append(bomb)
-            else:
-                if (x, y) not in game.stone_blocks:
-                    game.stone_blocks.append((x, y))
-                explosion_positions = [(x, y)]
-                for i in range(1, radius + 1):
-                    positions = [
-                        ((x + i*BLOCK_SIZE) % WIDTH, y),
-                        ((x - i*BLOCK_SIZE) % WIDTH, y),
-                        (x, (y + i*BLOCK_SIZE) % HEIGHT),
-                        (x, (y - i*BLOCK_SIZE) % HEIGHT)
-                    ]
-                    explosion_positions.extend(positions)
-                for pos in explosion_positions:
-                    game.affected_blocks.append((pos[0], pos[1], current_time + EXPLOSION_DURATION))
-        game.bombs = new_bombs
+        game.scheduler.run("bomb", game.clock.now())
+
+    def explode_bombs(self, game, due):
+        """Set off the bombs whose fuses ran out, with every bomb their
+        blasts reach, and the bombs those reach in turn, all this tick.
+
+        Each generation of the chain is one array step: the crosses of the
+        bombs going off are stamped into the hazard map, and the waiting
+        bombs whose cells now burn until this tick's end time go next. The
+        whole chain burns as one wave with one end time and one timer.
+        """
+        grid = game.grid
+        hazards = game.hazards
+        bombs = game.bombs
+        end_time = game.clock.now() + EXPLOSION_DURATION
+        slots = bombs.slots([bomb_id for _, bomb_id in due])
+        live = bombs.live()
+        going = np.zeros(len(bombs.alive), dtype=bool)
+        going[slots] = True
+        blasting = slots
+        burn_x, burn_y, fresh = [], [], []
+        while len(blasting):
+            cross_x, cross_y = explosion_cross(bombs.x[blasting], bombs.y[blasting], bombs.radius[blasting],
+                                               grid.width, grid.height)
+            xs, ys, before = hazards.stamp(cross_x, cross_y, end_time)
+            # Cells an earlier generation burns are in the wave already
+            new = before != end_time
+            burn_x.append(xs[new])
+            burn_y.append(ys[new])
+            fresh.append(before[new] == 0)
+            waiting = live[~going[live]]
+            blasting = waiting[hazards.ends_at(bombs.x[waiting], bombs.y[waiting]) == end_time]
+            going[blasting] = True
+
+        going[slots] = False
+        chained = np.flatnonzero(going)
+        detonated = np.concatenate([slots, chained])
+        xs, ys = bombs.x[detonated], bombs.y[detonated]
+        # Chained bombs still have their own timers pending
+        game.remove_expiring(bombs, chained)
+        bombs.remove_slots(slots)
+        grid.remove_many(LAYER_BOMB, xs, ys)
+        bare = grid.counts(LAYER_STONE, xs, ys) == 0
+        # Bombs stacked on one cell leave one stone
+        stones = set(zip(xs[bare].tolist(), ys[bare].tolist()))
+        if stones:
+            game.stone_blocks |= stones
+            stone_x, stone_y = zip(*stones)
+            grid.add_many(LAYER_STONE, np.array(stone_x), np.array(stone_y))
+
+        xs, ys, fresh = np.concatenate(burn_x), np.concatenate(burn_y), np.concatenate(fresh)
+        grid.add_many(LAYER_EXPLOSION, xs[fresh], ys[fresh])
+        game.scheduler.schedule("explosion", end_time, (end_time, tuple(xs.tolist()), tuple(ys.tolist())))
 
     def check_explosion_collision(self, game):
-        current_time = pygame.time.get_ticks()
-        for (x, y, end_time) in game.affected_blocks:
-            if current_time < end_time and (x, y) == game.snake[0]:
-                if game.shield_count == 0 and not game.active_powerups:
-                    game.death_reason = "You were caught in an explosion!"
-                    game.game_over = True
-                    game.game_state = "shop"
-                    game.coins += game.score
+        if game.hazards.end_at(game.snake[0]) <= game.clock.now():
+            return
+        if game.shield_count == 0 and not game.active_powerups:
+            game.death_reason = "You were caught in an explosion!"
+            game.game_over = True
+            game.game_state = "shop"
+            game.coins += game.score
 
     def update_explosions(self, game):
-        current_time = pygame.time.get_ticks()
-        game.affected_blocks = [b for b in game.affected_blocks if current_time < b[2]]
+        game.scheduler.run("explosion", game.clock.now())
+
+    def end_explosions(self, game, due):
+        for _, (end_time, xs, ys) in due:
+            xs, ys = game.hazards.expire(np.array(xs, dtype=np.int64), np.array(ys, dtype=np.int64), end_time)
+            game.grid.remove_many(LAYER_EXPLOSION, xs, ys)
 
     def check_bomb_collision(self, game):
-        current_time = pygame.time.get_ticks()
-        head = game.snake[0]
-        for i, bomb in enumerate(game.bombs):
-            x, y, t, radius = bomb
-            if (x, y) == head:
-                game.bombs.pop(i)
-                game.score += 5
+        head_x, head_y = game.snake[0]
+        if not game.grid.count(LAYER_BOMB, (head_x, head_y)):
+            return
+        # Defuse every bomb stacked under the head
+        bombs = game.bombs
+        slots = game.entities_at(bombs, (head_x, head_y))
+        game.remove_expiring(bombs, slots)
+        game.grid.remove_many(LAYER_BOMB, bombs.x[slots], bombs.y[slots])
+        game.score += 5 * len(slots)
 
     def update_slowdowns(self, game):
-        current_time = pygame.time.get_ticks()
-        game.slowdown_elements = [s for s in game.slowdown_elements if current_time - s[2] < 5000]
-        game.active_slowdowns = [t for t in game.active_slowdowns if t > current_time]
+        current_time = game.clock.now()
+        game.scheduler.run("slowdown", current_time)
+        game.scheduler.run("slow_effect", current_time)
         game.current_speed = BASE_SPEED // (1 + 2 * min(len(game.active_slowdowns), 3))
+
+    def expire_slowdowns(self, game, due):
+        elements = game.slowdown_elements
+        slots = elements.slots([element_id for _, element_id in due])
+        game.grid.remove_many(LAYER_SLOWDOWN, elements.x[slots], elements.y[slots])
+        elements.remove_slots(slots)
+
+    def end_slow_effects(self, game, due):
+        for timer_id, _ in due:
+            del game.active_slowdowns[timer_id]
@@ -0,0 +1,296 @@
+"""Reproducible tick and frame cost benchmarks.
+
+Each scenario builds a seeded game in a fixed state, then runs it for a
+number of ticks, timing every simulation stage and the renderer on its
+own. Results are written as JSON; ``--compare`` checks them against an
+earlier run and exits non-zero when a stage got slower than the allowed
+ratio.
+
+Startup is measured too: fresh interpreters import the game and build a
+``SnakeGame`` the way a short-lived headless worker does. The run fails
+when their median exceeds ``--startup-target`` or when the import pulled
+in pygame or the command-line and export modules.
+
+    snakelite-bench -o bench.json
+    snakelite-bench -o new.json --compare bench.json --threshold 1.25
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from snakelite.settings import BLOCK_SIZE, BOMB_DURATION, STARTUP_TARGET_MS
+from snakelite.core.grid import LAYER_STONE, LAYER_FOOD
+from snakelite.core.levels import load_levels
+from snakelite.entities.food.bomb_food import BombFood
+from snakelite.entities.player.snake import SnakeGame
+
+# name: (level, snake length, foods, preplaced bombs, food kind, board or
+# None for the level's own)
+SCENARIOS = {
+    "snake_3": (1, 3, 1, 0, None, None),
+    "snake_100": (1, 100, 1, 0, None, None),
+    "snake_500": (1, 500, 1, 0, None, None),
+    "snake_1100": (1, 1100, 1, 0, None, None),
+    # Too long for the shipped 40x30 boards
+    "snake_2000": (1, 2000, 1, 0, None, (64, 48)),
+    "foods_20": (2, 3, 20, 0, None, None),
+    "foods_200": (2, 3, 200, 0, None, None),
+    "bombs_heavy": (2, 50, 20, 150, BombFood, None),
+    "level3_stones": (3, 100, 5, 0, None, None),
+}
+
+# Modules a headless import must leave alone
+LAZY_MODULES = ("pygame", "argparse", "json")
+
+# Run by each fresh interpreter; prints whichever of LAZY_MODULES got loaded
+STARTUP_SCRIPT = f"""
+import sys
+from snakelite.entities.player.snake import SnakeGame
+SnakeGame(seed=0)
+print(*[name for name in {LAZY_MODULES!r} if name in sys.modules])
+"""
+
+
+def hamiltonian_cycle(cols, rows):
+    """Pixel positions of a cycle through every cell of a ``cols`` x
+    ``rows`` board.
+
+    Row 0 runs left to right, the remaining rows zig-zag through columns
+    1.., and column 0 climbs back to the start. Needs an even row count.
+    """
+    if rows % 2:
+        raise ValueError(f"a {cols}x{rows} board has no cycle of this shape")
+    cells = [(col, 0) for col in range(cols)]
+    for row in range(1, rows):
+        span = range(cols - 1, 0, -1) if row % 2 else range(1, cols)
+        cells.extend((col, row) for col in span)
+    cells.extend((0, row) for row in range(rows - 1, 0, -1))
+    return [(col * BLOCK_SIZE, row * BLOCK_SIZE) for col, row in cells]
+
+
+def build_game(level, length, num_foods, num_bombs, food_kind, board=None, seed=0):
+    """A playing game whose snake lies along the board's Hamiltonian cycle.
+
+    Shields are effectively unlimited so the run never ends; the caller
+    keeps the snake on the cycle with ``steer``. ``board`` plays the level
+    on a board of that size instead of its own.
+    """
+    levels = load_levels()
+    if board is not None:
+        # Copied, so the process-wide pack is left as it is
+        levels = list(levels)
+        levels[level - 1] = copy.copy(levels[level - 1])
+        levels[level - 1].board = board
+    game = SnakeGame(seed=seed, levels=levels)
+    game.current_level = level
+    game.start()
+    game.begin_level()
+    game.shield_count = 10**9
+    grid = game.grid
+
+    for food in game.foods:
+        grid.remove(LAYER_FOOD, food.position)
+    game.foods = []
+
+    cycle = hamiltonian_cycle(grid.cols, grid.rows)
+    if length > len(cycle):
+        raise ValueError(f"a {length}-segment snake does not fit the {grid.cols}x{grid.rows} board")
+    game.snake.clear()
+    game.snake.extend(cycle[(length - 1 - i) % len(cycle)] for i in range(length))
+    for segment in game.snake:
+        if segment in game.stone_blocks:
+            game.stone_blocks.discard(segment)
+            grid.remove(LAYER_STONE, segment)
+
+    for _ in range(num_foods):
+        if food_kind is None:
+            food = game.generate_food()
+        else:
+            food = food_kind.generate(grid, "bomb", game.clock.now(), game.rng)
+        if food is None:
+            break
+        game.foods.append(food)
+        grid.add(LAYER_FOOD, food.position)
+
+    # Fuses staggered over one bomb lifetime so explosions never stop
+    for i in range(num_bombs):
+        position = grid.random_free(game.rng)
+        if position is None:
+            break
+        game.add_bomb((*position, -(i * BOMB_DURATION) // num_bombs, 3))
+
+    successor = {cell: cycle[(i + 1) % len(cycle)] for i, cell in enumerate(cycle)}
+    return game, successor
+
+
+def steer(game, successor):
+    (x, y), (nx, ny) = game.snake[0], successor[game.snake[0]]
+    dx = (nx - x) // BLOCK_SIZE
+    dy = (ny - y) // BLOCK_SIZE
+    # Wrapping steps never occur on the cycle, so these are unit moves
+    game.turn((dx, dy))
+
+
+def run_scenario(name, ticks, warmup, render, seed=0):
+    game, successor = build_game(*SCENARIOS[name], seed=seed)
+    stages = list(game.stages)
+    combat = game.combat_system
+    # check_bomb_collision runs inside move(); time it on its own as well
+    stages.insert(len(stages) - 1, ("check_bomb_collision", lambda: combat.check_bomb_collision(game)))
+    if render:
+        from snakelite.ui.renderer import GameRenderer
+        game.renderer = GameRenderer(game)
+        stages.append(("draw", game.draw))
+
+    samples = {stage: [] for stage, _ in stages}
+    tick_samples = []
+    clock = time.perf_counter
+    for tick in range(warmup + ticks):
+        steer(game, successor)
+        tick_start = clock()
+        for stage, call in stages:
+            start = clock()
+            call()
+            samples[stage].append(clock() - start)
+        game.clock.advance(1000 // game.current_speed)
+        tick_samples.append(clock() - tick_start)
+    samples["tick"] = tick_samples
+
+    results = [summarize(name, stage, times[warmup:]) for stage, times in samples.items()]
+    state = {
+        "snake_length": len(game.snake),
+        "foods": len(game.foods),
+        "bombs": len(game.bombs),
+        "explosions": game.hazards.burning,
+        "stones": len(game.stone_blocks),
+    }
+    return results, state
+
+
+def summarize(scenario, stage, times):
+    times = sorted(times)
+    return {
+        "scenario": scenario,
+        "stage": stage,
+        "calls": len(times),
+        "mean_us": statistics.fmean(times) * 1e6,
+        "p50_us": times[len(times) // 2] * 1e6,
+        "p95_us": times[min(len(times) - 1, int(len(times) * 0.95))] * 1e6,
+        "min_us": times[0] * 1e6,
+    }
+
+
+def measure_startup(runs):
+    """Wall times of ``runs`` fresh interpreters running ``STARTUP_SCRIPT``,
+    interpreter start included, and the lazy modules the last one loaded."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        done = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], capture_output=True, text=True, check=True)
+        times.append(time.perf_counter() - start)
+    return summarize("startup", "import", times), done.stdout.split()
+
+
+def environment():
+    import numpy
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "numpy": numpy.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    try:
+        import pygame
+        info["pygame"] = pygame.version.ver
+    except ImportError:
+        pass
+    return info
+
+
+def compare(results, baseline, threshold):
+    """Rows whose median got slower than ``threshold`` times the baseline."""
+    before = {(r["scenario"], r["stage"]): r["p50_us"] for r in baseline["results"]}
+    regressions = []
+    for row in results:
+        old = before.get((row["scenario"], row["stage"]))
+        if old and row["p50_us"] > old * threshold:
+            regressions.append((row["scenario"], row["stage"], old, row["p50_us"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark snakelite tick and frame cost")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="where to write the JSON results")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="run only this scenario (repeatable)")
+    parser.add_argument("--ticks", type=int, default=300, help="timed ticks per scenario")
+    parser.add_argument("--warmup", type=int, default=30, help="untimed ticks before measuring")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-render", action="store_true", help="skip GameRenderer.draw")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier results to check against")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="slowdown ratio of the median that counts as a regression")
+    parser.add_argument("--startup-runs", type=int, default=20,
+                        help="fresh interpreters timed for startup (0 skips the check)")
+    parser.add_argument("--startup-target", type=float, default=STARTUP_TARGET_MS, metavar="MS",
+                        help="median startup time that counts as too slow")
+    args = parser.parse_args(argv)
+
+    failed = False
+    results = []
+    loaded = []
+    if args.startup_runs > 0:
+        row, loaded = measure_startup(args.startup_runs)
+        results.append(row)
+        startup_ms = row["p50_us"] / 1000
+        print(f"{'startup':<14} {'import':<26} p50 {startup_ms:9.1f} ms   target {args.startup_target:.0f} ms")
+        if startup_ms > args.startup_target:
+            print(f"STARTUP {startup_ms:.1f} ms exceeds the {args.startup_target:.0f} ms target", file=sys.stderr)
+            failed = True
+        if loaded:
+            print(f"STARTUP imported {', '.join(loaded)}", file=sys.stderr)
+            failed = True
+
+    render = not args.no_render
+    if render:
+        # Render offscreen unless a driver was chosen explicitly
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    states = {}
+    for name in args.scenario or SCENARIOS:
+        rows, states[name] = run_scenario(name, args.ticks, args.warmup, render, args.seed)
+        results.extend(rows)
+        for row in rows:
+            print(f"{name:<14} {row['stage']:<26} p50 {row['p50_us']:9.1f} us   p95 {row['p95_us']:9.1f} us")
+
+    report = {
+        "environment": environment(),
+        "config": {"ticks": args.ticks, "warmup": args.warmup, "seed": args.seed, "render": render,
+                   "startup_runs": args.startup_runs, "startup_target_ms": args.startup_target},
+        "startup_imports": loaded,
+        "scenarios": {name: SCENARIOS[name][:4] for name in states},
+        "final_state": states,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for scenario, stage, old, new in regressions:
+            print(f"REGRESSION {scenario}/{stage}: {old:.1f} -> {new:.1f} us", file=sys.stderr)
+        if regressions:
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+"""Balance sweeps: many headless games at every point of a settings grid.
+
+Each ``--set NAME=A,B,...`` is an axis over one of the ``SWEEPABLE``
+settings (``BOMB_DURATION``, ``FOOD_MOVE_INTERVAL``, ``SLOW_DURATION``,
+``SHIELD_PRICE``, ...) and each ``--foods LEVEL=A,B,...`` an axis over a
+level's starting food count; the sweep covers every combination. At each
+point the reference bot, the ``Autopilot`` with no time budget, plays
+``--games`` seeded games of ``--runs`` runs each, spending its coins on
+shields in the shop between runs. Every point uses the same seeds, so
+points differ only by their settings.
+
+Games are spread over a process pool. A point's results are cached on
+disk under a hash of everything that decides them (every sweepable
+setting, food counts, boards, level sources and game counts), so a rerun
+only plays the points it has not seen.
+
+    snakelite-sweep --set BOMB_DURATION=2000,3000,4000 --set SHIELD_PRICE=3,5 --games 500
+    snakelite-sweep --foods 2=3,6 --set FOOD_MOVE_INTERVAL=300,500 -o sweep.json
+"""
+import argparse
+import copy
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from snakelite import settings
+from snakelite.core.levels import load_levels
+from snakelite.entities.player.snake import SnakeGame
+from snakelite.systems.autopilot import Autopilot
+
+# Bump when the game or the bot changes in ways that make cached results stale
+SWEEP_VERSION = 1
+# Death reasons for runs that did not die
+VICTORY = "Cleared every level"
+OUT_OF_TICKS = "Ran out of ticks"
+SCORE_PERCENTILES = (10, 25, 50, 75, 90)
+# Games per pool task
+CHUNK_GAMES = 8
+# Settings the game reads each time it uses them, so changing them in a
+# running process takes effect. The rest are baked in on import (board and
+# chunk sizes, default arguments, the level pack) and cannot be swept.
+SWEEPABLE = (
+    "BASE_SPEED", "FOOD_MOVE_INTERVAL", "SLOW_DURATION", "SLOWDOWN_LIFETIME", "BOMB_DURATION",
+    "EXPLOSION_DURATION", "FOOD_MAX_AGE", "POWERUP_EFFECT_DURATION", "PROJECTILE_LIFETIME", "SHIELD_PRICE",
+)
+
+# Values the sweep has overridden in this process, as they were before
+_originals = {}
+
+
+def sweepable():
+    """The ``SWEEPABLE`` settings, by name, with their current values."""
+    return {name: getattr(settings, name) for name in SWEEPABLE}
+
+
+def parse_values(text, parse):
+    values = [parse(value) for value in text.split(",") if value]
+    if not values:
+        raise ValueError("no values")
+    return values
+
+
+def apply_settings(overrides):
+    """Set ``settings`` values in every loaded snakelite module that imported
+    them, undoing whatever an earlier call overrode."""
+    unknown = sorted(set(overrides) - set(SWEEPABLE))
+    if unknown:
+        raise ValueError(f"cannot sweep {', '.join(unknown)}; only {', '.join(SWEEPABLE)}")
+    for name in overrides:
+        _originals.setdefault(name, getattr(settings, name))
+    wanted = dict(_originals, **overrides)
+    modules = [module for name, module in list(sys.modules.items())
+               if name.startswith("snakelite.") and module is not None]
+    for name, value in wanted.items():
+        current = getattr(settings, name)
+        for module in modules:
+            # Only names bound to the settings value itself, so an unrelated
+            # name that happens to match is left alone
+            if getattr(module, name, None) is current:
+                setattr(module, name, value)
+
+
+def point_levels(foods):
+    """The shipped levels with the food counts of ``foods`` (``{level:
+    count}``), copied so the process-wide pack is left as it is."""
+    levels = list(load_levels())
+    for number, count in foods.items():
+        level = levels[number - 1] = copy.copy(levels[number - 1])
+        level.foods = count
+    return levels
+
+
+def play(point, seeds, runs, tick_limit):
+    """Play a game per seed at ``point`` (``(overrides, foods)``); returns
+    ``(score, level reached, death reason)`` for every run, game by game."""
+    overrides, foods = point
+    apply_settings(overrides)
+    levels = point_levels(foods)
+    price = settings.SHIELD_PRICE
+    records = []
+    for seed in seeds:
+        game = SnakeGame(seed=seed, levels=levels)
+        bot = Autopilot(game, budget_ms=None)
+        for _ in range(runs):
+            ticks = 0
+            while game.game_state not in ("shop", "victory") and ticks < tick_limit:
+                if game.game_state == "playing":
+                    game.step(bot.act())
+                    ticks += 1
+                else:
+                    bot.skip_menus()
+            if game.game_state == "shop":
+                reason = game.death_reason
+            else:
+                reason = VICTORY if game.game_state == "victory" else OUT_OF_TICKS
+            records.append((game.score, game.current_level, reason))
+            if game.game_state == "shop":
+                while game.coins >= price:
+                    game.buy_shield()
+            game.new_run()
+    return records
+
+
+def point_key(point, games, runs, tick_limit, seed):
+    """Hash of everything that decides a point's results."""
+    overrides, foods = point
+    levels = load_levels()
+    config = {
+        "version": SWEEP_VERSION,
+        "settings": dict(sweepable(), **overrides),
+        "foods": [foods.get(number, level.foods) for number, level in enumerate(levels, 1)],
+        "levels": levels.source_hash.hex(),
+        "boards": [level.board for level in levels],
+        "games": games,
+        "runs": runs,
+        "tick_limit": tick_limit,
+        "seed": seed,
+    }
+    return hashlib.blake2b(json.dumps(config, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+def summarize(records):
+    scores = np.array([score for score, _, _ in records])
+    return {
+        "runs": len(records),
+        "score_mean": float(scores.mean()),
+        "score_percentiles": dict(zip(map(str, SCORE_PERCENTILES),
+                                      np.percentile(scores, SCORE_PERCENTILES).tolist())),
+        "score_max": int(scores.max()),
+        "levels": dict(sorted(Counter(level for _, level, _ in records).items())),
+        "death_reasons": dict(Counter(reason for _, _, reason in records).most_common()),
+        "records": records,
+    }
+
+
+def cache_dir(directory=None):
+    if directory is None:
+        directory = settings.SWEEP_CACHE_DIR
+    if directory is None:
+        directory = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                                 "snakelite", "sweep")
+    return directory
+
+
+def read_cached(directory, key):
+    try:
+        with open(os.path.join(directory, f"{key}.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_cached(directory, key, result):
+    path = os.path.join(directory, f"{key}.json")
+    try:
+        os.makedirs(directory, exist_ok=True)
+        # Written aside and renamed, so a concurrent sweep never reads half
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "w") as f:
+            json.dump(result, f)
+        os.replace(partial, path)
+    except OSError as error:
+        print(f"could not cache {key}: {error}", file=sys.stderr)
+
+
+def run_sweep(points, games, runs=3, tick_limit=settings.SWEEP_TICK_LIMIT, seed=0, jobs=None, directory=None,
+              report=None):
+    """Results for every point of ``points``, from the cache or played.
+
+    ``report(result, cached)`` is called as each point completes.
+    """
+    directory = cache_dir(directory)
+    keys = [point_key(point, games, runs, tick_limit, seed) for point in points]
+    results = [read_cached(directory, key) for key in keys]
+    for result in results:
+        if result is not None and report is not None:
+            report(result, True)
+    todo = [i for i, result in enumerate(results) if result is None]
+    if not todo:
+        return results
+
+    seeds = list(range(seed, seed + games))
+    chunks = [seeds[start:start + CHUNK_GAMES] for start in range(0, games, CHUNK_GAMES)]
+    parts = {i: [None] * len(chunks) for i in todo}
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(play, points[i], chunk, runs, tick_limit): (i, n)
+            for i in todo for n, chunk in enumerate(chunks)
+        }
+        for future in as_completed(futures):
+            i, n = futures[future]
+            parts[i][n] = future.result()
+            if any(part is None for part in parts[i]):
+                continue
+            overrides, foods = points[i]
+            result = {
+                "key": keys[i],
+                "settings": overrides,
+                "foods": {str(number): count for number, count in foods.items()},
+                "games": games,
+                **summarize([tuple(record) for part in parts.pop(i) for record in part]),
+            }
+            write_cached(directory, keys[i], result)
+            results[i] = result
+            if report is not None:
+                report(result, False)
+    return results
+
+
+def grid(axes, food_axes):
+    """Every combination of the axes, as ``(overrides, foods)`` points."""
+    names = list(axes)
+    levels = list(food_axes)
+    points = []
+    for values in itertools.product(*axes.values(), *food_axes.values()):
+        points.append((dict(zip(names, values)), dict(zip(levels, values[len(names):]))))
+    return points
+
+
+def describe(result):
+    point = [f"{name}={value}" for name, value in result["settings"].items()]
+    point += [f"foods[{level}]={count}" for level, count in result["foods"].items()]
+    return " ".join(point) or "defaults"
+
+
+def print_result(result, cached):
+    percentiles = result["score_percentiles"]
+    reasons = ", ".join(f"{reason} {count}" for reason, count in result["death_reasons"].items())
+    levels = " ".join(f"{level}:{count}" for level, count in result["levels"].items())
+    print(f"{describe(result)}\tscore mean {result['score_mean']:.1f} p50 {percentiles['50']:.0f}"
+          f" p90 {percentiles['90']:.0f}\tlevels {levels}\t{reasons}{' (cached)' if cached else ''}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play many headless snakelite games over a grid of settings")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=A,B,...",
+                        help="values of a setting to sweep (repeatable; see --list)")
+    parser.add_argument("--foods", action="append", default=[], metavar="LEVEL=A,B,...",
+                        help="starting food counts to sweep for a level (repeatable)")
+    parser.add_argument("--games", type=int, default=100, help="seeded games per point")
+    parser.add_argument("--runs", type=int, default=3, help="runs per game, with shopping in between")
+    parser.add_argument("--tick-limit", type=int, default=settings.SWEEP_TICK_LIMIT,
+                        help="ticks a run may take before it is cut off")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("-j", "--jobs", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--cache", help="result cache directory")
+    parser.add_argument("-o", "--output", help="where to write every point's results as JSON")
+    parser.add_argument("--list", action="store_true", help="list the settings that can be swept")
+    args = parser.parse_args(argv)
+
+    known = sweepable()
+    if args.list:
+        for name, value in known.items():
+            print(f"{name:<28} {value}")
+        return 0
+    if args.games < 1 or args.runs < 1:
+        parser.error("--games and --runs must be at least 1")
+
+    axes = {}
+    for text in args.set:
+        name, _, values = text.partition("=")
+        if name not in known:
+            parser.error(f"{name} cannot be swept (see --list)")
+        try:
+            axes[name] = parse_values(values, type(known[name]))
+        except ValueError:
+            parser.error(f"bad values for {name}: {values!r}")
+    food_axes = {}
+    level_count = len(load_levels())
+    for text in args.foods:
+        level, _, values = text.partition("=")
+        try:
+            level = int(level)
+            food_axes[level] = parse_values(values, int)
+        except ValueError:
+            parser.error(f"bad --foods {text!r}")
+        if not 1 <= level <= level_count:
+            parser.error(f"--foods level must be between 1 and {level_count}")
+        if any(not 0 <= count < 2**16 for count in food_axes[level]):
+            parser.error("food counts must be between 0 and 65535")
+
+    points = grid(axes, food_axes)
+    started = time.perf_counter()
+    results = run_sweep(points, args.games, args.runs, args.tick_limit, args.seed, args.jobs, args.cache,
+                        print_result)
+    print(f"{len(points)} points, {args.games} games each, in {time.perf_counter() - started:.1f}s",
+          file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import math
+
+import numpy as np
+import pygame
+from snakelite.settings import (
+    BLOCK_SIZE, SLOWDOWN_LIFETIME, BOMB_DURATION, EXPLOSION_DURATION, FOOD_MAX_AGE,
+    FOOD_COLOR_STEPS, EFFECT_ALPHA_STEPS, WHITE, BLUE, YELLOW, ORANGE, PURPLE, DARK_GREY, DARK_GREEN,
+)
+
+
+def _tile(color, size=BLOCK_SIZE, alpha=None, border=None, border_width=0):
+    surf = pygame.Surface((size, size))
+    surf.fill(color)
+    if border is not None:
+        pygame.draw.rect(surf, border, (0, 0, size, size), border_width)
+    if alpha is not None:
+        surf.set_alpha(alpha)
+    return surf
+
+
+class TileAtlas:
+    """Pre-rendered cell tiles for every entity and effect.
+
+    Colors that vary with time (food aging, bomb fuses, fading slowdowns
+    and explosions) are baked at a fixed number of steps, so drawing any
+    entity is a lookup plus a blit and a whole layer can go to the screen
+    in one ``Surface.blits`` call.
+    """
+
+    def __init__(self, food_steps=FOOD_COLOR_STEPS, alpha_steps=EFFECT_ALPHA_STEPS):
+        self.food_steps = food_steps
+        self.alpha_steps = alpha_steps
+
+        self.stone = _tile(DARK_GREY)
+        self.projectile = _tile(WHITE, BLOCK_SIZE // 2)
+
+        # Bright orange-red (255, 69, 0) aging to dark red (139, 0, 0)
+        self.foods = []
+        for step in range(food_steps + 1):
+            ratio = step / food_steps
+            self.foods.append(_tile((int(255 - 116 * ratio), int(69 - 69 * ratio), 0)))
+
+        # Dark orange while the fuse is long, light orange as it burns down;
+        # one tile per distinct green value
+        self.bombs = [_tile((255, 165 + g, 0)) for g in range(91)]
+
+        self.slowdowns = [_tile(BLUE, alpha=255 * step // alpha_steps) for step in range(alpha_steps + 1)]
+        self.explosions = [_tile(ORANGE, alpha=255 * step // alpha_steps) for step in range(alpha_steps + 1)]
+
+        # Pulse thickness int(3 + sin(t) * 1.5) ranges over 1..4
+        self.powerups = [None] + [_tile(YELLOW, border=ORANGE, border_width=w) for w in range(1, 5)]
+
+        self.snake = {}
+        for powered_up in (False, True):
+            for active_slows in range(4):
+                self.snake[powered_up, active_slows] = self._snake_tiles(powered_up, active_slows)
+        # Other players' snakes in an arena, in one style whatever their state
+        self.rival = (_tile((200, 120, 255), border=PURPLE, border_width=1),
+                      _tile(PURPLE, border=WHITE, border_width=1))
+
+    @staticmethod
+    def _snake_tiles(powered_up, active_slows):
+        """(head, body) tiles for a snake style."""
+        if powered_up:
+            head_color = (255, 0, 0)  # Heroic red
+            body_color = (0, 0, 255)  # Heroic blue
+            border_color = (255, 255, 0)  # Bright yellow border
+        else:
+            head_color = (int(255 * (active_slows/3 * 0.7)), int(255 - 255 * (active_slows/3 * 0.7)), 0)
+            body_color = (int(255 * (active_slows/3)), 255 - int(255 * (active_slows/3)), 0)
+            border_color = DARK_GREEN
+        width = 2 if powered_up else 1
+        return (_tile(head_color, border=border_color, border_width=width),
+                _tile(body_color, border=border_color, border_width=width))
+
+    def food(self, age):
+        ratio = min(age / FOOD_MAX_AGE, 1.0)
+        return self.foods[round(ratio * self.food_steps)]
+
+    def bomb(self, remaining):
+        return self.bombs[int(90 * max(0, remaining) / BOMB_DURATION)]
+
+    def slowdown(self, remaining):
+        ratio = max(0, remaining) / SLOWDOWN_LIFETIME
+        return self.slowdowns[round(ratio * self.alpha_steps)]
+
+    def explosion(self, remaining):
+        ratio = min(max(0, remaining) / EXPLOSION_DURATION, 1.0)
+        return self.explosions[round(ratio * self.alpha_steps)]
+
+    # Column forms of the lookups above: tile indexes for a whole entity store
+
+    def bomb_steps(self, remaining):
+        return (90 * np.maximum(0, remaining) / BOMB_DURATION).astype(np.intp)
+
+    def slowdown_steps(self, remaining):
+        ratio = np.maximum(0, remaining) / SLOWDOWN_LIFETIME
+        return np.rint(ratio * self.alpha_steps).astype(np.intp)
+
+    def explosion_steps(self, remaining):
+        ratio = np.minimum(np.maximum(0, remaining) / EXPLOSION_DURATION, 1.0)
+        return np.rint(ratio * self.alpha_steps).astype(np.intp)
+
+    def powerup(self, current_time):
+        return self.powerups[int(3 + math.sin(current_time / 500) * 1.5)]
@@ -1,17 +1,104 @@
+import numpy as np
 import pygame
-import math
-from snakelite.settings import *
-from snakelite.entities.food.bomb_food import BombFood
-from snakelite.entities.food.slowdown_food import SlowdownFood
+from snakelite.settings import (
+    BLOCK_SIZE, WIDTH, HEIGHT, SLOWDOWN_LIFETIME, BOMB_DURATION, INTERPOLATE, DIRTY_RECTS, BLACK,
+    SHIELD_PRICE, WHITE, RED, GREEN, YELLOW, CYAN, GOLD, ICE_BLUE,
+)
+from snakelite.core.grid import LAYER_STONE, LAYER_SNAKE
+from snakelite.ui.atlas import TileAtlas
+from snakelite.ui.text_cache import TextCache
+
+def _wrap_step(delta, size):
+    # A step across the board edge slides in from off-screen instead of
+    # sweeping across the window
+    if delta > BLOCK_SIZE:
+        return delta - size
+    if delta < -BLOCK_SIZE:
+        return delta + size
+    return delta
+
+
+def _view_axis(values, camera, size, window):
+    # Window coordinates along one axis. A scrolling axis wraps around the
+    # camera, with a cell hanging off the near edge just below 0
+    if size <= window:
+        return values
+    return (values - camera + BLOCK_SIZE) % size - BLOCK_SIZE
+
+
+def _tiles(tiles, steps, xs, ys):
+    # (tile, position) pairs for a store's columns and its tile indexes
+    return list(zip(map(tiles.__getitem__, steps.tolist()), zip(xs.tolist(), ys.tolist())))
+
 
 class GameRenderer:
-    def __init__(self, game):
+    """Draws the game into a ``WIDTH`` x ``HEIGHT`` window.
+
+    A world larger than the window is seen through a camera that follows
+    the snake's head, and only what falls inside the window is looked up
+    and drawn, so a frame costs the same on any size of board.
+    """
+
+    def __init__(self, game, dirty_rects=DIRTY_RECTS):
         self.game = game
-        self.window = pygame.display.set_mode((WIDTH, HEIGHT))
-        pygame.display.set_caption("Snake Game")
-        self.font = pygame.font.Font(None, 36)
+        # Opened on the first frame drawn
+        self.window = None
+        self.text = TextCache()
+        self.atlas = TileAtlas()
+        # World position (pixels) drawn at the window's top left corner
+        self.camera = (0, 0)
+        # Dirty-rect mode: background and stones pre-rendered, plus what the
+        # last frame drew on top of them
+        self._static = None
+        self._background = None
+        self._animated = set()
+        self._hud_rects = []
+        self._snake_style = None
+        self._last_head = None
+        self._wants_dirty_rects = dirty_rects
+        self._fit_world()
+
+    def _fit_world(self):
+        # Pick the drawing mode for the world's size; levels may change it
+        grid = self.game.grid
+        self._world = (grid.cols, grid.rows)
+        self.scrolls = grid.width > WIDTH or grid.height > HEIGHT
+        # Dirty rects assume a fixed view
+        dirty_rects = self._wants_dirty_rects and not self.scrolls
+        self.dirty_rects = dirty_rects
+        # Dirty rects track whole cells, so that mode draws on the grid
+        self.interpolate = INTERPOLATE and not dirty_rects
+        self._static = None
+        if dirty_rects and grid.changed is None:
+            grid.track_changes()
+        elif not dirty_rects and self._wants_dirty_rects:
+            # Nothing drains the changes of a scrolling view
+            grid.changed = None
+
+    def invalidate(self):
+        """Draw the next frame in full, e.g. after the game state jumped."""
+        self._static = None
+
+    def open_window(self):
+        """Start pygame's display and open the window, if not done yet."""
+        if self.window is None:
+            if not pygame.display.get_init():
+                pygame.display.init()
+            self.window = pygame.display.set_mode((WIDTH, HEIGHT))
+            pygame.display.set_caption("Snake Game")
+        return self.window
 
     def draw(self):
+        if self.window is None:
+            self.open_window()
+        grid = self.game.grid
+        if (grid.cols, grid.rows) != self._world:
+            self._fit_world()
+        if self.dirty_rects and self.game.game_state == "playing":
+            self._draw_playing_dirty()
+            return
+        self._static = None
+
         if self.game.game_state == "start":
             self._draw_start()
         elif self.game.game_state == "playing":
@@ -24,6 +111,9 @@ class GameRenderer:
             self._draw_shop()
         elif self.game.game_state == "game_over":
             self._draw_game_over()
+        if self.game.game_state != "playing":
+            # The HUD already carries the overlay while playing
+            self.window.blits(self._overlay_items(), doreturn=False)
         pygame.display.flip()
 
     def _draw_start(self):
@@ -33,94 +123,308 @@ class GameRenderer:
         
     def _draw_playing(self):
         self.window.fill(ICE_BLUE if self.game.active_slowdowns else BLACK)
+        snake = self._snake_positions()
+        self._follow(snake[0])
         self._draw_environment()
-        self._draw_snake()
+        self._draw_rivals()
+        self._draw_snake(snake)
         self._draw_ui()
 
-    def _draw_environment(self):
-        current_time = pygame.time.get_ticks()
-        # Draw stone blocks
-        for block in self.game.stone_blocks:
-            pygame.draw.rect(self.window, DARK_GREY, (*block, BLOCK_SIZE, BLOCK_SIZE))
+    def _follow(self, head):
+        """Centre the camera on ``head``, along the axes the world is wider
+        than the window."""
+        grid = self.game.grid
+        x = head[0] + (BLOCK_SIZE - WIDTH) // 2 if grid.width > WIDTH else 0
+        y = head[1] + (BLOCK_SIZE - HEIGHT) // 2 if grid.height > HEIGHT else 0
+        self.camera = (x, y)
+
+    def _on_screen(self, xs, ys):
+        """Window positions of the world positions ``xs, ys`` (arrays) and
+        which of them are at least partly in view."""
+        grid = self.game.grid
+        xs = _view_axis(xs, self.camera[0], grid.width, WIDTH)
+        ys = _view_axis(ys, self.camera[1], grid.height, HEIGHT)
+        return xs, ys, (xs < WIDTH) & (ys < HEIGHT)
+
+    def _screen_position(self, pos):
+        """``_on_screen`` for one position; ``None`` when out of view."""
+        grid = self.game.grid
+        x = _view_axis(pos[0], self.camera[0], grid.width, WIDTH)
+        y = _view_axis(pos[1], self.camera[1], grid.height, HEIGHT)
+        return (x, y) if x < WIDTH and y < HEIGHT else None
+
+    def _view_region(self):
+        """The cells ``(x, y, cols, rows)`` under the window."""
+        grid = self.game.grid
+        x, y = self.camera[0] // BLOCK_SIZE, self.camera[1] // BLOCK_SIZE
+        # One more cell when the view straddles cell edges
+        cols = min(-(-WIDTH // BLOCK_SIZE) + 1, grid.cols)
+        rows = min(-(-HEIGHT // BLOCK_SIZE) + 1, grid.rows)
+        return x % grid.cols, y % grid.rows, cols, rows
+
+    def _region_positions(self, region, xs, ys):
+        """``_on_screen`` for cells ``xs, ys`` of a ``_view_region``."""
+        grid = self.game.grid
+        x, y, _, _ = region
+        return self._on_screen((xs + x) % grid.cols * BLOCK_SIZE, (ys + y) % grid.rows * BLOCK_SIZE)
+
+    def _stones(self):
+        """Window positions of the stones in view, read from the grid's
+        chunks under the window."""
+        region = self._view_region()
+        xs, ys = np.nonzero(self.game.grid.region(LAYER_STONE, *region))
+        xs, ys, visible = self._region_positions(region, xs, ys)
+        return list(zip(xs[visible].tolist(), ys[visible].tolist()))
+
+    def _draw_playing_dirty(self):
+        """Redraw only the cells that changed since the last frame.
+
+        Stones and the background live on a pre-rendered static surface.
+        Every frame restores and redraws the cells that hold animated
+        entities (their colors depend on time), the cells the grid reports as
+        changed, the snake's old and new head, and whatever sits under the
+        HUD, then pushes just those rectangles to the display.
+        """
+        game = self.game
+        background = ICE_BLUE if game.active_slowdowns else BLACK
+        if self._static is None or background != self._background:
+            self._draw_playing_full(background)
+            return
+
+        changed = game.grid.drain_changes()
+        for cell in changed:
+            self._draw_static_cell(cell)
+        dirty = set(changed)
+        layers = self._environment_layers()
+        animated = {pos for layer in layers for _, pos in layer}
+        dirty.update(animated)
+        dirty.update(self._animated)
+        self._animated = animated
+
+        style = self._snake_style_key()
+        if style != self._snake_style:
+            dirty.update(game.snake)
+            self._snake_style = style
+        head = game.snake[0]
+        dirty.add(head)
+        dirty.add(self._last_head)
+        self._last_head = head
+
+        hud = self._hud_items()
+        hud_rects = [rect for _, rect in hud]
+        for rect in hud_rects + self._hud_rects:
+            dirty.update(self._cells_under(rect))
+
+        rects = [pygame.Rect(cell, (BLOCK_SIZE, BLOCK_SIZE)) for cell in dirty]
+        self.window.blits([(self._static, rect, rect) for rect in rects], doreturn=False)
+        for layer in layers:
+            self.window.blits([item for item in layer if item[1] in dirty], doreturn=False)
+        head_tile, body_tile = self.atlas.snake[style]
+        count = game.grid.count
+        tiles = self._rival_tiles()
+        self.window.blits(
+            [(tiles.get(cell, head_tile if cell == head else body_tile), cell)
+             for cell in dirty if count(LAYER_SNAKE, cell)],
+            doreturn=False,
+        )
+        self.window.blits(hud, doreturn=False)
+        rects.extend(hud_rects)
+        rects.extend(self._hud_rects)
+        self._hud_rects = hud_rects
+        pygame.display.update(rects)
+
+    def _draw_playing_full(self, background):
+        self._background = background
+        self._static = pygame.Surface((WIDTH, HEIGHT))
+        self._static.fill(background)
+        stone = self.atlas.stone
+        self._static.blits([(stone, block) for block in self._stones()], doreturn=False)
+        self.game.grid.drain_changes()
 
-        # Draw food with bombs and slowdowns
+        self.window.blit(self._static, (0, 0))
+        layers = self._environment_layers()
+        for layer in layers:
+            self.window.blits(layer, doreturn=False)
+        self._draw_rivals()
+        self._draw_snake()
+        hud = self._hud_items()
+        self.window.blits(hud, doreturn=False)
+
+        self._animated = {pos for layer in layers for _, pos in layer}
+        self._hud_rects = [rect for _, rect in hud]
+        self._snake_style = self._snake_style_key()
+        self._last_head = self.game.snake[0]
+        pygame.display.flip()
+
+    def _draw_static_cell(self, cell):
+        self._static.fill(self._background, (*cell, BLOCK_SIZE, BLOCK_SIZE))
+        if self.game.grid.count(LAYER_STONE, cell):
+            self._static.blit(self.atlas.stone, cell)
+
+    def _cells_under(self, rect):
+        left = max(rect.left // BLOCK_SIZE, 0)
+        right = min((rect.right - 1) // BLOCK_SIZE, WIDTH // BLOCK_SIZE - 1)
+        top = max(rect.top // BLOCK_SIZE, 0)
+        bottom = min((rect.bottom - 1) // BLOCK_SIZE, HEIGHT // BLOCK_SIZE - 1)
+        return [(x * BLOCK_SIZE, y * BLOCK_SIZE) for x in range(left, right + 1) for y in range(top, bottom + 1)]
+
+    def _environment_layers(self):
+        """Everything above the stones as ``(tile, position)`` lists, one
+        per layer in drawing order: foods, bombs, slowdowns, powerups,
+        projectiles, explosions."""
+        atlas = self.atlas
+        current_time = self.game.clock.now()
+        foods = []
         for food in self.game.foods:
-            # Calculate age-based color (bright orange-red to dark red)
-            age = current_time - food.creation_time
-            ratio = min(age / FOOD_MAX_AGE, 1.0)
-            # Start with bright orange-red (255, 69, 0) -> dark red (139, 0, 0)
-            r = int(255 - (116 * ratio))  # 255 -> 139
-            g = int(69 - (69 * ratio))    # 69 -> 0
-            food_color = (r, g, 0)
-            pygame.draw.rect(self.window, food_color, (*food.position, BLOCK_SIZE, BLOCK_SIZE))
-            
-            if isinstance(food, BombFood):
-                for bomb in food.active_bombs:
-                    self._draw_bomb(bomb)
-            elif isinstance(food, SlowdownFood):
-                for slowdown in food.active_slowdowns:
-                    self._draw_slowdown(slowdown)
-
-        # Draw powerups and projectiles
-        for powerup in self.game.powerups:
-            # Main powerup body
-            pygame.draw.rect(self.window, YELLOW, (powerup[0], powerup[1], BLOCK_SIZE, BLOCK_SIZE))
-            # Pulsating border effect
-            pulse_thickness = int(3 + math.sin(pygame.time.get_ticks() / 500) * 1.5)
-            pygame.draw.rect(self.window, ORANGE, (powerup[0], powerup[1], BLOCK_SIZE, BLOCK_SIZE), pulse_thickness)
-            
-        for proj in self.game.projectiles:
-            pygame.draw.rect(self.window, WHITE, (proj[0], proj[1], BLOCK_SIZE//2, BLOCK_SIZE//2))
-
-        # Draw explosion effects
-        for (x, y, end_time) in self.game.affected_blocks:
-            if current_time < end_time:
-                alpha = 255 * (end_time - current_time) / EXPLOSION_DURATION
-                surf = pygame.Surface((BLOCK_SIZE, BLOCK_SIZE))
-                surf.set_alpha(alpha)
-                surf.fill(ORANGE)
-                self.window.blit(surf, (x, y))
-
-    def _draw_snake(self):
-        powered_up = len(self.game.active_powerups) > 0
-        for i, segment in enumerate(self.game.snake):
-            if powered_up:
-                head_color = (255, 0, 0)  # Heroic red
-                body_color = (0, 0, 255)  # Heroic blue
-                border_color = (255, 255, 0)  # Bright yellow border
-                color = head_color if i == 0 else body_color
-            else:
-                active_slows = min(len(self.game.active_slowdowns), 3)
-                head_color = (int(255 * (active_slows/3 * 0.7)), int(255 - 255 * (active_slows/3 * 0.7)), 0)
-                body_color = (int(255 * (active_slows/3)), 255 - int(255 * (active_slows/3)), 0)
-                color = head_color if i == 0 else body_color
-                border_color = DARK_GREEN
-                
-            # Draw segment with border
-            pygame.draw.rect(self.window, color, (*segment, BLOCK_SIZE, BLOCK_SIZE))
-            pygame.draw.rect(self.window, border_color, (*segment, BLOCK_SIZE, BLOCK_SIZE), 2 if powered_up else 1)
+            pos = self._screen_position(food.position)
+            if pos is not None:
+                foods.append((atlas.food(current_time - food.creation_time), pos))
+
+        def in_view(store, live):
+            # Window positions of the live entities in view, and their slots
+            xs, ys, visible = self._on_screen(store.x[live], store.y[live])
+            return xs[visible], ys[visible], live[visible]
+
+        bombs = self.game.bombs
+        xs, ys, live = in_view(bombs, bombs.live())
+        bombs = _tiles(atlas.bombs, atlas.bomb_steps(bombs.t[live] + BOMB_DURATION - current_time), xs, ys)
+        elements = self.game.slowdown_elements
+        xs, ys, live = in_view(elements, elements.live())
+        slowdowns = _tiles(atlas.slowdowns, atlas.slowdown_steps(elements.t[live] + SLOWDOWN_LIFETIME - current_time),
+                           xs, ys)
+
+        powerup_tile = atlas.powerup(current_time)
+        xs, ys, _ = in_view(self.game.powerups, self.game.powerups.live())
+        powerups = [(powerup_tile, pos) for pos in zip(xs.tolist(), ys.tolist())]
+        shots = self.game.projectiles
+        live = shots.live()
+        xs, ys = shots.x[live], shots.y[live]
+        lag = self._lag()
+        if lag:
+            # Projectiles fired since the last tick have not moved yet
+            moved = shots.t[live] < current_time
+            xs = xs - np.rint(shots.dx[live] * BLOCK_SIZE * lag).astype(np.int32) * moved
+            ys = ys - np.rint(shots.dy[live] * BLOCK_SIZE * lag).astype(np.int32) * moved
+        xs, ys, visible = self._on_screen(xs, ys)
+        projectiles = [(atlas.projectile, pos) for pos in zip(xs[visible].tolist(), ys[visible].tolist())]
+        region = self._view_region()
+        ends = self.game.hazards.region(*region)
+        xs, ys = np.nonzero(ends > current_time)
+        left = ends[xs, ys] - current_time
+        xs, ys, visible = self._region_positions(region, xs, ys)
+        explosions = _tiles(atlas.explosions, atlas.explosion_steps(left[visible]), xs[visible], ys[visible])
+        return foods, bombs, slowdowns, powerups, projectiles, explosions
+
+    def _draw_environment(self):
+        stone = self.atlas.stone
+        self.window.blits([(stone, block) for block in self._stones()], doreturn=False)
+        for layer in self._environment_layers():
+            self.window.blits(layer, doreturn=False)
+
+    def _snake_style_key(self):
+        return len(self.game.active_powerups) > 0, min(len(self.game.active_slowdowns), 3)
+
+    def _lag(self):
+        """How far, in ticks, drawn positions trail the simulation."""
+        if not self.interpolate:
+            return 0
+        return 1.0 - self.game.frame_alpha
+
+    def _draw_snake(self, snake=None):
+        head_tile, body_tile = self.atlas.snake[self._snake_style_key()]
+        if snake is None:
+            snake = self._snake_positions()
+        snake = list(map(self._screen_position, snake))
+        # The camera follows the head, so it is always in view
+        self.window.blit(head_tile, snake[0])
+        self.window.blits([(body_tile, segment) for segment in snake[1:] if segment is not None], doreturn=False)
+
+    def _rival_tiles(self):
+        """Tile for each cell of the other snakes, by position."""
+        head_tile, body_tile = self.atlas.rival
+        tiles = {}
+        for rival in self.game.rivals:
+            tiles.update(dict.fromkeys(rival, body_tile))
+            tiles[rival[0]] = head_tile
+        return tiles
+
+    def _draw_rivals(self):
+        if not self.game.rivals:
+            return
+        items = []
+        for cell, tile in self._rival_tiles().items():
+            pos = self._screen_position(cell)
+            if pos is not None:
+                items.append((tile, pos))
+        self.window.blits(items, doreturn=False)
+
+    def _snake_positions(self):
+        """Segment positions, slid back toward the cells they held before
+        the last tick while the next one is still pending.
+
+        Each segment moved into the cell of the segment ahead of it, so the
+        one behind shows where it came from; the last segment came from the
+        tail cell the tick vacated, or stays put if the snake grew.
+        """
+        game = self.game
+        snake = game.snake
+        lag = self._lag()
+        if not lag or not game.moved:
+            return snake
+        width, height = game.grid.width, game.grid.height
+        positions = []
+        last = len(snake) - 1
+        for i, (x, y) in enumerate(snake):
+            previous = snake[i + 1] if i < last else game.last_tail
+            if previous is None:
+                positions.append((x, y))
+                continue
+            dx = _wrap_step(x - previous[0], width)
+            dy = _wrap_step(y - previous[1], height)
+            positions.append((x - round(dx * lag), y - round(dy * lag)))
+        return positions
 
     def _draw_ui(self):
+        for surf, rect in self._hud_items():
+            self.window.blit(surf, rect)
+
+    def _hud_items(self):
         # Score and level
-        self._draw_text(f"Score: {self.game.score}", 28, WHITE, 10, pos_x=10)
-        self._draw_text(f"Level: {self.game.current_level}", 28, WHITE, 10, pos_x=WIDTH-150)
-        
+        items = [
+            self._text_item(f"Score: {self.game.score}", 28, WHITE, 10, pos_x=10),
+            self._text_item(f"Level: {self.game.current_level}", 28, WHITE, 10, pos_x=WIDTH-150),
+        ]
+
         # Shields display
-        shield_text = f"Shields: {self.game.shield_count}"
-        text_surf = self.font.render(shield_text, True, CYAN)
-        self.window.blit(text_surf, (WIDTH//2 - text_surf.get_width()//2, 10))
-        
+        text_surf = self.text.render(f"Shields: {self.game.shield_count}", 36, CYAN)
+        items.append((text_surf, text_surf.get_rect(topleft=(WIDTH//2 - text_surf.get_width()//2, 10))))
+
         # Slowdown/powerup indicators
         if self.game.active_slowdowns:
-            self._draw_text("SLOWED!", 32, ICE_BLUE, HEIGHT-40)
+            items.append(self._text_item("SLOWED!", 32, ICE_BLUE, HEIGHT-40))
         if self.game.active_powerups:
-            self._draw_text("POWERED UP!", 32, YELLOW, HEIGHT-80)
+            items.append(self._text_item("POWERED UP!", 32, YELLOW, HEIGHT-80))
+        items.extend(self._overlay_items())
+        return items
+
+    def _overlay_items(self):
+        # Profiler frame-time table, toggled with F3
+        profiler = self.game.profiler
+        if profiler is None or not profiler.overlay:
+            return []
+        items = []
+        y = 40
+        for line in profiler.overlay_lines():
+            surf = self.text.render(line, 20, WHITE)
+            items.append((surf, surf.get_rect(topleft=(10, y))))
+            y += surf.get_height()
+        return items
 
     def _draw_shop(self):
         self.window.fill(BLACK)
         self._draw_text("SHOP", 64, CYAN, HEIGHT//4)
         self._draw_text(f"Coins: {self.game.coins}", 36, WHITE, HEIGHT//3)
-        self._draw_text("1. Buy Shield (5 coins)", 32, CYAN, HEIGHT//2)
+        self._draw_text(f"1. Buy Shield ({SHIELD_PRICE} coins)", 32, CYAN, HEIGHT//2)
         self._draw_text("SPACE to exit shop", 28, WHITE, HEIGHT-100)
 
     def _draw_level_complete(self):
@@ -142,34 +446,13 @@ class GameRenderer:
         self._draw_text("Press SPACE to continue", 28, WHITE, HEIGHT-100)
 
     def _draw_text(self, text, size, color, y, pos_x=None):
-        font = pygame.font.Font(None, size)
-        text_surface = font.render(text, True, color)
+        self.window.blit(*self._text_item(text, size, color, y, pos_x))
+
+    def _text_item(self, text, size, color, y, pos_x=None):
+        text_surface = self.text.render(text, size, color)
         text_rect = text_surface.get_rect()
         if pos_x is None:  # Center text
             text_rect.center = (WIDTH // 2, y)
         else:  # Left-align
             text_rect.topleft = (pos_x, y)
-        self.window.blit(text_surface, text_rect)
-
-    def _draw_bomb(self, bomb):
-        """Draw a bomb with a burning effect that changes color over time"""
-        # Unpack all 4 values from bomb tuple (x, y, creation_time, radius)
-        x, y, creation_time, radius = bomb
-        end_time = creation_time + BOMB_DURATION
-        remaining = max(0, end_time - pygame.time.get_ticks())
-        ratio = remaining / BOMB_DURATION
-        # Color transitions from dark orange to light orange
-        bomb_color = (255, 165 + int(90 * ratio), 0)
-        pygame.draw.rect(self.window, bomb_color, (int(x), int(y), BLOCK_SIZE, BLOCK_SIZE))
-
-    def _draw_slowdown(self, slowdown):
-        """Draw a slowdown effect with a blue tint that fades over time"""
-        x, y, duration = slowdown
-        current_time = pygame.time.get_ticks()
-        remaining = max(0, current_time - (current_time - duration))
-        ratio = remaining / duration
-        # Create a semi-transparent blue surface
-        surf = pygame.Surface((BLOCK_SIZE, BLOCK_SIZE))
-        surf.set_alpha(int(255 * ratio))
-        surf.fill(BLUE)
-        self.window.blit(surf, (int(x), int(y))) 
\ No newline at end of file
+        return text_surface, text_rect
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+import pygame
+from snakelite.settings import FONT_CACHE_SIZE, TEXT_CACHE_SIZE
+
+
+class LRUCache:
+    """Mapping that evicts the least recently used entry past ``maxsize``."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, build):
+        """Return the entry for ``key``, calling ``build()`` to make it on a miss."""
+        entries = self.entries
+        value = entries.get(key)
+        if value is not None:
+            entries.move_to_end(key)
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = entries[key] = build()
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+
+
+def _load_font(size):
+    # The font module starts with the first text drawn, not with pygame
+    if not pygame.font.get_init():
+        pygame.font.init()
+    return pygame.font.Font(None, size)
+
+
+class TextCache:
+    """Fonts keyed by size and rendered text keyed by (text, size, color).
+
+    A string is rasterized once and reused for as long as it is drawn, so a
+    HUD line is only re-rendered on the frame its value changes.
+    """
+
+    def __init__(self, font_cache_size=FONT_CACHE_SIZE, text_cache_size=TEXT_CACHE_SIZE):
+        self.fonts = LRUCache(font_cache_size)
+        self.surfaces = LRUCache(text_cache_size)
+
+    def font(self, size):
+        return self.fonts.get(size, lambda: _load_font(size))
+
+    def render(self, text, size, color):
+        return self.surfaces.get(
+            (text, size, color),
+            lambda: self.font(size).render(text, True, color),
+        )
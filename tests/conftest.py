@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from snakelite.core.grid import LAYER_COUNT
+from snakelite.settings import UP, DOWN, LEFT, RIGHT
+
+ACTIONS = [None] * 6 + [UP, DOWN, LEFT, RIGHT, "fire"]
+
+
+def fingerprint(game):
+    """Everything observable about a game's state, as comparable values."""
+    def rows(store):
+        return sorted(store.rows())
+
+    grid = game.grid
+    return (
+        game.score, game.coins, game.shield_count, game.current_level, game.game_state, game.death_reason,
+        game.current_speed, game.clock.now(), list(game.snake), sorted(game.stone_blocks),
+        [(food.position, food.creation_time, food.food_type) for food in game.foods],
+        rows(game.bombs), rows(game.slowdown_elements), rows(game.powerups), rows(game.projectiles),
+        sorted(game.active_slowdowns.values()), sorted(game.active_powerups.values()),
+        sorted((chunk_id, ends.tobytes()) for chunk_id, ends in game.hazards.chunks.items()),
+        grid.region(range(LAYER_COUNT), 0, 0, grid.cols, grid.rows).tobytes(),
+        game.rng.getstate(),
+    )
+
+
+def drive(game, rng, ticks, on_tick=None):
+    """Step ``game`` with random input for ``ticks`` ticks, pressing through
+    menus, level ends and deaths as a player would."""
+    for _ in range(ticks):
+        if game.game_state == "start":
+            game.start()
+        if game.game_state == "level_intro":
+            game.begin_level()
+        game.step(rng.choice(ACTIONS))
+        if game.game_state == "level_complete":
+            game.next_level()
+        elif game.game_state in ("game_over", "shop"):
+            game.open_shop()
+            game.buy_shield()
+            game.new_run()
+        elif game.game_state == "victory":
+            game.restart()
+        if on_tick is not None:
+            on_tick(game)
+
+
+@pytest.fixture
+def rng():
+    return random.Random(0)
@@ -0,0 +1,164 @@
+import random
+import time
+
+import numpy as np
+import pytest
+from snakelite.core.grid import LAYER_STONE, LAYER_FOOD, LAYER_EXPLOSION
+from snakelite.core.levels import load_levels
+from snakelite.entities.player.snake import SnakeGame
+from snakelite.settings import BLOCK_SIZE as B, BOMB_DURATION, EXPLOSION_DURATION, UP, DOWN, RIGHT
+from snakelite.systems.autopilot import Autopilot, MOVES
+
+
+def playing(seed):
+    game = SnakeGame(seed=seed)
+    game.start()
+    game.begin_level()
+    return game
+
+
+def offset(game, dx, dy):
+    """The position ``(dx, dy)`` cells from the head."""
+    x, y = game.snake[0]
+    return (x + dx * B) % game.grid.width, (y + dy * B) % game.grid.height
+
+
+def add_stone(game, pos):
+    game.stone_blocks.add(pos)
+    game.grid.add(LAYER_STONE, pos)
+
+
+def burn(game, *positions):
+    xs = np.array([x for x, _ in positions], dtype=np.int64)
+    ys = np.array([y for _, y in positions], dtype=np.int64)
+    xs, ys, before = game.hazards.stamp(xs, ys, game.clock.now() + EXPLOSION_DURATION)
+    game.grid.add_many(LAYER_EXPLOSION, xs[before == 0], ys[before == 0])
+
+
+def move_food(game, pos):
+    # Every food but one off to the far side, the one left at ``pos``
+    for i, food in enumerate(game.foods):
+        game.grid.remove(LAYER_FOOD, food.position)
+        food.position = pos if i == 0 else offset(game, game.grid.cols // 2, game.grid.rows // 2 - i)
+        game.grid.add(LAYER_FOOD, food.position)
+
+
+def test_steers_around_stones():
+    game = playing(1)
+    add_stone(game, offset(game, 1, 0))
+    add_stone(game, offset(game, 0, -1))
+    assert Autopilot(game, budget_ms=None).act() == DOWN
+
+
+def test_steers_around_burning_cells():
+    game = playing(1)
+    burn(game, offset(game, 1, 0), offset(game, 0, 1))
+    assert Autopilot(game, budget_ms=None).act() == UP
+
+
+@pytest.mark.parametrize("chained", [False, True])
+def test_sees_a_bomb_chain_coming(chained):
+    game = playing(2)
+    now = game.clock.now()
+    move_food(game, offset(game, 0, 2))
+    add_stone(game, offset(game, 0, -1))
+    # A late bomb whose cross covers the way down to the food ...
+    game.add_bomb((*offset(game, 0, 3), now + 5000, 2))
+    if chained:
+        # ... set off now by one that is due, whose own cross misses the head
+        game.add_bomb((*offset(game, 2, 3), now - BOMB_DURATION, 2))
+    assert Autopilot(game, budget_ms=None).act() == (RIGHT if chained else DOWN)
+
+
+STONE = "You crashed into a stone block!"
+EXPLOSION = "You were caught in an explosion!"
+
+
+def dies(game, move):
+    """Whether steering ``move`` runs the head into a stone, or onto a cell
+    burning when it is checked on the next tick."""
+    snapshot = game.snapshot()
+    game.step(move)
+    dead = game.death_reason == STONE
+    if not game.game_over:
+        game.step(None)
+        dead = game.game_over and game.death_reason == EXPLOSION
+    game.restore(snapshot)
+    return dead
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_never_picks_an_avoidable_stone_or_explosion(seed):
+    game = playing(seed)
+    bot = Autopilot(game, budget_ms=None)
+    avoided = 0
+    for _ in range(1500):
+        if game.game_state != "playing":
+            bot.skip_menus()
+            continue
+        move = bot.act()
+        reverse = (-game.direction[0], -game.direction[1])
+        others = [other for other in MOVES if other not in (move, reverse)]
+        if dies(game, move):
+            assert all(dies(game, other) for other in others)
+        else:
+            avoided += any(dies(game, other) for other in others)
+        game.step(move)
+    # The runs did meet danger
+    assert avoided
+
+
+@pytest.fixture
+def crowded(tmp_path):
+    """A game on a big board with hundreds of bombs around the head, on
+    fuses of every length."""
+    (tmp_path / "01-big.level").write_text("foods 1\nboard 400 300\n")
+    game = SnakeGame(seed=4, levels=load_levels(str(tmp_path), str(tmp_path / "cache")))
+    game.start()
+    game.begin_level()
+    rng = random.Random(4)
+    now = game.clock.now()
+    for _ in range(300):
+        pos = offset(game, rng.randrange(-60, 60), rng.randrange(-60, 60))
+        if pos not in game.snake:
+            game.add_bomb((*pos, now + rng.randrange(BOMB_DURATION), rng.randint(1, 3)))
+    return game
+
+
+def timed(bot, times=20):
+    elapsed = []
+    for _ in range(times):
+        start = time.perf_counter()
+        bot.act()
+        elapsed.append(time.perf_counter() - start)
+    return sorted(elapsed)[times // 2]
+
+
+def test_act_keeps_to_its_budget(crowded):
+    unbudgeted = Autopilot(crowded, budget_ms=None)
+    unbudgeted.act()
+    bot = Autopilot(crowded, budget_ms=2.0)
+    bot.act()
+    # The search is cut short, overrunning by at most the ply it was in
+    assert timed(bot) < 0.002 * 1.5
+    assert bot.depth < unbudgeted.depth
+    assert timed(unbudgeted) > 0.002 * 1.5
+
+
+def moves(seed, ticks):
+    game = playing(seed)
+    bot = Autopilot(game, budget_ms=None)
+    chosen = []
+    for _ in range(ticks):
+        if game.game_state != "playing":
+            bot.skip_menus()
+            continue
+        move = bot.act()
+        chosen.append(move)
+        game.step(move)
+    return chosen, game.score, game.clock.now()
+
+
+def test_unbudgeted_runs_repeat_for_a_seed():
+    assert moves(5, 1500) == moves(5, 1500)
+    assert moves(5, 300) != moves(6, 300)
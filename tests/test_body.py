@@ -0,0 +1,96 @@
+import random
+from collections import deque
+
+import pytest
+from snakelite.core.grid import LAYER_SNAKE, OccupancyGrid
+from snakelite.entities.player.body import SnakeBody
+from snakelite.settings import BLOCK_SIZE as B
+
+COLS, ROWS = 12, 10
+
+
+def cell(i):
+    return i % COLS * B, i // COLS % ROWS * B
+
+
+def assert_matches(body, model):
+    assert len(body) == len(model)
+    assert list(body) == list(model)
+    assert [body[i] for i in range(len(model))] == list(model)
+    occupied = body.grid.region(LAYER_SNAKE, 0, 0, COLS, ROWS)
+    assert occupied.sum() == len(model)
+    assert all(pos in body for pos in model)
+
+
+def test_moves_wrap_around_the_buffer():
+    body = SnakeBody(OccupancyGrid(COLS, ROWS), capacity=4)
+    model = deque()
+    body.extend([cell(2), cell(1), cell(0)])
+    model.extend([cell(2), cell(1), cell(0)])
+    for i in range(3, 40):
+        body.push_head(cell(i))
+        model.appendleft(cell(i))
+        assert body.pop_tail() == model.pop()
+        assert_matches(body, model)
+    # The head went round the four slots many times without growing
+    assert len(body.cells) == 4
+
+
+def test_growing_keeps_order():
+    body = SnakeBody(OccupancyGrid(COLS, ROWS), capacity=4)
+    model = deque()
+    body.extend([cell(1), cell(0)])
+    model.extend([cell(1), cell(0)])
+    # Move so the live segments straddle the end of the buffer
+    for i in range(2, 5):
+        body.push_head(cell(i))
+        model.appendleft(cell(i))
+        body.pop_tail()
+        model.pop()
+    for i in range(5, 15):
+        body.push_head(cell(i))
+        model.appendleft(cell(i))
+        assert_matches(body, model)
+    assert len(body.cells) == 16
+
+
+def test_indices_and_slices():
+    body = SnakeBody(OccupancyGrid(COLS, ROWS), capacity=4)
+    body.extend([cell(1), cell(0)])
+    for i in range(2, 7):
+        body.push_head(cell(i))
+        body.pop_tail()
+    body.push_head(cell(7))
+    segments = [cell(7), cell(6), cell(5)]
+    assert body[0] == cell(7) and body[-1] == cell(5) and body[-3] == cell(7)
+    assert body[1:] == segments[1:] and body[::-1] == segments[::-1] and body[-2:] == segments[-2:]
+    for index in (3, -4):
+        with pytest.raises(IndexError):
+            body[index]
+
+
+def test_moving_and_eating():
+    rng = random.Random(0)
+    body = SnakeBody(OccupancyGrid(COLS, ROWS), capacity=8)
+    model = deque([cell(2), cell(1), cell(0)])
+    body.extend(model)
+    for i in range(3, 100):
+        # Eating keeps the tail; a move drops it
+        body.push_head(cell(i))
+        model.appendleft(cell(i))
+        if rng.random() < 0.8 or len(model) > 50:
+            body.pop_tail()
+            model.pop()
+        assert_matches(body, model)
+
+
+def test_snapshot_and_clear():
+    grid = OccupancyGrid(COLS, ROWS)
+    body = SnakeBody(grid, capacity=4)
+    body.extend([cell(i) for i in range(6, 0, -1)])
+    snapshot = body.snapshot()
+    body.clear()
+    assert len(body) == 0 and list(body) == []
+    assert grid.region(LAYER_SNAKE, 0, 0, COLS, ROWS).sum() == 0
+    body.restore(snapshot)
+    assert tuple(body) == snapshot
@@ -0,0 +1,84 @@
+import random
+from collections import deque
+
+import pytest
+
+from snakelite.core.distance_field import DistanceField
+from snakelite.core.grid import LAYER_STONE, OccupancyGrid
+from snakelite.settings import BLOCK_SIZE
+
+COLS, ROWS = 12, 9
+
+
+def reference(stones, head):
+    """Breadth-first steps from ``head`` over the wrapped board."""
+    dist = {head: 0}
+    queue = deque([head])
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            cell = ((x + dx) % COLS, (y + dy) % ROWS)
+            if cell not in dist and cell not in stones:
+                dist[cell] = dist[(x, y)] + 1
+                queue.append(cell)
+    return dist
+
+
+def check(field, stones, head):
+    expected = reference(stones, head)
+    for x in range(COLS):
+        for y in range(ROWS):
+            if (x, y) not in stones:
+                assert field.distance((x * BLOCK_SIZE, y * BLOCK_SIZE)) == expected.get((x, y), COLS * ROWS), (x, y)
+
+
+def pixels(cell):
+    return cell[0] * BLOCK_SIZE, cell[1] * BLOCK_SIZE
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_incremental_shift_matches_a_full_search(seed):
+    rng = random.Random(seed)
+    grid = OccupancyGrid(COLS, ROWS)
+    stones = set()
+    # A wall with one gap, plus scattered stones
+    for y in range(ROWS - 1):
+        stones.add((5, y))
+    while len(stones) < 20:
+        stones.add((rng.randrange(COLS), rng.randrange(ROWS)))
+    for cell in stones:
+        grid.add(LAYER_STONE, pixels(cell))
+    field = DistanceField(grid)
+    head = next((x, y) for x in range(COLS) for y in range(ROWS) if (x, y) not in stones)
+    for step in range(60):
+        field.track(pixels(head))
+        check(field, stones, head)
+        if step == 30:
+            # Closing the gap walls part of the board off
+            stones.add((5, ROWS - 1))
+            grid.add(LAYER_STONE, pixels((5, ROWS - 1)))
+        moves = [((head[0] + dx) % COLS, (head[1] + dy) % ROWS) for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))]
+        head = rng.choice([cell for cell in moves if cell not in stones] or [head])
+
+
+def test_open_board_is_the_wrapped_manhattan_distance():
+    field = DistanceField(OccupancyGrid(COLS, ROWS))
+    field.track(pixels((0, 0)))
+    assert field.distance(pixels((11, 8))) == 2
+    assert field.distance(pixels((6, 4))) == 10
+
+
+def test_snapshot_restore():
+    grid = OccupancyGrid(COLS, ROWS)
+    stones = {(3, y) for y in range(ROWS - 2)}
+    for cell in stones:
+        grid.add(LAYER_STONE, pixels(cell))
+    field = DistanceField(grid)
+    field.track(pixels((0, 0)))
+    field.distance(pixels((1, 1)))
+    grid_state, state = grid.snapshot(), field.snapshot()
+    field.track(pixels((7, 7)))
+    field.distance(pixels((1, 1)))
+    grid.restore(grid_state)
+    field.restore(state)
+    check(field, stones, (0, 0))
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from snakelite.core.entity_store import EntityStore
+
+
+def make(capacity=4):
+    return EntityStore(capacity, x=np.int32, y=np.int32, t=np.int64)
+
+
+def test_ids_name_one_entity_across_slot_reuse():
+    store = make()
+    first = store.add(x=1, y=2, t=3)
+    store.remove(first)
+    second = store.add(x=4, y=5, t=6)
+    assert first not in store and second in store
+    # Same slot, newer generation
+    assert store.slots([first])[0] == store.slots([second])[0]
+    assert first != second
+    with pytest.raises(KeyError):
+        store.slot(first)
+    with pytest.raises(KeyError):
+        store.remove(first)
+
+
+def test_columns_and_counts():
+    store = make()
+    ids = store.add_many(x=np.arange(3), y=np.arange(3) * 2, t=np.zeros(3))
+    assert len(store) == 3 and all(entity_id in store for entity_id in ids.tolist())
+    assert store.rows("x", "y") == [(0, 0), (1, 2), (2, 4)]
+    store.remove_slots(store.slots(ids[:1]))
+    assert len(store) == 2 and store.rows("x") == [(1,), (2,)]
+    store.clear()
+    assert len(store) == 0 and not store.live().size
+
+
+def test_growing_keeps_ids_and_values():
+    store = make(capacity=2)
+    ids = [store.add(x=i, y=-i, t=i * 10) for i in range(9)]
+    assert store.capacity >= 9
+    assert all(entity_id in store for entity_id in ids)
+    assert store.rows() == [(i, -i, i * 10) for i in range(9)]
+    assert len(set(ids)) == 9
+
+
+def test_snapshot_restore_brings_back_ids():
+    store = make()
+    kept = store.add(x=1, y=1, t=1)
+    gone = store.add(x=2, y=2, t=2)
+    store.remove(gone)
+    state = store.snapshot()
+    store.remove(kept)
+    for i in range(10):
+        store.add(x=i, y=i, t=i)
+    store.restore(state)
+    assert kept in store and gone not in store and len(store) == 1
+    assert store.rows() == [(1, 1, 1)]
+    # Slots come back off the restored free list
+    assert store.add(x=3, y=3, t=3) not in (kept, gone)
+
+
+def test_write_slots_copies_another_store():
+    source, copy = make(), make()
+    ids = [source.add(x=i, y=i, t=i) for i in range(6)]
+    source.remove(ids[2])
+    live = source.live()
+    copy.write_slots(live, source.data[live])
+    assert copy.rows() == source.rows() and len(copy) == len(source)
+    assert all(entity_id in copy for entity_id in source.ids(live).tolist())
+    copy.add(x=9, y=9, t=9)
+    assert len(copy) == len(source) + 1
@@ -0,0 +1,60 @@
+import random
+
+from snakelite.core.free_cells import FreeCells
+from snakelite.core.grid import LAYER_STONE, LAYER_EXPLOSION, OccupancyGrid
+from snakelite.settings import BLOCK_SIZE as B
+
+
+def test_add_remove_and_sample():
+    free = FreeCells(10)
+    for cell in (3, 7, 0, 9):
+        free.remove(cell)
+    assert len(free) == 6
+    assert 3 not in free and 4 in free
+    free.add(7)
+    assert 7 in free and len(free) == 7
+    rng = random.Random(0)
+    assert {free.sample(rng) for _ in range(500)} == {1, 2, 4, 5, 6, 7, 8}
+
+
+def test_empty_set_samples_none():
+    free = FreeCells(3)
+    for cell in range(3):
+        free.remove(cell)
+    assert free.sample(random.Random(0)) is None
+    state = free.snapshot()
+    free.add(1)
+    free.restore(state)
+    assert len(free) == 0 and 1 not in free
+
+
+def test_full_board_has_no_free_cell():
+    grid = OccupancyGrid(6, 5)
+    cells = [(x * B, y * B) for x in range(6) for y in range(5)]
+    for pos in cells:
+        grid.add(LAYER_STONE, pos)
+    rng = random.Random(0)
+    assert grid.random_free(rng) is None
+    # Explosions do not stop spawning
+    grid.remove(LAYER_STONE, (2 * B, 3 * B))
+    grid.add(LAYER_EXPLOSION, (2 * B, 3 * B))
+    assert grid.random_free(rng) == (2 * B, 3 * B)
+
+
+def test_never_picks_an_occupied_cell():
+    grid = OccupancyGrid(6, 5)
+    rng = random.Random(1)
+    stones = set()
+    for _ in range(3000):
+        pos = (rng.randrange(6) * B, rng.randrange(5) * B)
+        if pos in stones and rng.random() < 0.5:
+            stones.discard(pos)
+            grid.remove(LAYER_STONE, pos)
+        elif pos not in stones:
+            stones.add(pos)
+            grid.add(LAYER_STONE, pos)
+        picked = grid.random_free(rng)
+        if len(stones) == 30:
+            assert picked is None
+        else:
+            assert picked not in stones
@@ -0,0 +1,133 @@
+import random
+from collections import Counter
+
+import numpy as np
+from snakelite.core.grid import (
+    LAYER_STONE, LAYER_SNAKE, LAYER_FOOD, LAYER_BOMB, LAYER_EXPLOSION, OccupancyGrid,
+)
+from snakelite.settings import BLOCK_SIZE as B
+
+
+def test_counts_per_layer():
+    grid = OccupancyGrid(10, 8)
+    grid.add(LAYER_BOMB, (2 * B, 3 * B))
+    grid.add(LAYER_BOMB, (2 * B, 3 * B))
+    grid.add(LAYER_FOOD, (2 * B, 3 * B))
+    assert grid.count(LAYER_BOMB, (2 * B, 3 * B)) == 2
+    assert grid.count(LAYER_FOOD, (2 * B, 3 * B)) == 1
+    assert grid.count(LAYER_STONE, (2 * B, 3 * B)) == 0
+    assert grid.count(LAYER_BOMB, (3 * B, 3 * B)) == 0
+    grid.remove(LAYER_BOMB, (2 * B, 3 * B))
+    assert grid.count(LAYER_BOMB, (2 * B, 3 * B)) == 1
+    xs, ys = np.array([2 * B, 0, 2 * B]), np.array([3 * B, 0, 3 * B])
+    assert grid.counts(LAYER_BOMB, xs, ys).tolist() == [1, 0, 1]
+
+
+def test_masks_answer_membership():
+    grid = OccupancyGrid(10, 8)
+    grid.add(LAYER_STONE, (B, B))
+    grid.add(LAYER_SNAKE, (2 * B, B))
+    mask = grid.mask(LAYER_STONE, LAYER_BOMB)
+    assert (B, B) in mask
+    assert (2 * B, B) not in mask
+    assert (2 * B, B) in grid.mask(LAYER_SNAKE)
+
+
+def test_many_at_once_matches_one_by_one():
+    rng = np.random.default_rng(0)
+    xs = rng.integers(0, 10, 50) * B
+    ys = rng.integers(0, 8, 50) * B
+    for layer in (LAYER_BOMB, LAYER_EXPLOSION):
+        one, many = OccupancyGrid(10, 8), OccupancyGrid(10, 8)
+        for pos in zip(xs.tolist(), ys.tolist()):
+            one.add(layer, pos)
+        many.add_many(layer, xs, ys)
+        assert np.array_equal(one.region(layer, 0, 0, 10, 8), many.region(layer, 0, 0, 10, 8))
+        many.remove_many(layer, xs, ys)
+        assert not many.region(layer, 0, 0, 10, 8).any()
+
+
+def test_versions_follow_changes():
+    grid = OccupancyGrid(10, 8)
+    before = list(grid.versions)
+    grid.add(LAYER_FOOD, (B, B))
+    assert grid.versions[LAYER_FOOD] > before[LAYER_FOOD]
+    assert grid.versions[LAYER_STONE] == before[LAYER_STONE]
+
+
+def chunked():
+    # Chunks of 4: three columns of chunks (the last 2 wide), two rows
+    # (the last 3 tall)
+    return OccupancyGrid(10, 7, chunk_size=4)
+
+
+def test_chunks_exist_while_something_is_in_them():
+    grid = chunked()
+    grid.add(LAYER_STONE, (9 * B, 6 * B))
+    grid.add(LAYER_EXPLOSION, (9 * B, 6 * B))
+    assert list(grid.chunks) == [5]
+    grid.remove(LAYER_STONE, (9 * B, 6 * B))
+    grid.remove(LAYER_EXPLOSION, (9 * B, 6 * B))
+    assert not grid.chunks
+
+
+def test_regions_wrap_across_chunks():
+    grid = chunked()
+    everything = np.zeros((10, 7), dtype=np.uint16)
+    rng = np.random.default_rng(2)
+    for x, y in zip(rng.integers(0, 10, 40).tolist(), rng.integers(0, 7, 40).tolist()):
+        grid.add(LAYER_BOMB, (x * B, y * B))
+        everything[x, y] += 1
+    region = grid.region(LAYER_BOMB, 8, 5, 6, 4)
+    expected = everything[np.arange(8, 14) % 10][:, np.arange(5, 9) % 7]
+    assert np.array_equal(region, expected)
+
+
+def test_random_free_across_chunk_edges():
+    grid = chunked()
+    rng = random.Random(3)
+    stones = set()
+    for _ in range(3000):
+        # Mostly on the cells either side of a chunk edge
+        x = rng.choice([3, 4, 7, 8, 9, 0]) if rng.random() < 0.8 else rng.randrange(10)
+        y = rng.choice([3, 4, 6, 0]) if rng.random() < 0.8 else rng.randrange(7)
+        pos = (x * B, y * B)
+        if pos in stones:
+            stones.discard(pos)
+            grid.remove(LAYER_STONE, pos)
+        else:
+            stones.add(pos)
+            grid.add(LAYER_STONE, pos)
+        for _ in range(3):
+            assert grid.random_free(rng) not in stones
+
+
+def test_random_free_is_uniform_over_cells():
+    grid = chunked()
+    # Chunk 0 keeps two free cells, the short corner chunk 5 keeps one, the
+    # rest are untouched and never even created
+    for x in range(4):
+        for y in range(4):
+            if (x, y) not in ((0, 0), (3, 3)):
+                grid.add(LAYER_STONE, (x * B, y * B))
+    for x in range(8, 10):
+        for y in range(4, 7):
+            if (x, y) != (9, 6):
+                grid.add(LAYER_STONE, (x * B, y * B))
+    free = 10 * 7 - 14 - 5
+    rng = random.Random(4)
+    draws = 200 * free
+    picks = Counter(grid.random_free(rng) for _ in range(draws))
+    assert len(picks) == free
+    assert (0, 0) in picks and (9 * B, 6 * B) in picks
+    assert all(120 < count < 280 for count in picks.values())
+
+
+def test_random_free_in_chosen_chunks():
+    grid = chunked()
+    rng = random.Random(5)
+    picks = {grid.random_free(rng, [1, 5]) for _ in range(500)}
+    cells = {(x // B, y // B) for x, y in picks}
+    chunk_1 = {(x, y) for x in range(4) for y in range(4, 7)}
+    chunk_5 = {(x, y) for x in range(8, 10) for y in range(4, 7)}
+    assert cells == chunk_1 | chunk_5
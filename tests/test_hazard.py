@@ -0,0 +1,90 @@
+import numpy as np
+
+from snakelite.core.grid import LAYER_BOMB, LAYER_EXPLOSION, LAYER_STONE, OccupancyGrid
+from snakelite.core.hazard import HazardMap
+from snakelite.entities.player.snake import SnakeGame
+from snakelite.settings import BLOCK_SIZE, BOMB_DURATION, EXPLOSION_DURATION
+
+B = BLOCK_SIZE
+
+
+def cells(*positions):
+    xs, ys = zip(*positions)
+    return np.array(xs) * B, np.array(ys) * B
+
+
+def test_stamp_keeps_the_latest_end_once_per_cell():
+    hazards = HazardMap(OccupancyGrid(8, 6))
+    xs, ys, before = hazards.stamp(*cells((1, 1), (1, 1), (2, 1)), 100)
+    assert len(xs) == 2 and before.tolist() == [0, 0]
+    assert hazards.burning == 2
+    _, _, before = hazards.stamp(*cells((2, 1), (3, 1)), 50)
+    assert sorted(before.tolist()) == [0, 100]
+    assert hazards.end_at((2 * B, B)) == 100 and hazards.end_at((3 * B, B)) == 50
+    assert hazards.ends_at(*cells((1, 1), (3, 1), (0, 0))).tolist() == [100, 50, 0]
+    assert hazards.burning == 3
+
+
+def test_expire_leaves_cells_a_later_blast_extended():
+    hazards = HazardMap(OccupancyGrid(8, 6))
+    hazards.stamp(*cells((1, 1), (2, 1)), 100)
+    hazards.stamp(*cells((2, 1)), 200)
+    xs, ys = hazards.expire(*cells((1, 1), (2, 1)), 100)
+    assert list(zip(xs // B, ys // B)) == [(1, 1)]
+    assert hazards.burning == 1 and hazards.end_at((2 * B, B)) == 200
+    hazards.expire(*cells((2, 1)), 200)
+    assert hazards.burning == 0 and not hazards.chunks
+
+
+def test_region_wraps_across_chunks():
+    grid = OccupancyGrid(10, 10, chunk_size=4)
+    hazards = HazardMap(grid)
+    hazards.stamp(*cells((9, 9), (0, 0), (5, 5)), 7)
+    region = hazards.region(8, 8, 4, 4)
+    assert region[1, 1] == 7 and region[2, 2] == 7 and region.sum() == 14
+    copy = HazardMap(grid)
+    copy.restore(hazards.snapshot())
+    assert np.array_equal(copy.region(0, 0, 10, 10), hazards.region(0, 0, 10, 10))
+    assert copy.burning == 3
+
+
+def chain_game():
+    """A playing game with four bombs in a row two cells apart, away from
+    the snake: the first is due now, the rest much later, and the fourth
+    is out of reach of the third."""
+    game = SnakeGame(seed=3)
+    game.start()
+    game.begin_level()
+    now = game.clock.now()
+    grid = game.grid
+    head_x, head_y = game.snake[0]
+    x, y = (head_x // B + 10) % grid.cols, (head_y // B + 8) % grid.rows
+    positions = [((x + dx) % grid.cols * B, y * B) for dx in (0, 2, 4, 20)]
+    for i, (bx, by) in enumerate(positions):
+        game.add_bomb((bx, by, now - BOMB_DURATION if i == 0 else now + 5000, 2))
+    return game, positions
+
+
+def test_bombs_in_a_blast_go_off_in_the_same_tick():
+    game, positions = chain_game()
+    ids = game.bombs.ids(game.bombs.live())
+    game.combat_system.update_bombs(game)
+    left = [entity_id for entity_id in ids.tolist() if entity_id in game.bombs]
+    assert len(left) == 1 and game.bombs.x[game.bombs.slot(left[0])] == positions[3][0]
+    for pos in positions[:3]:
+        assert pos in game.stone_blocks and game.grid.count(LAYER_STONE, pos)
+        assert not game.grid.count(LAYER_BOMB, pos)
+    assert positions[3] not in game.stone_blocks
+    # Three radius-2 crosses on one row: 9 row cells and 4 per column
+    assert game.hazards.burning == 9 + 3 * 4
+    burning = game.grid.region(LAYER_EXPLOSION, 0, 0, game.grid.cols, game.grid.rows)
+    assert burning.max() == 1 and burning.sum() == game.hazards.burning
+    # The whole chain is one wave with one timer
+    assert len(game.scheduler.queues["explosion"]) == 1
+    game.clock.advance(EXPLOSION_DURATION)
+    game.combat_system.update_explosions(game)
+    game.clock.advance(10000)
+    game.combat_system.update_bombs(game)
+    # Only the fourth bomb's own cross: the others' timers were skipped
+    assert game.hazards.burning == 1 + 4 * 2
+    assert not game.scheduler.queues["bomb"] and not game.scheduler.cancelled
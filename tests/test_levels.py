@@ -0,0 +1,107 @@
+import mmap
+import os
+
+import numpy as np
+import pytest
+
+from snakelite.core.levels import LevelError, cache_path, load_levels, parse_level
+from snakelite.settings import BLOCK_SIZE
+
+WALLS = """# A wall across the board
+foods 4
+food_types bomb bomb slowdown
+effect_chance 0.5
+board 12 9
+map
+.###.
+.....
+.....
+"""
+
+
+@pytest.fixture
+def level_dir(tmp_path):
+    directory = tmp_path / "levels"
+    directory.mkdir()
+    (directory / "01-open.level").write_text("foods 2\n")
+    (directory / "02-walls.level").write_text(WALLS)
+    return directory
+
+
+@pytest.fixture
+def load(tmp_path):
+    cache = str(tmp_path / "cache")
+
+    def load(directory):
+        # load_levels keeps one pack per process; each call here reads the disk
+        load_levels.cache_clear()
+        return load_levels(str(directory), cache)
+
+    yield load
+    load_levels.cache_clear()
+
+
+def test_compiled_levels(level_dir, load):
+    first, walls = load(level_dir)
+    assert first.foods == 2 and first.food_types == ("bomb", "slowdown")
+    assert walls.foods == 4 and walls.food_types == ("bomb", "bomb", "slowdown")
+    assert walls.effect_chance == 0.5 and walls.board == (12, 9) and walls.map_size == (5, 3)
+    # The map is centred on the board
+    assert walls.origin() == (4, 3)
+    expected = [((4 + x) * BLOCK_SIZE, 3 * BLOCK_SIZE) for x in (1, 2, 3)]
+    assert walls.stone_positions() == expected
+    board = walls.stone_grid()
+    assert board.shape == (12, 9) and board.sum() == 3 and board[5:8, 3].all()
+
+
+def test_pack_is_cached_and_mapped(level_dir, load, tmp_path):
+    load(level_dir)
+    path = cache_path(str(level_dir), str(tmp_path / "cache"))
+    assert os.path.exists(path)
+    written = os.path.getmtime(path)
+    pack = load(level_dir)
+    assert isinstance(pack.buffer, mmap.mmap)
+    assert os.path.getmtime(path) == written
+
+
+def test_changed_sources_recompile(level_dir, load):
+    assert load(level_dir)[0].foods == 2
+    (level_dir / "01-open.level").write_text("foods 7\n")
+    assert load(level_dir)[0].foods == 7
+    (level_dir / "03-more.level").write_text("foods 1\n")
+    assert len(load(level_dir)) == 3
+
+
+def test_corrupt_cache_is_rebuilt(level_dir, load, tmp_path):
+    load(level_dir)
+    path = cache_path(str(level_dir), str(tmp_path / "cache"))
+    with open(path, "wb") as f:
+        f.write(b"garbage")
+    assert [level.foods for level in load(level_dir)] == [2, 4]
+
+
+def test_shipped_levels_load():
+    load_levels.cache_clear()
+    levels = load_levels()
+    assert len(levels) >= 3
+    assert all(level.foods > 0 for level in levels)
+
+
+@pytest.mark.parametrize("text", [
+    "foods many\n",
+    "speed 3\n",
+    "food_types apple\n",
+    "effect_chance 2\n",
+    "board 4 4\nmap\n#####\n",
+    "map\n...\n.#\n",
+    "map\n...\n.#.\n...\n",
+])
+def test_bad_levels_are_rejected(text):
+    with pytest.raises(LevelError):
+        parse_level(text)
+
+
+def test_parse_level_map():
+    board, foods, food_types, effect_chance, grid = parse_level(WALLS)
+    assert board == (12, 9) and foods == 4
+    assert np.array_equal(np.nonzero(grid), ([1, 2, 3], [0, 0, 0]))
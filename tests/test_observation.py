@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+from snakelite.entities.food.bomb_food import BombFood
+from snakelite.entities.food.slowdown_food import SlowdownFood
+from snakelite.entities.player.snake import SnakeGame
+from snakelite.envs.observation import (
+    OBS_HEAD, OBS_BODY, OBS_BOMB_FOOD, OBS_SLOWDOWN_FOOD, OBS_BOMB, OBS_BOMB_RADIUS, OBS_EXPLOSION, OBS_SLOWDOWN,
+    OBS_STONE, OBS_CHANNELS, observe,
+)
+from snakelite.settings import BLOCK_SIZE as B, BOMB_DURATION, EXPLOSION_DURATION, FOOD_MAX_AGE, SLOWDOWN_LIFETIME
+
+
+@pytest.fixture
+def game():
+    """A game on an empty board, well into its clock, with the snake
+    across the top left corner: head at (1, 1), then (0, 1) and (39, 1)."""
+    game = SnakeGame(seed=0)
+    game.start()
+    game.begin_level()
+    game.clock.advance(100000)
+    game.foods = []
+    game.snake.clear()
+    game.snake.extend([(B, B), (0, B), ((game.grid.cols - 1) * B, B)])
+    return game
+
+
+def at(*cell):
+    return cell[0] * B, cell[1] * B
+
+
+def test_snake_channels(game):
+    obs = game.observe()
+    assert obs.shape == (OBS_CHANNELS, 40, 30) and obs.dtype == np.float32
+    assert obs[OBS_HEAD].sum() == 1 and obs[OBS_HEAD, 1, 1] == 1
+    assert obs[OBS_BODY, 1, 1] == 1
+    assert obs[OBS_BODY, 0, 1] == pytest.approx(2 / 3)
+    assert obs[OBS_BODY, 39, 1] == pytest.approx(1 / 3)
+    assert np.count_nonzero(obs[OBS_BODY]) == 3
+
+
+def test_age_ramps(game):
+    now = game.clock.now()
+    game.foods = [
+        BombFood(*at(5, 5), "bomb", now, game.rng),
+        SlowdownFood(*at(6, 5), "slowdown", now - FOOD_MAX_AGE // 2, game.rng),
+        SlowdownFood(*at(7, 5), "slowdown", now - 2 * FOOD_MAX_AGE, game.rng),
+    ]
+    game.add_bomb((*at(5, 10), now, 1))
+    game.add_bomb((*at(6, 10), now - BOMB_DURATION // 2, 3))
+    game.add_slowdown((*at(5, 15), now))
+    game.add_slowdown((*at(6, 15), now - SLOWDOWN_LIFETIME // 2))
+    obs = game.observe()
+
+    assert obs[OBS_BOMB_FOOD, 5, 5] == 1 and np.count_nonzero(obs[OBS_BOMB_FOOD]) == 1
+    assert obs[OBS_SLOWDOWN_FOOD, 6, 5] == pytest.approx(0.75)
+    # Food older than FOOD_MAX_AGE stays at half
+    assert obs[OBS_SLOWDOWN_FOOD, 7, 5] == 0.5
+    assert obs[OBS_BOMB, 5, 10] == 1 and obs[OBS_BOMB, 6, 10] == pytest.approx(0.75)
+    assert obs[OBS_BOMB_RADIUS, 5, 10] == 1 and obs[OBS_BOMB_RADIUS, 6, 10] == 3
+    assert obs[OBS_SLOWDOWN, 5, 15] == 1 and obs[OBS_SLOWDOWN, 6, 15] == pytest.approx(0.75)
+    assert np.count_nonzero(obs[OBS_BOMB]) == np.count_nonzero(obs[OBS_SLOWDOWN]) == 2
+
+
+def test_explosion_time_left(game):
+    now = game.clock.now()
+    game.hazards.stamp(np.array([at(3, 3)[0]]), np.array([at(3, 3)[1]]), now + EXPLOSION_DURATION)
+    game.hazards.stamp(np.array([at(4, 3)[0]]), np.array([at(4, 3)[1]]), now + EXPLOSION_DURATION // 4)
+    game.hazards.stamp(np.array([at(5, 3)[0]]), np.array([at(5, 3)[1]]), now - 1)
+    obs = game.observe()
+    assert obs[OBS_EXPLOSION, 3, 3] == 1
+    assert obs[OBS_EXPLOSION, 4, 3] == pytest.approx(0.25)
+    # Burnt out
+    assert obs[OBS_EXPLOSION, 5, 3] == 0
+    assert np.count_nonzero(obs[OBS_EXPLOSION]) == 2
+
+
+def test_stones(game):
+    obs = game.observe()
+    expected = np.zeros((game.grid.cols, game.grid.rows))
+    for x, y in game.stone_blocks:
+        expected[x // B, y // B] = 1
+    assert np.array_equal(obs[OBS_STONE], expected)
+
+
+def test_shared_cells_keep_the_larger_value(game):
+    now = game.clock.now()
+    game.add_bomb((*at(8, 8), now - BOMB_DURATION // 2, 3))
+    game.add_bomb((*at(8, 8), now, 1))
+    game.foods = [
+        BombFood(*at(9, 9), "bomb", now - FOOD_MAX_AGE, game.rng),
+        BombFood(*at(9, 9), "bomb", now - FOOD_MAX_AGE // 2, game.rng),
+    ]
+    obs = game.observe()
+    assert obs[OBS_BOMB, 8, 8] == 1
+    assert obs[OBS_BOMB_RADIUS, 8, 8] == 3
+    assert obs[OBS_BOMB_FOOD, 9, 9] == pytest.approx(0.75)
+
+
+def test_views_wrap_around_the_board(game):
+    now = game.clock.now()
+    game.add_bomb((*at(38, 28), now, 2))
+    game.foods = [BombFood(*at(3, 4), "bomb", now, game.rng)]
+    full = game.observe()
+    view = game.observe(view=(11, 9))
+    assert view.shape == (OBS_CHANNELS, 11, 9)
+    # Centred on the head at (1, 1), so the view starts at (36, 27)
+    xs = (36 + np.arange(11)) % 40
+    ys = (27 + np.arange(9)) % 30
+    assert np.array_equal(view, full[:, xs][:, :, ys])
+    assert view[OBS_HEAD, 5, 4] == 1
+    assert view[OBS_BODY, 3, 4] == pytest.approx(1 / 3)
+    assert view[OBS_BOMB, 2, 1] == 1 and view[OBS_BOMB_FOOD, 7, 7] == 1
+    # An axis the view spans covers the whole board from its origin
+    wide = game.observe(view=(60, 9))
+    assert wide.shape == (OBS_CHANNELS, 40, 9)
+    assert np.array_equal(wide, full[:, :, ys])
+
+
+def test_wrong_buffer_shape_is_rejected(game):
+    with pytest.raises(ValueError):
+        observe(game, np.zeros((OBS_CHANNELS, 30, 40), dtype=np.float32))
+    with pytest.raises(ValueError):
+        game.observe(np.zeros((OBS_CHANNELS, 40, 30), dtype=np.float32), view=(11, 9))
+    out = np.zeros((OBS_CHANNELS, 11, 9), dtype=np.float64)
+    assert game.observe(out, view=(11, 9)) is out
@@ -0,0 +1,90 @@
+import random
+
+import numpy as np
+import pytest
+
+from snakelite.core.grid import LAYER_COUNT
+from snakelite.core.levels import load_levels
+from snakelite.net import protocol
+from snakelite.net.arena import ArenaGame
+from snakelite.net.client import ArenaView
+from snakelite.net.server import ARENA_LEVELS
+
+
+@pytest.fixture
+def arena():
+    game = ArenaGame(seed=3, levels=load_levels(ARENA_LEVELS))
+    for _ in range(8):
+        game.add_player(bot=True)
+    return game
+
+
+def assert_matches(game, view):
+    grid = game.grid
+    assert np.array_equal(grid.region(range(LAYER_COUNT), 0, 0, grid.cols, grid.rows),
+                          view.grid.region(range(LAYER_COUNT), 0, 0, grid.cols, grid.rows))
+    for store, copy in zip(game._stores(), view._stores()):
+        assert np.array_equal(store.live(), copy.live())
+        assert np.array_equal(store.data[store.live()], copy.data[copy.live()])
+    assert np.array_equal(game.hazards.region(0, 0, grid.cols, grid.rows),
+                          view.hazards.region(0, 0, grid.cols, grid.rows))
+    assert game.hazards.burning == view.hazards.burning
+    assert sorted((food.position, food.creation_time, food.food_type) for food in game.foods) == \
+        sorted((food.position, food.creation_time, food.food_type) for food in view.foods)
+    assert view.clock.now() == game.clock.now()
+    for player_id, player in game.players.items():
+        assert list(view.players[player_id].body) == list(player.snake), player_id
+
+
+def send(kind, tick, body):
+    # Through the wire format, compression included
+    return protocol.unpack(protocol.pack(kind, tick, body))
+
+
+def test_deltas_keep_a_view_in_step(arena):
+    encoder = protocol.StateEncoder(arena)
+    view = ArenaView(next(iter(arena.players)), arena.grid.cols, arena.grid.rows)
+    arena.advance()
+    kind, _, tick, body = send(protocol.KEYFRAME, arena.tick, encoder.keyframe())
+    encoder.delta()
+    assert view.apply(kind, tick, body)
+    for _ in range(250):
+        arena.advance()
+        kind, _, tick, body = send(protocol.DELTA, arena.tick, encoder.delta())
+        assert view.apply(kind, tick, body)
+        assert_matches(arena, view)
+
+
+def test_a_lost_delta_waits_for_a_keyframe(arena):
+    encoder = protocol.StateEncoder(arena)
+    views = [ArenaView(player_id, arena.grid.cols, arena.grid.rows) for player_id in list(arena.players)[:3]]
+    rng = random.Random(0)
+    applied = skipped = 0
+    for _ in range(300):
+        arena.advance()
+        delta = encoder.delta()
+        for view in views:
+            if rng.random() < 0.1:
+                continue
+            if view.need_keyframe or not view.synced:
+                kind, _, tick, body = send(protocol.KEYFRAME, arena.tick, encoder.keyframe())
+            else:
+                kind, _, tick, body = send(protocol.DELTA, arena.tick, delta)
+            if view.apply(kind, tick, body):
+                applied += 1
+                assert_matches(arena, view)
+            else:
+                skipped += 1
+                assert view.need_keyframe
+    assert applied and skipped
+
+
+def test_stale_and_malformed_messages():
+    view = ArenaView(0, 10, 10)
+    with pytest.raises(protocol.ProtocolError):
+        protocol.unpack(b"\x01")
+    with pytest.raises(protocol.ProtocolError):
+        protocol.read_state(b"\x00" * 3, view.store_dtypes)
+    # A delta before any keyframe is not applied
+    assert not view.apply(protocol.DELTA, 1, b"")
+    assert view.need_keyframe
@@ -0,0 +1,89 @@
+import io
+import random
+
+import pytest
+
+from snakelite.core.replay import (
+    TURNS, ReplayError, ReplayRecorder, play, read_events, read_header,
+)
+from snakelite.core.levels import load_levels
+from snakelite.entities.player.snake import SnakeGame
+
+from conftest import drive, fingerprint
+
+
+def record(seed, ticks):
+    game = SnakeGame(seed=seed)
+    out = io.BytesIO()
+    game.recorder = ReplayRecorder(out, seed, game.levels.source_hash)
+    drive(game, random.Random(seed), ticks)
+    game.recorder.close()
+    return game, out.getvalue()
+
+
+def rerecord(data):
+    """Play ``data`` back into a game that records itself."""
+    stream = io.BytesIO(data)
+    seed, level_hash = read_header(stream)
+    game = SnakeGame(seed=seed)
+    out = io.BytesIO()
+    game.recorder = ReplayRecorder(out, seed, level_hash)
+    for command, count in read_events(stream):
+        if command == "ticks":
+            for _ in range(count):
+                game.step()
+        elif command in TURNS:
+            game.turn(TURNS[command])
+        else:
+            getattr(game, command)()
+    game.recorder.close()
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("seed", [0, 5, 2**63 + 1])
+def test_play_reaches_the_recorded_state(seed):
+    game, data = record(seed, 1500)
+    assert fingerprint(play(io.BytesIO(data))) == fingerprint(game)
+
+
+def test_playback_records_the_same_bytes():
+    _, data = record(4, 1500)
+    assert rerecord(data) == data
+
+
+def test_recording_is_deterministic():
+    assert record(9, 800)[1] == record(9, 800)[1]
+
+
+def test_replay_files(tmp_path):
+    game, data = record(2, 600)
+    path = tmp_path / "run.snkr"
+    path.write_bytes(data)
+    assert fingerprint(play(path)) == fingerprint(game)
+
+
+def test_bad_replays_are_rejected():
+    _, data = record(1, 50)
+    with pytest.raises(ReplayError):
+        play(io.BytesIO(b"NOPE" + data[4:]))
+    with pytest.raises(ReplayError):
+        play(io.BytesIO(data[:5]))
+    with pytest.raises(ReplayError):
+        list(read_events(io.BytesIO(bytes([200]))))
+
+
+def test_replays_play_only_on_their_levels(tmp_path):
+    _, data = record(3, 300)
+    (tmp_path / "01-other.level").write_text("foods 2\n")
+    other = load_levels(str(tmp_path), str(tmp_path / "cache"))
+    with pytest.raises(ReplayError, match="different levels"):
+        play(io.BytesIO(data), other)
+
+    game = SnakeGame(seed=8, levels=other)
+    out = io.BytesIO()
+    game.recorder = ReplayRecorder(out, 8, other.source_hash)
+    drive(game, random.Random(8), 300)
+    game.recorder.close()
+    assert fingerprint(play(io.BytesIO(out.getvalue()), other)) == fingerprint(game)
+    with pytest.raises(ReplayError):
+        play(io.BytesIO(out.getvalue()))
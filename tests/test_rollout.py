@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from snakelite.core.grid import LAYER_COUNT
+from snakelite.core.levels import load_levels
+from snakelite.envs.rollout import RolloutRunner, observation_view
+
+
+def boards(*sizes):
+    return [SimpleNamespace(board=size) for size in sizes]
+
+
+def test_view_defaults_to_the_shared_board():
+    assert observation_view(boards((40, 30), (40, 30))) == (40, 30)
+    assert observation_view(boards((64, 48), (20, 15)), (20, 15)) == (20, 15)
+
+
+@pytest.mark.parametrize("levels, view", [
+    (boards((40, 30), (64, 48)), None),
+    (boards((40, 30), (64, 48)), (41, 30)),
+    (boards((40, 30)), (0, 10)),
+])
+def test_bad_views_are_rejected(levels, view):
+    with pytest.raises(ValueError):
+        observation_view(levels, view)
+
+
+def test_observations_follow_the_view():
+    levels = load_levels()
+    with RolloutRunner(num_workers=1, games_per_worker=2, seed=0, levels=levels, view=(11, 9)) as runner:
+        assert runner.obs.shape == (2, LAYER_COUNT, 11, 9)
+        obs = runner.reset()
+        # The view is centred on the head, so the snake is in it
+        assert obs.any(axis=(1, 2, 3)).all()
+        obs, rewards, dones = runner.step(np.zeros(2, dtype=np.int8))
+        assert obs.shape == (2, LAYER_COUNT, 11, 9)
+    with RolloutRunner(num_workers=1, games_per_worker=1, seed=0) as runner:
+        assert runner.obs.shape == (1, LAYER_COUNT) + levels[0].board
@@ -0,0 +1,71 @@
+from snakelite.core.scheduler import Scheduler
+
+
+def make():
+    scheduler = Scheduler()
+    fired = []
+    scheduler.on("bomb", fired.append)
+    return scheduler, fired
+
+
+def test_due_timers_fire_once_as_one_wave_in_due_order():
+    scheduler, fired = make()
+    late = scheduler.schedule("bomb", 30, "c")
+    first = scheduler.schedule("bomb", 10, "a")
+    second = scheduler.schedule("bomb", 10, "b")
+    scheduler.run("bomb", 5)
+    assert fired == []
+    scheduler.run("bomb", 20)
+    assert fired == [[(first, "a"), (second, "b")]]
+    scheduler.run("bomb", 20)
+    assert len(fired) == 1
+    scheduler.run("bomb", 30)
+    assert fired[-1] == [(late, "c")]
+
+
+def test_cancel_is_lazy_and_skips_the_timer():
+    scheduler, fired = make()
+    kept = scheduler.schedule("bomb", 10, "kept")
+    dropped = scheduler.schedule("bomb", 10, "dropped")
+    scheduler.cancel(dropped)
+    assert dropped in scheduler.cancelled
+    scheduler.run("bomb", 10)
+    assert fired == [[(kept, "kept")]]
+    # The id is forgotten once skipped
+    assert not scheduler.cancelled
+
+
+def test_a_wave_of_cancelled_timers_calls_no_handler():
+    scheduler, fired = make()
+    scheduler.cancel(scheduler.schedule("bomb", 10, "x"))
+    scheduler.run("bomb", 10)
+    assert fired == []
+
+
+def test_clear_forgets_cancelled_ids_of_its_kind():
+    scheduler, fired = make()
+    scheduler.on("slowdown", fired.append)
+    bomb = scheduler.schedule("bomb", 10, "bomb")
+    slowdown = scheduler.schedule("slowdown", 10, "slowdown")
+    scheduler.cancel(bomb)
+    scheduler.cancel(slowdown)
+    scheduler.clear("bomb")
+    assert scheduler.cancelled == {slowdown}
+    scheduler.run("bomb", 10)
+    scheduler.run("slowdown", 10)
+    assert fired == []
+
+
+def test_snapshot_restore():
+    scheduler, fired = make()
+    kept = scheduler.schedule("bomb", 10, (1, 2))
+    scheduler.cancel(scheduler.schedule("bomb", 10, (3, 4)))
+    state = scheduler.snapshot()
+    scheduler.run("bomb", 10)
+    scheduler.schedule("bomb", 5, (5, 6))
+    scheduler.restore(state)
+    fired.clear()
+    scheduler.run("bomb", 10)
+    assert fired == [[(kept, (1, 2))]]
+    # Ids carry on from the snapshot
+    assert scheduler.schedule("bomb", 20, None) == kept + 2
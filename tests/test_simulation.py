@@ -0,0 +1,55 @@
+import os
+import random
+import subprocess
+import sys
+
+from snakelite.entities.player.snake import SnakeGame
+
+from conftest import ACTIONS, drive, fingerprint
+
+
+def test_step_is_deterministic_for_a_seed():
+    games = [SnakeGame(seed=7), SnakeGame(seed=7)]
+    for game in games:
+        drive(game, random.Random(1), 400)
+    assert fingerprint(games[0]) == fingerprint(games[1])
+
+
+def test_runs_without_pygame():
+    # The simulation core must not need pygame, only the window does
+    script = (
+        "import sys; sys.modules['pygame'] = None\n"
+        "from snakelite.entities.player.snake import SnakeGame\n"
+        "game = SnakeGame(seed=1); game.start(); game.begin_level()\n"
+        "for _ in range(200): game.step(None)\n"
+    )
+    src = os.path.join(os.path.dirname(__file__), os.pardir, "src")
+    env = dict(os.environ, PYTHONPATH=src)
+    subprocess.run([sys.executable, "-c", script], env=env, check=True)
+
+
+def test_clock_only_moves_while_playing():
+    game = SnakeGame(seed=2)
+    assert game.step(None) == (0, False)
+    assert game.clock.now() == 0
+    game.start()
+    game.begin_level()
+    for _ in range(50):
+        before = game.clock.now()
+        game.step(None)
+        assert game.clock.now() - before == 1000 // game.current_speed
+
+
+def test_step_reports_reward_and_done(rng):
+    game = SnakeGame(seed=5)
+    game.start()
+    game.begin_level()
+    for _ in range(5000):
+        score = game.score
+        reward, done = game.step(rng.choice(ACTIONS))
+        assert reward == game.score - score
+        if done:
+            assert game.game_state != "playing"
+            break
+    else:
+        raise AssertionError("no run ended in 5000 ticks")
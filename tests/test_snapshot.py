@@ -0,0 +1,41 @@
+import random
+
+from snakelite.entities.player.snake import SnakeGame
+
+from conftest import drive, fingerprint
+
+
+def trace(game, ticks):
+    states = []
+    drive(game, random.Random(99), ticks, lambda game: states.append(fingerprint(game)))
+    return states
+
+
+def test_restore_replays_the_same_ticks(rng):
+    game = SnakeGame(seed=3)
+    game.shield_count = 5
+    drive(game, rng, 500)
+    snapshot = game.snapshot()
+    before = fingerprint(game)
+    expected = trace(game, 400)
+
+    game.restore(snapshot)
+    assert fingerprint(game) == before
+    assert trace(game, 400) == expected
+    # A snapshot can be restored again, and into another game
+    game.restore(snapshot)
+    assert trace(game, 400) == expected
+    other = SnakeGame(seed=1234)
+    other.restore(snapshot)
+    assert fingerprint(other) == before
+    assert trace(other, 400) == expected
+
+
+def test_snapshot_is_not_disturbed_by_later_play(rng):
+    game = SnakeGame(seed=11)
+    drive(game, rng, 300)
+    snapshot = game.snapshot()
+    before = fingerprint(game)
+    drive(game, rng, 300)
+    game.restore(snapshot)
+    assert fingerprint(game) == before
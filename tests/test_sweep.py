@@ -0,0 +1,54 @@
+import pytest
+
+from snakelite import settings
+from snakelite.entities.food import base
+from snakelite.tools import sweep
+
+
+@pytest.fixture(autouse=True)
+def restore_settings():
+    yield
+    sweep.apply_settings({})
+
+
+def test_swept_value_changes_the_outcome():
+    default = sweep.play(({}, {}), [0, 1], 1, 200)
+    faster = sweep.play(({"FOOD_MOVE_INTERVAL": 150}, {}), [0, 1], 1, 200)
+    assert faster != default
+    # and the override is undone for the next point
+    assert sweep.play(({}, {}), [0, 1], 1, 200) == default
+
+
+def test_apply_settings_rebinds_imported_names():
+    sweep.apply_settings({"FOOD_MOVE_INTERVAL": 150})
+    assert settings.FOOD_MOVE_INTERVAL == base.FOOD_MOVE_INTERVAL == 150
+    sweep.apply_settings({})
+    assert base.FOOD_MOVE_INTERVAL == settings.FOOD_MOVE_INTERVAL != 150
+
+
+@pytest.mark.parametrize("name", ["WORLD_COLS", "CHUNK_SIZE", "BLOCK_SIZE", "AUTOPILOT_BUDGET_MS", "DIRTY_RECTS"])
+def test_settings_fixed_on_import_are_rejected(name, capsys):
+    with pytest.raises(ValueError):
+        sweep.apply_settings({name: 10})
+    with pytest.raises(SystemExit) as exit:
+        sweep.main(["--set", f"{name}=10", "--games", "1"])
+    assert exit.value.code == 2
+    assert "cannot be swept" in capsys.readouterr().err
+
+
+def test_food_counts_leave_the_shared_pack_alone():
+    levels = sweep.point_levels({2: 9})
+    assert levels[1].foods == 9
+    assert sweep.load_levels()[1].foods != 9
+
+
+def test_rerun_reads_the_cache(tmp_path):
+    points = [({"BOMB_DURATION": 2000}, {})]
+    reports = []
+    first = sweep.run_sweep(points, 2, runs=1, tick_limit=100, jobs=1, directory=tmp_path,
+                            report=lambda result, cached: reports.append(cached))
+    second = sweep.run_sweep(points, 2, runs=1, tick_limit=100, jobs=1, directory=tmp_path,
+                             report=lambda result, cached: reports.append(cached))
+    assert reports == [False, True]
+    assert [list(record) for record in first[0]["records"]] == second[0]["records"]
+    assert first[0]["key"] != sweep.point_key(points[0], 3, 1, 100, 0)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from snakelite.envs.vec_env import VecSnakeEnv
+
+
+def boxed_in(bomb):
+    """An environment whose head is one step from a food with a regrowth
+    left, on a board of stones but for the body, the food, a second food
+    and one more cell, which holds a bomb when ``bomb``."""
+    env = VecSnakeEnv(1, level=2, seed=0)
+    env.reset()
+    env.effect_chance = 0.0
+    hx, hy = env.head[0]
+    env.food_alive[:] = False
+    env.food_grid[:] = 0
+    env._place_food(np.array([0]), 0, np.array([hx + 1]), np.array([hy]))
+    env._place_food(np.array([0]), 1, np.array([0]), np.array([0]))
+    env.food_remaining[0, :2] = 2
+
+    free = env.body(np.array([0]))[0] | (env.food_grid[0] > 0)
+    free[hx + 1, hy + 2] = True
+    env.stones[0] = ~free
+    if bomb:
+        env._add_bombs(np.array([0]), np.array([hx + 1]), np.array([hy + 2]))
+    return env, (hx + 1, hy)
+
+
+@pytest.mark.parametrize("bomb", [False, True])
+def test_eaten_food_regrows_on_free_cells_only(bomb):
+    env, target = boxed_in(bomb)
+    _, reward, done = env.step([0])
+    assert reward[0] == 1 and not done[0]
+    assert tuple(env.head[0]) == target
+    assert env.food_remaining[0, 0] == 1
+    if bomb:
+        # Nowhere left to regrow: the food is used up
+        assert not env.food_alive[0, 0]
+        assert env.food_grid[0].sum() == 1
+    else:
+        assert env.food_alive[0, 0]
+        assert tuple(env.food_pos[0, 0]) == (target[0], target[1] + 2)
+        assert env.food_grid[0, target[0], target[1] + 2] == 1
+        assert env.food_grid[0, target[0], target[1]] == 0
+
+
+def test_stays_consistent():
+    env = VecSnakeEnv(32, level=3, seed=1)
+    env.reset()
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        env.step(rng.integers(0, 5, env.num_envs))
+        counts = np.zeros_like(env.food_grid)
+        e, f = np.nonzero(env.food_alive)
+        np.add.at(counts, (e, env.food_pos[e, f, 0], env.food_pos[e, f, 1]), 1)
+        assert (counts == env.food_grid).all()
+        assert (env.body().sum(axis=(1, 2)) == env.length).all()